@@ -1,38 +1,104 @@
+import os
+
+from catalogue.arrow import ARROW_FORMATS, ArrowNotInstalled, stream_observations
+from catalogue.conditional import condition_on, get_change_markers
+from catalogue.cone import (
+    cone_search,
+    cone_search_votable,
+    cone_search_votable_error,
+    parse_cone,
+)
+from catalogue.crossmatch import (
+    CROSSMATCH_EXTENSIONS,
+    CROSSMATCH_FORMATS,
+    crossmatch_records,
+    crossmatch_table,
+    read_positions,
+    write_table,
+)
+from catalogue.export import EXPORT_FORMATS, export_rows, get_observation_table_file
+from catalogue.fast_serializers import FastListMixin
+from catalogue.filters import (
+    CachedCountDatatablesFilterBackend,
+    DatatablesRowsFilterBackend,
+    ObservationFilter,
+    SearchIndexFilter,
+)
 from catalogue.models import (
     AstroObject,
     AstroObjectClassification,
+    AstroObjectPosition,
     Observation,
+    ObservationTableRow,
     Parameter,
     Reference,
 )
+from catalogue.names import FUZZY, get_name_index
+from catalogue.page_cache import cache_page_on
+from catalogue.pagination import KeysetPaginationMixin
+from catalogue.pivot import (
+    CachedTable,
+    get_observation_table,
+    get_observation_table_columns,
+)
+from catalogue.renderers import (
+    ArrowRenderer,
+    CSVRenderer,
+    FITSRenderer,
+    NDJSONRenderer,
+    ParquetRenderer,
+    VOTableRenderer,
+)
 from catalogue.serializers import (
     AstroObjectClassificationSerializer,
     AstroObjectDetailSerializer,
+    AstroObjectIncludedSerializer,
     AstroObjectListSerializer,
     ObservationSerializer,
+    ObservationSideloadSerializer,
     ObservationTableSerializer,
+    ParameterIncludedSerializer,
     ParameterSerializer,
     ReferenceDetailSerializer,
+    ReferenceIncludedSerializer,
     ReferenceListSerializer,
+    get_observation_table_serializer,
 )
+from catalogue.sparse_fields import SparseFieldsetMixin
+from catalogue.utils import find_reference
+from django.db.models import Prefetch
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotAcceptable, NotFound, ValidationError
 from rest_framework.filters import SearchFilter
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet, ViewSet
-from rest_framework_datatables.filters import DatatablesFilterBackend
 from rest_framework_datatables.pagination import DatatablesPageNumberPagination
 
 
-class ReferenceViewSet(ReadOnlyModelViewSet):
+class ReferenceViewSet(
+    FastListMixin, KeysetPaginationMixin, SparseFieldsetMixin, ReadOnlyModelViewSet
+):
+    """References. `?search=` finds the References with a word (of the first
+    author, authors, year or title) that starts with each word of the query,
+    e.g. `harr 1996`. It does not match within words, see catalogue.search."""
+
     queryset = Reference.objects.order_by("id")
     filter_backends = [
-        DatatablesFilterBackend,
-        SearchFilter,
+        CachedCountDatatablesFilterBackend,
+        SearchIndexFilter,
     ]
-    search_fields = ["first_author", "authors", "year", "title"]
+    # The words of first_author, authors, year and title, see catalogue.search
+    search_fields = ["pk"]
+    keyset_ordering_fields = ("id", "slug")
+
+    # The models that the responses are built from, see catalogue.conditional
+    change_models = (Reference,)
 
     # Make url parameter 'length' work for all renderers
     DatatablesPageNumberPagination.page_size_query_param = "length"
@@ -44,44 +110,83 @@ class ReferenceViewSet(ReadOnlyModelViewSet):
             return ReferenceDetailSerializer
         return ReferenceListSerializer  # head/create/destroy/update
 
-    @method_decorator(cache_page(4 * 3600))  # 4 hours
+    @method_decorator(condition_on(*change_models))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @method_decorator(condition_on(*change_models))
+    @method_decorator(cache_page_on(*change_models))
     def list(self, request, format=None):
         return super().list(request, format=format)
 
 
-class AstroObjectClassificationViewSet(ReadOnlyModelViewSet):
+class AstroObjectClassificationViewSet(SparseFieldsetMixin, ReadOnlyModelViewSet):
     queryset = AstroObjectClassification.objects.order_by("id")
     serializer_class = AstroObjectClassificationSerializer
     filter_backends = [
-        DatatablesFilterBackend,
+        CachedCountDatatablesFilterBackend,
         SearchFilter,
     ]
     search_fields = [
         "name",
     ]
 
+    # The models that the responses are built from, see catalogue.conditional
+    change_models = (AstroObjectClassification,)
+
     # Make url parameter 'length' work for all renderers
     DatatablesPageNumberPagination.page_size_query_param = "length"
 
-    @method_decorator(cache_page(4 * 3600))  # 4 hours
+    @method_decorator(condition_on(*change_models))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @method_decorator(condition_on(*change_models))
+    @method_decorator(cache_page_on(*change_models))
     def list(self, request, format=None):
         return super().list(request, format=format)
 
 
-class AstroObjectViewSet(ReadOnlyModelViewSet):
-    queryset = AstroObject.objects.prefetch_related(
-        "classifications",
-        "observations",
-        "observations__parameter",
-        "observations__reference",
-        "profiles",
-        "auxiliaries",
-    ).order_by("id")
+class AstroObjectViewSet(
+    FastListMixin, KeysetPaginationMixin, SparseFieldsetMixin, ReadOnlyModelViewSet
+):
+    """AstroObjects. `?search=` finds the AstroObjects with a word (of the name,
+    altname or classifications) that starts with each word of the query, e.g.
+    `ngc 104` finds NGC 104 and NGC 1040, but not NGC 6104, see
+    catalogue.search."""
+
+    queryset = AstroObject.objects.order_by("id")
     filter_backends = [
-        DatatablesFilterBackend,
-        SearchFilter,
+        CachedCountDatatablesFilterBackend,
+        SearchIndexFilter,
     ]
-    search_fields = ["name", "altname", "classifications__name"]
+    # The words of name, altname and classifications, see catalogue.search
+    search_fields = ["pk"]
+    keyset_ordering_fields = ("id", "name")
+    # The relations that the fields of the list and detail serializers consume.
+    # The Profiles (and their JSON arrays) and Auxiliaries are never loaded
+    field_prefetch_related = {
+        "classifications": ["classifications"],
+        "observations": [
+            Prefetch(
+                "observations",
+                queryset=Observation.objects.select_related("parameter").only(
+                    "astro_object",
+                    "parameter__name",
+                    "value",
+                    "sigma_up",
+                    "sigma_down",
+                ),
+            )
+        ],
+    }
+
+    # The models that the responses are built from, see catalogue.conditional
+    change_models = (AstroObject, AstroObjectClassification, Observation, Parameter)
+
+    # The limits of the uploads of the crossmatch action
+    max_crossmatch_rows = 100000
+    max_crossmatch_size = 10 * 1024 * 1024
 
     # Make url parameter 'length' work for all renderers
     DatatablesPageNumberPagination.page_size_query_param = "length"
@@ -93,29 +198,209 @@ class AstroObjectViewSet(ReadOnlyModelViewSet):
             return AstroObjectDetailSerializer
         return AstroObjectListSerializer  # head/create/destroy/update
 
-    @method_decorator(cache_page(4 * 3600))  # 4 hours
+    @method_decorator(condition_on(*change_models))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @method_decorator(condition_on(*change_models))
+    @method_decorator(cache_page_on(*change_models))
     def list(self, request, format=None):
         return super().list(request, format=format)
 
+    # The models that the cone search is built from
+    cone_change_models = (AstroObjectPosition, AstroObject, Reference)
 
-class ParameterViewSet(ReadOnlyModelViewSet):
+    @action(
+        detail=False,
+        renderer_classes=[JSONRenderer, BrowsableAPIRenderer, VOTableRenderer],
+    )
+    @method_decorator(condition_on(*cone_change_models))
+    @method_decorator(cache_page_on(*cone_change_models))
+    def cone(self, request, format=None):
+        """The AstroObjects within `radius` of (`ra`, `dec`), all in degrees
+        (J2000), ordered by separation. Use `?reference=<id|slug|bib_code>`
+        (comma-separated for multiple) to only use the positions of those
+        References, see catalogue.cone.
+
+        With `?format=votable` the response is an IVOA Simple Cone Search
+        VOTable, so `cone/?format=votable` is the base url of the service and
+        RA, DEC and SR are accepted as well."""
+
+        votable = request.accepted_renderer.format == "votable"
+        try:
+            ra, dec, radius = parse_cone(request.query_params)
+            references = self.get_cone_references()
+        except (ValueError, NotFound) as e:
+            if votable:
+                message = e.detail if isinstance(e, NotFound) else str(e)
+                return HttpResponse(
+                    cone_search_votable_error(message),
+                    content_type=VOTableRenderer.media_type,
+                )
+            if isinstance(e, NotFound):
+                raise
+            raise ValidationError({"detail": str(e)})
+
+        matches = cone_search(ra, dec, radius, references=references)
+        if votable:
+            return HttpResponse(
+                cone_search_votable(matches), content_type=VOTableRenderer.media_type
+            )
+        return Response(
+            {
+                "ra": ra,
+                "dec": dec,
+                "radius": radius,
+                "count": len(matches),
+                "results": [match._asdict() for match in matches],
+            }
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[AllowAny],
+        parser_classes=[MultiPartParser],
+        renderer_classes=[
+            JSONRenderer,
+            BrowsableAPIRenderer,
+            CSVRenderer,
+            FITSRenderer,
+            VOTableRenderer,
+        ],
+    )
+    def crossmatch(self, request, format=None):
+        """Match each position of an uploaded `file` (CSV, FITS or VOTable with
+        RA and Dec columns in degrees) with the nearest AstroObject within
+        `radius` degrees, see catalogue.crossmatch.
+
+        The format of the file is taken from its extension, or from
+        `input_format=csv|fits|votable`. Use `ra_column` and `dec_column` if
+        the columns are not recognized. With `?format=csv|fits|votable` the
+        response is the input table with the columns of the match added, and
+        `?reference=` limits the matches to the positions of those References.
+        The file can have up to `max_crossmatch_rows` positions, and
+        `max_crossmatch_size` bytes.
+        """
+
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": "Upload a CSV, FITS or VOTable file."})
+        if upload.size > self.max_crossmatch_size:
+            raise ValidationError(
+                {
+                    "file": "At most {0} MB at once.".format(
+                        self.max_crossmatch_size // (1024 * 1024)
+                    )
+                }
+            )
+        input_format = request.data.get("input_format") or CROSSMATCH_EXTENSIONS.get(
+            os.path.splitext(upload.name)[1].lower()
+        )
+        if input_format not in CROSSMATCH_FORMATS:
+            raise ValidationError(
+                {
+                    "input_format": "Choose from {0}".format(
+                        ", ".join(CROSSMATCH_FORMATS)
+                    )
+                }
+            )
+        try:
+            radius = float(request.data.get("radius", ""))
+        except ValueError:
+            radius = None
+        if radius is None or not 0 <= radius <= 180:
+            raise ValidationError({"radius": "A number of degrees in [0, 180]"})
+
+        references = self.get_cone_references()
+        try:
+            table, ra, dec = read_positions(
+                upload,
+                input_format,
+                ra_column=request.data.get("ra_column") or None,
+                dec_column=request.data.get("dec_column") or None,
+                max_rows=self.max_crossmatch_rows,
+            )
+        except ValueError as e:
+            raise ValidationError({"file": str(e)})
+        matches = crossmatch_table(table, ra, dec, radius, references=references)
+
+        format = request.accepted_renderer.format
+        if format in CROSSMATCH_FORMATS:
+            content_type, extension, astropy_format = CROSSMATCH_FORMATS[format]
+            response = HttpResponse(
+                write_table(matches, format), content_type=content_type
+            )
+            response["Content-Disposition"] = 'attachment; filename="{0}"'.format(
+                "supaharris_crossmatch." + extension
+            )
+            return response
+
+        results = crossmatch_records(matches, ra, dec)
+        return Response(
+            {
+                "radius": radius,
+                "count": len(results),
+                "matched": sum(r["match_id"] is not None for r in results),
+                "results": results,
+            }
+        )
+
+    def get_cone_references(self):
+        values = [
+            v.strip()
+            for param in self.request.query_params.getlist("reference")
+            for v in param.split(",")
+            if v.strip()
+        ]
+        if not values:
+            return None
+
+        references = []
+        for value in values:
+            reference = find_reference(value)
+            if reference is None:
+                raise NotFound("Reference '{0}' not found.".format(value))
+            references.append(reference)
+        return references
+
+
+class ParameterViewSet(FastListMixin, SparseFieldsetMixin, ReadOnlyModelViewSet):
     queryset = Parameter.objects.order_by("id")
     serializer_class = ParameterSerializer
     filter_backends = [
-        DatatablesFilterBackend,
+        CachedCountDatatablesFilterBackend,
         SearchFilter,
     ]
     search_fields = ["name", "description"]
 
+    # The models that the responses are built from, see catalogue.conditional
+    change_models = (Parameter,)
+
     # Make url parameter 'length' work for all renderers
     DatatablesPageNumberPagination.page_size_query_param = "length"
 
-    @method_decorator(cache_page(4 * 3600))  # 4 hours
+    @method_decorator(condition_on(*change_models))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @method_decorator(condition_on(*change_models))
+    @method_decorator(cache_page_on(*change_models))
     def list(self, request, format=None):
         return super().list(request, format=format)
 
 
-class ObservationViewSet(ReadOnlyModelViewSet):
+class ObservationViewSet(
+    FastListMixin, KeysetPaginationMixin, SparseFieldsetMixin, ReadOnlyModelViewSet
+):
+    """Observations, with the AstroObject, Parameter and Reference of each row
+    nested. Use `?include=astro_object,parameter,reference` to get their ids
+    instead, and each of them once in the 'included' map of the response.
+
+    `?search=` finds the Observations of which each word of the query starts a
+    word of the value, of the AstroObject or of the Parameter, e.g.
+    `47 tuc fe`. It does not match within words, see catalogue.search."""
+
     queryset = (
         Observation.objects.select_related(
             "parameter",
@@ -129,110 +414,348 @@ class ObservationViewSet(ReadOnlyModelViewSet):
     )
     serializer_class = ObservationSerializer
     filter_backends = [
-        DatatablesFilterBackend,
-        SearchFilter,
+        CachedCountDatatablesFilterBackend,
+        SearchIndexFilter,
         DjangoFilterBackend,
     ]
-    search_fields = [
-        "astro_object__name",
-        "parameter__name",
-        "value",
-        # "reference__author", "reference__year", "reference__title",
-    ]
-    filterset_fields = ("astro_object", "parameter", "reference")
+    # The words of the value, the AstroObject and the Parameter, see
+    # catalogue.search
+    search_fields = ["pk", "astro_object", "parameter"]
+    filterset_class = ObservationFilter
+    field_select_related = {
+        "astro_object": ["astro_object"],
+        "parameter": ["parameter"],
+        "reference": ["reference"],
+    }
+    field_prefetch_related = {"astro_object": ["astro_object__classifications"]}
+
+    # The models that the responses are built from, see catalogue.conditional
+    change_models = (
+        Observation,
+        AstroObject,
+        AstroObjectClassification,
+        Parameter,
+        Reference,
+    )
 
     # Make url parameter 'length' work for all renderers
     DatatablesPageNumberPagination.page_size_query_param = "length"
 
-    @method_decorator(cache_page(4 * 3600))  # 4 hours
+    # ?include= serializers of the related instances, by field name
+    included_serializers = {
+        "astro_object": (AstroObject, AstroObjectIncludedSerializer),
+        "parameter": (Parameter, ParameterIncludedSerializer),
+        "reference": (Reference, ReferenceIncludedSerializer),
+    }
+
+    def get_include(self):
+        include = [
+            v.strip()
+            for param in self.request.query_params.getlist("include")
+            for v in param.split(",")
+            if v.strip()
+        ]
+        unknown = [v for v in include if v not in self.included_serializers]
+        if unknown:
+            raise ValidationError(
+                {
+                    "include": "Unknown field(s) {0}, choose from {1}".format(
+                        ", ".join(unknown), ", ".join(self.included_serializers)
+                    )
+                }
+            )
+        return include
+
+    @method_decorator(condition_on(*change_models))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @method_decorator(condition_on(*change_models))
+    @method_decorator(cache_page_on(*change_models))
     def list(self, request, format=None):
+        include = self.get_include()
+        if include and request.accepted_renderer.format != "datatables":
+            return self.list_sideloaded(request, include)
         return super().list(request, format=format)
 
+    def list_sideloaded(self, request, include):
+        """The Observations with the ids of their related instances, plus an
+        'included' map of the requested related instances by id, such that
+        each AstroObject, Parameter and Reference is serialized only once"""
+
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.select_related(None).prefetch_related(None)
+        page = self.paginate_queryset(queryset)
+        observations = page if page is not None else list(queryset)
+        data = ObservationSideloadSerializer(
+            observations, many=True, context=self.get_serializer_context()
+        ).data
+
+        included = dict()
+        for field in include:
+            model, serializer_class = self.included_serializers[field]
+            ids = {getattr(o, field + "_id") for o in observations}
+            instances = model.objects.filter(id__in=ids).order_by("id")
+            if model is AstroObject:
+                instances = instances.prefetch_related("classifications")
+            included[field] = {
+                item["id"]: item
+                for item in serializer_class(
+                    instances, many=True, context=self.get_serializer_context()
+                ).data
+            }
 
-class ObservationTable(object):
-    def __init__(self, row, **kwargs):
-        for k, v in row.items():
-            setattr(self, k, v)
+        if page is None:
+            return Response({"results": data, "included": included})
+        response = self.get_paginated_response(data)
+        response.data["included"] = included
+        return response
+
+    @action(
+        detail=False,
+        renderer_classes=[CSVRenderer, NDJSONRenderer, ParquetRenderer, ArrowRenderer],
+    )
+    def export(self, request, format=None):
+        """Stream all Observations that match the filters as flat rows, one
+        line per Observation. Use `?format=csv` (default) or `?format=ndjson`,
+        or `?format=parquet|arrow` if pyarrow is installed"""
+
+        format = request.accepted_renderer.format
+        observations = self.filter_queryset(self.get_queryset())
+        if format in ARROW_FORMATS:
+            content_type, extension = ARROW_FORMATS[format]
+            try:
+                content = stream_observations(observations, format=format)
+            except ArrowNotInstalled as e:
+                raise NotAcceptable(str(e))
+        else:
+            content_type, extension, stream = EXPORT_FORMATS[format]
+            content = stream(export_rows(observations))
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = 'attachment; filename="{0}"'.format(
+            "supaharris_observations." + extension
+        )
+        return response
 
 
 class ObservationTableViewset(ViewSet):
+    """AstroObject x Parameter table of the Observations of a Reference.
+
+    Use `?reference=<id|slug|bib_code>` to select the Reference, defaults to
+    Harris (1996, 2010 ed.). Multiple references can be given comma-separated
+    or by repeating the parameter, in which case each row has a 'reference'
+    column with the slug of the Reference that the row belongs to.
+
+    With `?format=datatables` the table is paged, sorted and searched
+    server-side. The rows are then lists ordered as the column schema that is
+    available at `columns/`, so DataTables columns must use `data: <index>`.
+
+    The full table can be downloaded as binary FITS or VOTable at
+    `export/?format=fits|votable`, see catalogue.export, or as Parquet or
+    Arrow at `export/?format=parquet|arrow` if pyarrow is installed."""
+
     permission_classes = [AllowAny]
     serializer_class = ObservationTableSerializer
     filter_backends = [
-        DatatablesFilterBackend,
-        DjangoFilterBackend,
+        DatatablesRowsFilterBackend,
     ]
-    filterset_fields = ("reference",)
-
-    def list(self, request):
-        data = {}
+    pagination_class = DatatablesPageNumberPagination
+    default_reference_bib_code = "1996AJ....112.1487H"
+
+    # The models that the responses are built from, see catalogue.conditional.
+    # ObservationTableRow changes on its own with refresh_observation_tables
+    change_models = (
+        AstroObject,
+        Observation,
+        ObservationTableRow,
+        Parameter,
+        Reference,
+    )
 
-        h96 = Reference.objects.get(bib_code="1996AJ....112.1487H")
-        relevant_observations = (
-            Observation.objects.filter(
-                reference=h96,
-            )
-            .select_related(
-                "parameter",
-                "reference",
-                "astro_object",
+    def get_references(self):
+        values = [
+            v.strip()
+            for param in self.request.query_params.getlist("reference")
+            for v in param.split(",")
+            if v.strip()
+        ]
+        if not values:
+            return list(
+                Reference.objects.filter(bib_code=self.default_reference_bib_code)
             )
-            .prefetch_related(
-                "astro_object__classifications",
-            )
-            .order_by("id")
+
+        references = []
+        for value in values:
+            reference = find_reference(value)
+            if reference is None:
+                raise NotFound("Reference '{0}' not found.".format(value))
+            if reference not in references:
+                references.append(reference)
+        return references
+
+    def get_columns(self, references):
+        columns = [{"name": "name", "unit": ""}]
+        if len(references) > 1:
+            columns.append({"name": "reference", "unit": ""})
+        for reference in references:
+            for column in get_observation_table_columns(reference)[1:]:
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+    @action(detail=False)
+    @method_decorator(condition_on(*change_models))
+    def columns(self, request):
+        return Response({"columns": self.get_columns(self.get_references())})
+
+    @action(
+        detail=False,
+        renderer_classes=[
+            FITSRenderer,
+            VOTableRenderer,
+            ParquetRenderer,
+            ArrowRenderer,
+        ],
+    )
+    def export(self, request, format=None):
+        references = self.get_references()
+        if not references:
+            raise NotFound("No Reference selected.")
+        format = request.accepted_renderer.format
+        try:
+            path = get_observation_table_file(references, format=format)
+        except ArrowNotInstalled as e:
+            raise NotAcceptable(str(e))
+        return FileResponse(
+            open(path, "rb"),
+            as_attachment=True,
+            filename=os.path.basename(path),
+            content_type=request.accepted_renderer.media_type,
         )
 
-        parameters = (
-            relevant_observations.order_by("parameter__id")
-            .values("parameter__id", "parameter__name")
-            .distinct()
+    @method_decorator(condition_on(*change_models))
+    def list(self, request):
+        references = self.get_references()
+        columns = self.get_columns(references)
+        if request.accepted_renderer.format == "datatables":
+            return self.list_datatables(request, references, columns)
+
+        serializer_class = get_observation_table_serializer(
+            tuple(column["name"] for column in columns)
+        )
+        rows = self.get_rows(references)
+        serializer = serializer_class(instance=rows, many=True)
+        return Response(
+            {
+                "count": len(rows),
+                "next": None,
+                "previous": None,
+                "results": serializer.data,
+            }
         )
-        parameter_names = [p["parameter__name"] for p in parameters]
-        print("This reference has {0} parameters".format(parameters.count()))
 
-        astro_objects = (
-            relevant_observations.order_by("astro_object__id")
-            .values("astro_object__id", "astro_object__name")
-            .distinct()
+    def get_rows(self, references):
+        with_reference = len(references) > 1
+
+        rows = []
+        for reference in references:
+            table = get_observation_table(reference)
+            if with_reference:
+                table = [dict(row, reference=reference.slug) for row in table]
+            rows += table
+        return rows
+
+    def list_datatables(self, request, references, columns):
+        # The rows as lists in the order of the columns, see CachedTable
+        keys = [column["name"] for column in columns]
+        table = CachedTable(
+            (
+                [reference.pk for reference in references],
+                keys,
+                get_change_markers(*self.change_models),
+            ),
+            lambda: (
+                [row.get(key, None) for key in keys]
+                for row in self.get_rows(references)
+            ),
         )
-        print("This reference has {0} astro_objects".format(astro_objects.count()))
+        backend = self.filter_backends[0]()
+        indices = backend.filter_table(request, table, self)
 
-        import numpy
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(indices, request, view=self)
+        if page is None:  # length=-1, i.e. "All"
+            return Response(table.get_rows(indices))
+        return paginator.get_paginated_response(table.get_rows(page))
 
-        observations_array = numpy.array(
-            relevant_observations.order_by("id").values_list(
-                "astro_object__id", "parameter__id", "value", "sigma_up", "sigma_down"
-            )
+
+class NameResolverViewSet(ViewSet):
+    """Resolve `?name=` to an AstroObject. Any style of the designation is
+    found, e.g. `NGC 104`, `ngc104` or `47 Tuc`, see catalogue.names. The
+    match is 'exact' if the name is the name or altname of the AstroObject,
+    and 'variant' if it is found after normalization.
+
+    POST `{"names": [...]}` to resolve up to `max_names` names at once. Names
+    that are not found are then matched approximately, with match 'fuzzy'
+    and a score (0-100), unless `"fuzzy": false` is posted as well."""
+
+    permission_classes = [AllowAny]
+    max_names = 1000
+
+    @method_decorator(condition_on(AstroObject))
+    def list(self, request, format=None):
+        name = request.query_params.get("name", "").strip()
+        if not name:
+            raise ValidationError({"name": "This query parameter is required."})
+
+        index = get_name_index()
+        match = index.resolve(name)
+        if match is None:
+            raise NotFound("No AstroObject named '{0}'.".format(name))
+        pk, match_type = match
+        astro_object_name, slug = index.describe(pk)
+        return Response(
+            {
+                "query": name,
+                "id": pk,
+                "name": astro_object_name,
+                "slug": slug,
+                "match": match_type,
+            }
         )
-        print("This reference has {0} observations".format(len(observations_array)))
-
-        dtype = [("name", "|U16")] + [(p_name, "|U16") for p_name in parameter_names]
-        observations = numpy.empty(astro_objects.count(), dtype=dtype)
-        for i, ao in enumerate(astro_objects):
-            observations[i]["name"] = ao["astro_object__name"]
-            for j, p in enumerate(parameters):
-                (has_obs,) = numpy.where(
-                    (observations_array[:, 0] == ao["astro_object__id"])
-                    & (observations_array[:, 1] == p["parameter__id"])
-                )
-                if (
-                    len(has_obs) == 1
-                ):  # TODO: handle multiple observations of same cluster/parameter
-                    observations[i][p["parameter__name"]] = observations_array[
-                        has_obs, 2
-                    ][0]
-
-            data[i] = ObservationTable(
-                row={k: v for k, v in zip(["name"] + parameter_names, observations[i])}
+
+    def create(self, request, format=None):
+        names = request.data.get("names")
+        if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+            raise ValidationError({"names": "A list of names is required."})
+        if len(names) > self.max_names:
+            raise ValidationError(
+                {"names": "At most {0} names at once.".format(self.max_names)}
             )
+        fuzzy = request.data.get("fuzzy", True) not in (False, "false", "0")
+
+        index = get_name_index()
+        results = []
+        for name in names:
+            result = dict.fromkeys(("id", "name", "slug", "match", "score"))
+            result["query"] = name
+            match = index.resolve(name.strip())
+            if match is not None:
+                result["id"], result["match"] = match
+                result["score"] = 100
+            elif fuzzy:
+                match = index.fuzzy_match(name)
+                if match is not None:
+                    result["id"], result["score"] = match
+                    result["match"] = FUZZY
+            if result["id"] is not None:
+                result["name"], result["slug"] = index.describe(result["id"])
+            results.append(result)
 
-        serializer = ObservationTableSerializer(instance=data, many=True)
         return Response(
             {
-                "count": len(data),
-                "next": None,
-                "previous": None,
-                "results": serializer.data,
+                "count": len(results),
+                "resolved": sum(r["id"] is not None for r in results),
+                "results": results,
             }
         )
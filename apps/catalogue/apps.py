@@ -5,3 +5,6 @@ from django.apps import AppConfig
 
 class CatalogueConfig(AppConfig):
     name = "catalogue"
+
+    def ready(self):
+        import catalogue.signals  # noqa: F401 (connects the signal receivers)
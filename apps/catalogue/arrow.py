@@ -0,0 +1,270 @@
+"""Parquet and Arrow IPC export of Observations, observation tables and Profiles.
+
+pyarrow is an optional dependency (see requirements-optional.txt), so it is
+only imported when one of these exports is requested, and import_pyarrow()
+raises ArrowNotInstalled if it is missing.
+
+The Observations and Profiles are read in chunks with values_list().iterator()
+and written as one record batch (Parquet: one row group) per chunk, which is
+sent to the client as soon as it is written. The astro_object, parameter, unit
+and reference columns are dictionary encoded. Their dictionaries are built once
+from the (small) AstroObject, Parameter and Reference tables, such that every
+batch shares the same dictionary as the Arrow IPC file format requires.
+"""
+
+import numpy
+from catalogue.export import EXPORT_CHUNK_SIZE, chunked
+from catalogue.models import AstroObject, Parameter, Reference, parse_float
+from django.core.exceptions import ImproperlyConfigured
+
+ARROW_FORMATS = {
+    # format: (content type, file extension)
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+}
+
+
+class ArrowNotInstalled(ImproperlyConfigured):
+    pass
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ArrowNotInstalled(
+            "The Parquet and Arrow exports require pyarrow, but it is not "
+            "installed. Use 'pip install -r requirements-optional.txt'"
+        )
+    return pyarrow
+
+
+class ChunkSink(object):
+    """Write-only file-like object for the pyarrow writers. The bytes that were
+    written since the last call to drain() are returned by it"""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_batches(schema, batches, format):
+    """Write the record batches as Parquet or Arrow IPC file, and yield the
+    encoded bytes after each batch"""
+
+    pyarrow = import_pyarrow()
+    sink = ChunkSink()
+    if format == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    else:
+        writer = pyarrow.ipc.new_file(sink, schema)
+
+    for batch in batches:
+        if format == "parquet":  # one row group per batch
+            writer.write_table(pyarrow.Table.from_batches([batch], schema=schema))
+        else:
+            writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+class Dictionary(object):
+    """ Dictionary encoding of a model's ids to its (names, ...) """
+
+    def __init__(self, queryset, *fields):
+        rows = list(queryset.order_by("id").values_list("id", *fields))
+        ids = numpy.array([row[0] for row in rows], dtype=numpy.int64)
+        self.index = numpy.full(ids.max() + 1 if len(ids) else 1, -1, dtype=numpy.int32)
+        self.index[ids] = numpy.arange(len(ids), dtype=numpy.int32)
+        self.values = {
+            field: [row[1 + k] for row in rows] for k, field in enumerate(fields)
+        }
+
+    def encode(self, pyarrow, ids, field):
+        indices = pyarrow.array(self.index[numpy.asarray(ids, dtype=numpy.int64)])
+        dictionary = pyarrow.array(self.values[field], type=pyarrow.string())
+        return pyarrow.DictionaryArray.from_arrays(indices, dictionary)
+
+
+def dictionary_type(pyarrow):
+    return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+
+
+OBSERVATION_FIELDS = (
+    "id",
+    "astro_object_id",
+    "parameter_id",
+    "reference_id",
+    "value",
+    "sigma_up",
+    "sigma_down",
+    "value_numeric",
+    "sigma_up_numeric",
+    "sigma_down_numeric",
+)
+
+
+def stream_observations(observations, format="parquet", chunk_size=EXPORT_CHUNK_SIZE):
+    pyarrow = import_pyarrow()
+    astro_objects = Dictionary(AstroObject.objects.all(), "name")
+    parameters = Dictionary(Parameter.objects.all(), "name", "unit")
+    references = Dictionary(Reference.objects.all(), "bib_code")
+
+    schema = pyarrow.schema(
+        [
+            ("id", pyarrow.int64()),
+            ("astro_object", dictionary_type(pyarrow)),
+            ("parameter", dictionary_type(pyarrow)),
+            ("unit", dictionary_type(pyarrow)),
+            ("reference", dictionary_type(pyarrow)),
+            ("value", pyarrow.string()),
+            ("sigma_up", pyarrow.string()),
+            ("sigma_down", pyarrow.string()),
+            ("value_numeric", pyarrow.float64()),
+            ("sigma_up_numeric", pyarrow.float64()),
+            ("sigma_down_numeric", pyarrow.float64()),
+        ]
+    )
+
+    rows = (
+        observations.select_related(None)
+        .prefetch_related(None)
+        .values_list(*OBSERVATION_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    def batches():
+        for chunk in chunked(rows, chunk_size):
+            columns = dict(zip(OBSERVATION_FIELDS, zip(*chunk)))
+            yield pyarrow.RecordBatch.from_arrays(
+                [
+                    pyarrow.array(columns["id"], type=pyarrow.int64()),
+                    astro_objects.encode(pyarrow, columns["astro_object_id"], "name"),
+                    parameters.encode(pyarrow, columns["parameter_id"], "name"),
+                    parameters.encode(pyarrow, columns["parameter_id"], "unit"),
+                    references.encode(pyarrow, columns["reference_id"], "bib_code"),
+                ]
+                + [
+                    pyarrow.array(columns[field], type=schema.field(field).type)
+                    for field in OBSERVATION_FIELDS[4:]
+                ],
+                schema=schema,
+            )
+
+    return stream_batches(schema, batches(), format)
+
+
+PROFILE_FIELDS = (
+    "id",
+    "astro_object_id",
+    "reference_id",
+    "x",
+    "y",
+    "y_sigma_up",
+    "y_sigma_down",
+    "x_description",
+    "y_description",
+)
+
+
+def float_list(values):
+    if values is None:
+        return None
+    return [parse_float(v) for v in values]
+
+
+def stream_profiles(profiles, format="parquet", chunk_size=100):
+    pyarrow = import_pyarrow()
+    astro_objects = Dictionary(AstroObject.objects.all(), "name")
+    references = Dictionary(Reference.objects.all(), "bib_code")
+
+    floats = pyarrow.list_(pyarrow.float64())
+    schema = pyarrow.schema(
+        [
+            ("id", pyarrow.int64()),
+            ("astro_object", dictionary_type(pyarrow)),
+            ("reference", dictionary_type(pyarrow)),
+            ("x", floats),
+            ("y", floats),
+            ("y_sigma_up", floats),
+            ("y_sigma_down", floats),
+            ("x_description", pyarrow.string()),
+            ("y_description", pyarrow.string()),
+        ]
+    )
+
+    rows = profiles.order_by("id").values_list(*PROFILE_FIELDS).iterator(chunk_size)
+
+    def batches():
+        for chunk in chunked(rows, chunk_size):
+            columns = dict(zip(PROFILE_FIELDS, zip(*chunk)))
+            yield pyarrow.RecordBatch.from_arrays(
+                [
+                    pyarrow.array(columns["id"], type=pyarrow.int64()),
+                    astro_objects.encode(pyarrow, columns["astro_object_id"], "name"),
+                    references.encode(pyarrow, columns["reference_id"], "bib_code"),
+                ]
+                + [
+                    pyarrow.array([float_list(v) for v in columns[f]], type=floats)
+                    for f in ("x", "y", "y_sigma_up", "y_sigma_down")
+                ]
+                + [
+                    pyarrow.array(columns[f], type=pyarrow.string())
+                    for f in ("x_description", "y_description")
+                ],
+                schema=schema,
+            )
+
+    return stream_batches(schema, batches(), format)
+
+
+def write_observation_table(table, path, format="parquet"):
+    """Write an astropy Table from catalogue.export.build_observation_table
+    as Parquet or Arrow IPC file. The unit and description of the columns are
+    stored as field metadata, and the reference column is dictionary encoded"""
+
+    pyarrow = import_pyarrow()
+    arrays, fields = [], []
+    for name in table.colnames:
+        column = table[name]
+        mask = numpy.ma.getmaskarray(column)
+        array = pyarrow.array(numpy.asarray(column), mask=mask)
+        if name == "reference":
+            array = array.dictionary_encode()
+        metadata = dict()
+        if column.unit is not None:
+            metadata["unit"] = column.unit.to_string()
+        if column.description:
+            metadata["description"] = column.description
+        arrays.append(array)
+        fields.append(pyarrow.field(name, array.type, metadata=metadata or None))
+    schema = pyarrow.schema(fields)
+    batch = pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+    with open(path, "wb") as f:
+        for data in stream_batches(schema, [batch], format):
+            f.write(data)
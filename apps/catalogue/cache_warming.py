@@ -0,0 +1,58 @@
+"""Warm the caches of the hottest pages after the data was (re)inserted.
+
+warm_caches() requests each url of settings.WARM_CACHES_URLS in-process,
+through the full middleware stack, such that the site-wide cache, the
+versioned cache of the API lists (catalogue.page_cache), the Bokeh map of
+the landing page and the observation tables (catalogue.pivot) are populated
+before the first visitor arrives. Requests are anonymous, i.e. they warm the
+pages as anonymous visitors get them, for the given host and scheme (both
+are part of the cache keys).
+
+Use the warm_caches management command, or --warm-caches of the add_*
+commands (see catalogue.utils.PrepareSupaHarrisDatabaseMixin).
+"""
+
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+from django.test import Client
+
+WarmedUrl = namedtuple("WarmedUrl", ["url", "status_code", "size", "seconds"])
+
+
+def warm_url(url, host, secure=False):
+    """ Request a url in-process, return its WarmedUrl """
+    client = Client(HTTP_HOST=host)
+    start = time.perf_counter()
+    response = client.get(url, secure=secure)
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    return WarmedUrl(url, response.status_code, size, time.perf_counter() - start)
+
+
+def _warm_url_in_thread(url, host, secure):
+    try:
+        return warm_url(url, host, secure)
+    finally:
+        # Every thread of the pool opens its own database connection
+        connections.close_all()
+
+
+def warm_caches(urls, host, secure=False, workers=2):
+    """Request the urls with at most 'workers' requests at a time, and yield
+    their WarmedUrl in the order of the urls. With a single worker the urls
+    are requested one by one in the current thread"""
+
+    if workers <= 1:
+        for url in urls:
+            yield warm_url(url, host, secure)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(
+            lambda url: _warm_url_in_thread(url, host, secure), urls
+        )
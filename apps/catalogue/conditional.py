@@ -0,0 +1,122 @@
+"""Conditional GET (ETag / Last-Modified) of the catalogue views.
+
+Every catalogue model has a change marker in the cache: the time and an
+opaque token of its most recent change, which the signals of
+catalogue.signals replace on every save, delete or m2m change of the edited
+models. The derived tables (e.g. AstroObjectPosition) touch their own marker
+when they are refreshed, and no other. Reading the markers costs one cache
+lookup and no queries. A marker that is not in the
+cache (yet, or anymore) is started as 'changed now', which can only cause a
+superfluous 200. With the dummy cache of the development settings every
+response is therefore a 200.
+
+condition_on(*models) is django.views.decorators.http.condition() with a
+strong ETag of the request and the change markers of the models that the
+response is built from, and with their most recent change as Last-Modified.
+A request with a matching If-None-Match (or a recent enough
+If-Modified-Since) is answered with 304 Not Modified before the queryset is
+evaluated and serialized. If-None-Match takes precedence, If-Modified-Since
+is ignored when both are sent.
+
+Last-Modified has a resolution of one second, so a client that only sends
+If-Modified-Since would get a stale 304 after a second change within the
+second of its copy. Last-Modified is therefore not sent while the most recent
+change is less than LAST_MODIFIED_DELAY old; the ETag always is. The HTML detail pages derive their ETag from the
+date_updated of the instance instead, see condition_on_instance().
+
+The ETag covers the host, the full path (including ?format= and the other
+query parameters), the Accept header and the user of the request, because
+each of them changes the content of the response. Last-Modified cannot, so
+it is only sent for the API, and the HTML pages only send an ETag.
+"""
+
+import datetime
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+CHANGE_MARKER_KEY = "catalogue:changed:{0}"
+# The age of the most recent change before it is sent as Last-Modified
+LAST_MODIFIED_DELAY = datetime.timedelta(seconds=1)
+
+
+def new_change_marker():
+    return (timezone.now(), uuid.uuid4().hex)
+
+
+def get_change_markers(*models):
+    """ Return (time, token) of the most recent change of each of the models """
+
+    keys = [CHANGE_MARKER_KEY.format(model._meta.label_lower) for model in models]
+    markers = cache.get_many(keys)
+    for key in keys:
+        if key not in markers:
+            marker = new_change_marker()
+            if not cache.add(key, marker, None):  # another request was first
+                marker = cache.get(key, marker)
+            markers[key] = marker
+    return [markers[key] for key in keys]
+
+
+def touch_change_marker(model):
+    """ Mark a model as changed now, see catalogue.signals """
+    key = CHANGE_MARKER_KEY.format(model._meta.label_lower)
+    cache.set(key, new_change_marker(), None)
+
+
+def get_etag(request, *markers):
+    user = getattr(request, "user", None)
+    content = (
+        request.get_host(),
+        request.get_full_path(),
+        request.META.get("HTTP_ACCEPT", ""),
+        getattr(user, "pk", None),
+        markers,
+    )
+    return hashlib.md5(repr(content).encode("utf-8")).hexdigest()
+
+
+def condition_on(*models, last_modified=True):
+    """Decorator of a view whose response only changes when one of the models
+    changes. Use method_decorator() for the methods of a (DRF) view"""
+
+    def get_markers(request):
+        # Both functions are called for every request, look up the markers once
+        if not hasattr(request, "_change_markers"):
+            request._change_markers = get_change_markers(*models)
+        return request._change_markers
+
+    def etag_func(request, *args, **kwargs):
+        return get_etag(request, *get_markers(request))
+
+    def last_modified_func(request, *args, **kwargs):
+        last_modified = max(time for time, token in get_markers(request))
+        if timezone.now() - last_modified < LAST_MODIFIED_DELAY:
+            return None  # Not (yet) distinguishable from the next change
+        return last_modified
+
+    return condition(
+        etag_func=etag_func,
+        last_modified_func=last_modified_func if last_modified else None,
+    )
+
+
+def condition_on_instance(model, lookup="slug"):
+    """Decorator of a detail view of a model instance whose page only shows
+    the fields of the instance itself: the ETag is derived from the
+    date_updated of the instance that the url kwarg 'lookup' refers to"""
+
+    def etag_func(request, *args, **kwargs):
+        date_updated = (
+            model._default_manager.filter(**{lookup: kwargs[lookup]})
+            .values_list("date_updated", flat=True)
+            .first()
+        )
+        if date_updated is None:
+            return None  # Let the view answer 404
+        return get_etag(request, date_updated)
+
+    return condition(etag_func=etag_func)
@@ -0,0 +1,280 @@
+"""Cone search of the AstroObjects by their RA and Dec Observations.
+
+Spatial index
+-------------
+The positions are stored in AstroObjectPosition, one row per (Reference,
+AstroObject) that has both an RA and a Dec Observation, with the unit vector
+(x, y, z) of the position. A cone of radius r around (ra, dec) is then
+
+- a range scan of the index on z = sin(dec), limited to the band of
+  declinations [dec - r, dec + r] that the cone spans, and
+- the exact test x * x0 + y * y0 + z * z0 >= cos(r) of the rows in that band,
+
+so the cost scales with the number of objects in the band rather than with
+the number of Observations. The separations are computed from the chord
+between the unit vectors, which is accurate for small angles as well.
+
+The rows are refreshed when an RA or Dec Observation is saved or deleted, see
+catalogue.signals. Observation.objects.bulk_create does not send signals, so
+run `python manage.py refresh_observation_tables` after a bulk ingest, which
+rebuilds the positions too.
+
+IVOA Simple Cone Search
+-----------------------
+cone_search_votable() renders the matches as the VOTable of the Simple Cone
+Search standard (v1.03): the parameters may be given as RA, DEC and SR (all in
+degrees), and errors are a VOTable with an INFO named 'Error'.
+"""
+
+import io
+import math
+from collections import namedtuple
+
+from astropy.io.votable.tree import Info, VOTableFile
+from astropy.table import Table
+from catalogue.conditional import touch_change_marker
+from catalogue.models import AstroObjectPosition, Observation, Parameter
+from django.core.cache import cache
+from django.db.models import ExpressionWrapper, F, FloatField
+
+POSITION_PARAMETERS = ("RA", "Dec")
+POSITION_PARAMETERS_KEY = "catalogue:position_parameters"
+
+# (query parameter, Simple Cone Search parameter) of the cone
+CONE_PARAMETERS = (("ra", "RA"), ("dec", "DEC"), ("radius", "SR"))
+
+ConeMatch = namedtuple(
+    "ConeMatch", ["id", "name", "slug", "reference", "ra", "dec", "separation"]
+)
+
+
+def unit_vector(ra, dec):
+    """ Return the unit vector (x, y, z) of a position in degrees """
+    ra, dec = math.radians(ra), math.radians(dec)
+    return (
+        math.cos(dec) * math.cos(ra),
+        math.cos(dec) * math.sin(ra),
+        math.sin(dec),
+    )
+
+
+def separation(v, w):
+    """ Return the angle between the unit vectors v and w in degrees """
+    chord = math.sqrt(sum((a - b) ** 2 for a, b in zip(v, w)))
+    return math.degrees(2 * math.asin(min(1.0, chord / 2)))
+
+
+def position_fields(ra, dec):
+    """Return the fields of the AstroObjectPosition of (ra, dec) in degrees,
+    or None if it is not a position on the sky"""
+
+    if ra is None or dec is None or not -90 <= dec <= 90:
+        return None
+    ra = ra % 360
+    x, y, z = unit_vector(ra, dec)
+    return {"ra": ra, "dec": dec, "x": x, "y": y, "z": z}
+
+
+def get_position_parameter_ids():
+    """Return the (cached) ids of the RA and Dec Parameters, an empty tuple if
+    either does not exist"""
+
+    ids = cache.get(POSITION_PARAMETERS_KEY)
+    if ids is None:
+        ids = dict(
+            Parameter.objects.filter(name__in=POSITION_PARAMETERS).values_list(
+                "name", "id"
+            )
+        )
+        ids = tuple(ids[name] for name in POSITION_PARAMETERS if name in ids)
+        if len(ids) != len(POSITION_PARAMETERS):
+            ids = ()
+        cache.set(POSITION_PARAMETERS_KEY, ids, None)
+    return ids
+
+
+def invalidate_position_parameter_ids():
+    cache.delete(POSITION_PARAMETERS_KEY)
+
+
+def refresh_astro_object_position(reference_id, astro_object_id):
+    """Rebuild the AstroObjectPosition of a single (Reference, AstroObject),
+    and delete it if it does not have both an RA and a Dec Observation"""
+
+    fields = None
+    ids = get_position_parameter_ids()
+    if ids:
+        values = dict(
+            Observation.objects.filter(
+                reference_id=reference_id,
+                astro_object_id=astro_object_id,
+                parameter_id__in=ids,
+            )
+            .order_by()
+            .values_list("parameter_id", "value_numeric")
+        )
+        fields = position_fields(*(values.get(pk) for pk in ids))
+
+    if fields is None:
+        deleted, _ = AstroObjectPosition.objects.filter(
+            reference_id=reference_id, astro_object_id=astro_object_id
+        ).delete()
+        if deleted:
+            touch_change_marker(AstroObjectPosition)
+        return None
+
+    position, created = AstroObjectPosition.objects.update_or_create(
+        reference_id=reference_id, astro_object_id=astro_object_id, defaults=fields
+    )
+    # The derived tables do not send catalogue.signals.catalogue_changed
+    touch_change_marker(AstroObjectPosition)
+    return position
+
+
+def refresh_astro_object_positions(references=None):
+    """Rebuild the AstroObjectPositions of the given References (all of them
+    if None) from scratch, e.g. after Observation.objects.bulk_create"""
+
+    positions = AstroObjectPosition.objects.all()
+    if references is not None:
+        positions = positions.filter(reference__in=references)
+    positions.delete()
+
+    invalidate_position_parameter_ids()
+    ids = get_position_parameter_ids()
+    if not ids:
+        touch_change_marker(AstroObjectPosition)
+        return 0
+
+    observations = Observation.objects.filter(parameter_id__in=ids)
+    if references is not None:
+        observations = observations.filter(reference__in=references)
+
+    values = dict()
+    for reference_id, astro_object_id, parameter_id, value in (
+        observations.order_by()
+        .values_list("reference_id", "astro_object_id", "parameter_id", "value_numeric")
+        .iterator()
+    ):
+        values.setdefault((reference_id, astro_object_id), dict())[parameter_id] = value
+
+    rows = []
+    for (reference_id, astro_object_id), row in values.items():
+        fields = position_fields(*(row.get(pk) for pk in ids))
+        if fields is not None:
+            rows.append(
+                AstroObjectPosition(
+                    reference_id=reference_id, astro_object_id=astro_object_id, **fields
+                )
+            )
+    AstroObjectPosition.objects.bulk_create(rows, batch_size=1000)
+    # bulk_create() does not send the signals that mark the positions as changed
+    touch_change_marker(AstroObjectPosition)
+    return len(rows)
+
+
+def parse_cone(query_params):
+    """Return (ra, dec, radius) in degrees of the query parameters ra, dec and
+    radius (or RA, DEC and SR), raise ValueError if they are invalid"""
+
+    cone = []
+    for name, scs_name in CONE_PARAMETERS:
+        value = query_params.get(name, query_params.get(scs_name))
+        if value in (None, ""):
+            raise ValueError("Parameter '{0}' is required".format(name))
+        try:
+            value = float(value)
+        except ValueError:
+            raise ValueError("Parameter '{0}' must be a number".format(name))
+        if not math.isfinite(value):
+            raise ValueError("Parameter '{0}' must be finite".format(name))
+        cone.append(value)
+
+    ra, dec, radius = cone
+    if not -90 <= dec <= 90:
+        raise ValueError("Parameter 'dec' must be in [-90, 90]")
+    if not 0 <= radius <= 180:
+        raise ValueError("Parameter 'radius' must be in [0, 180]")
+    return ra % 360, dec, radius
+
+
+def cone_search(ra, dec, radius, references=None):
+    """Return the ConeMatch of each AstroObject that lies within radius of
+    (ra, dec), all in degrees, ordered by separation. An AstroObject with a
+    position in multiple References matches with the nearest one, unless
+    references limits the positions to those of the given References"""
+
+    center = unit_vector(ra, dec)
+    positions = AstroObjectPosition.objects.order_by()
+    if references is not None:
+        positions = positions.filter(reference__in=references)
+    if radius < 180:
+        # The band of declinations that the cone spans, using the z index
+        z_min = math.sin(math.radians(max(-90.0, dec - radius)))
+        z_max = math.sin(math.radians(min(90.0, dec + radius)))
+        # The exact test, with some room for rounding; the separations are
+        # recomputed (and tested) below
+        dot = ExpressionWrapper(
+            F("x") * center[0] + F("y") * center[1] + F("z") * center[2],
+            output_field=FloatField(),
+        )
+        positions = positions.filter(z__gte=z_min - 1e-12, z__lte=z_max + 1e-12)
+        positions = positions.alias(dot=dot).filter(
+            dot__gte=math.cos(math.radians(radius)) - 1e-12
+        )
+
+    matches = dict()
+    for pk, name, slug, reference, ra, dec, *vector in positions.values_list(
+        "astro_object_id",
+        "astro_object__name",
+        "astro_object__slug",
+        "reference__slug",
+        "ra",
+        "dec",
+        "x",
+        "y",
+        "z",
+    ):
+        distance = separation(center, vector)
+        if distance > radius:
+            continue
+        if pk not in matches or distance < matches[pk].separation:
+            matches[pk] = ConeMatch(pk, name, slug, reference, ra, dec, distance)
+    return sorted(matches.values(), key=lambda match: (match.separation, match.id))
+
+
+def write_votable(votable):
+    output = io.BytesIO()
+    votable.to_xml(output)
+    return output.getvalue()
+
+
+def cone_search_votable(matches):
+    """ Return the VOTable document (bytes) of the ConeMatches """
+
+    table = Table(
+        rows=[
+            (m.name, m.ra, m.dec, m.separation, m.id, m.slug, m.reference)
+            for m in matches
+        ],
+        names=("name", "ra", "dec", "separation", "id", "slug", "reference"),
+        dtype=(str, float, float, float, int, str, str),
+    )
+    for name in ("ra", "dec", "separation"):
+        table[name].unit = "deg"
+
+    votable = VOTableFile.from_table(table)
+    fields = {field.name: field for field in votable.get_first_table().fields}
+    # The UCDs (version 1) that the Simple Cone Search requires
+    fields["name"].ucd = "ID_MAIN"
+    fields["ra"].ucd = "POS_EQ_RA_MAIN"
+    fields["dec"].ucd = "POS_EQ_DEC_MAIN"
+    return write_votable(votable)
+
+
+def cone_search_votable_error(message):
+    """ Return the VOTable document (bytes) of an error of the cone search """
+
+    votable = VOTableFile()
+    votable.infos.append(Info(ID="Error", name="Error", value=message))
+    return write_votable(votable)
@@ -0,0 +1,143 @@
+"""Cached and approximate row counts of the paginated list endpoints.
+
+Both the page number pagination and the DataTables filter backend count the
+rows of the (filtered) queryset for every page that is requested, which is an
+exact COUNT(*) over the joins of the filters. get_count() caches that count,
+keyed by the model and the SQL of the WHERE clause of the queryset, i.e. by
+the filters normalized to the conditions they compile to: the ordering,
+pagination, format and ?fields= parameters of the request, and the order of
+the query parameters, do not matter. The cached counts of all querysets are
+invalidated together when an instance of one of the edited catalogue models
+is saved or deleted (see catalogue.signals.catalogue_changed), but not by the
+tables that are derived from them.
+
+With settings.APPROXIMATE_COUNTS the count of an unfiltered table is read
+from the statistics of the database instead (pg_class.reltuples on
+PostgreSQL, information_schema.tables on MySQL/MariaDB and sqlite_stat1 on
+SQLite after an ANALYZE), if the estimate is at least
+settings.APPROXIMATE_COUNT_THRESHOLD rows. The estimate can be off by a few
+percent, so the last page(s) of a paginated table may be missing or empty.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+COUNT_CACHE_TIMEOUT = 4 * 3600  # 4 hours, invalidated by signals
+COUNT_CACHE_VERSION_KEY = "catalogue:count:version"
+
+
+def count_cache_key(queryset):
+    """Return the cache key of the count of a queryset, or None if the query
+    cannot be compiled (e.g. a filter on an empty list)"""
+
+    # The selected columns and the joins of select_related() or values() do not
+    # change the number of rows, the joins of the filters are implied by the
+    # tables that the WHERE clause refers to
+    query = queryset.query
+    compiler = query.get_compiler(queryset.db)
+    try:
+        sql, params = compiler.compile(query.where)
+    except EmptyResultSet:
+        return None
+    label = queryset.model._meta.label_lower
+    digest = hashlib.md5(
+        repr((label, query.distinct, sql, params)).encode("utf-8")
+    ).hexdigest()
+    version = cache.get(COUNT_CACHE_VERSION_KEY, 1)
+    return "catalogue:count:{0}:{1}".format(version, digest)
+
+
+def is_unfiltered(queryset):
+    query = queryset.query
+    return not (
+        query.where
+        or query.distinct
+        or query.is_sliced
+        or query.combinator
+        or query.group_by
+        or query.extra
+    )
+
+
+def estimate_count(model, using="default"):
+    """Return the number of rows of the table of a model according to the
+    statistics of the database, or None if there are none"""
+
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        "postgresql": (
+            "SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)",
+            [connection.ops.quote_name(table)],
+        ),
+        "mysql": (
+            "SELECT table_rows FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = %s",
+            [table],
+        ),
+        "sqlite": ("SELECT stat FROM sqlite_stat1 WHERE tbl = %s", [table]),
+    }
+    if connection.vendor not in queries:
+        return None
+
+    sql, params = queries[connection.vendor]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:  # e.g. sqlite_stat1 does not exist before ANALYZE
+        return None
+    if row is None or row[0] is None:
+        return None
+    try:
+        # The first number of an sqlite_stat1 'stat' is the number of rows
+        estimate = int(float(str(row[0]).split()[0]))
+    except (IndexError, ValueError):
+        return None
+    return estimate if estimate > 0 else None  # -1 or 0: never analyzed
+
+
+def get_count(queryset):
+    """Return the (cached) number of rows of a queryset, or an estimate for an
+    unfiltered table if settings.APPROXIMATE_COUNTS is True"""
+
+    if getattr(settings, "APPROXIMATE_COUNTS", False) and is_unfiltered(queryset):
+        estimate = estimate_count(queryset.model, using=queryset.db)
+        if estimate is not None and estimate >= getattr(
+            settings, "APPROXIMATE_COUNT_THRESHOLD", 0
+        ):
+            return estimate
+
+    key = count_cache_key(queryset)
+    if key is None:
+        return queryset.count()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def invalidate_counts():
+    """ Drop the cached counts of all querysets """
+    try:
+        cache.incr(COUNT_CACHE_VERSION_KEY)
+    except ValueError:  # the key does not exist (yet)
+        cache.set(COUNT_CACHE_VERSION_KEY, 2, None)
+
+
+class CachedCountPaginator(Paginator):
+    """ Paginator that counts its queryset with get_count() """
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        return get_count(self.object_list)
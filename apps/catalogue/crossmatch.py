@@ -0,0 +1,264 @@
+"""Positional cross-match of a list of positions against the catalogue.
+
+Every position is matched with the nearest AstroObjectPosition (see
+catalogue.cone) within a radius, using a scipy.spatial.cKDTree over the unit
+vectors of the positions. The Euclidean distance between unit vectors is the
+chord 2 * sin(separation / 2), so the nearest neighbour in the tree is the
+nearest position on the sky, and the radius is a distance_upper_bound of the
+query. The input positions are converted, queried and joined with the
+catalogue as numpy arrays, without a Python loop over the rows.
+
+The tree
+--------
+The tree of all positions (or of the positions of some References) is built
+once per worker process and kept in memory, for the POSITION_TREE_CACHE_SIZE
+most recently used sets of References. It is tagged with the change marker of
+AstroObjectPosition (see catalogue.conditional), and rebuilt on the first
+cross-match after the positions changed. With the dummy cache of the
+development settings the marker changes on every read, so there the tree is
+rebuilt for every cross-match.
+
+Input and output
+----------------
+read_positions() reads a CSV, FITS or VOTable with RA and Dec columns in
+degrees (J2000). crossmatch_table() returns an astropy Table with the input
+positions, their match (masked if there is none) and the separation, which
+can be written as CSV, FITS or VOTable with write_table().
+"""
+
+import io
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy
+from astropy.table import MaskedColumn, Table
+from catalogue.conditional import get_change_markers
+from catalogue.models import AstroObjectPosition
+from scipy.spatial import cKDTree
+
+# Case-insensitive column names of the RA and Dec of the input, in order of
+# preference
+RA_COLUMNS = ("ra", "raj2000", "ra_deg", "_raj2000", "ra_icrs")
+DEC_COLUMNS = ("dec", "dej2000", "dec_deg", "de", "_dej2000", "de_icrs", "dec_icrs")
+
+CROSSMATCH_FORMATS = {
+    # format: (content type, file extension, astropy format)
+    "csv": ("text/csv", "csv", "ascii.csv"),
+    "fits": ("application/fits", "fits", "fits"),
+    "votable": ("application/x-votable+xml", "xml", "votable"),
+}
+CROSSMATCH_EXTENSIONS = {
+    ".csv": "csv",
+    ".fits": "fits",
+    ".fit": "fits",
+    ".xml": "votable",
+    ".vot": "votable",
+}
+
+# The columns that crossmatch_table() adds to the input
+MATCH_COLUMNS = (
+    "match_id",
+    "match_name",
+    "match_slug",
+    "match_reference",
+    "match_ra",
+    "match_dec",
+    "separation",
+)
+
+PositionTree = namedtuple(
+    "PositionTree", ["token", "tree", "id", "name", "slug", "reference", "ra", "dec"]
+)
+
+# The number of trees that are kept per process, least recently used first
+POSITION_TREE_CACHE_SIZE = 8
+_trees = OrderedDict()
+_trees_lock = threading.Lock()
+
+
+def unit_vectors(ra, dec):
+    """ Return the (n, 3) unit vectors of arrays of positions in degrees """
+    ra, dec = numpy.radians(ra), numpy.radians(dec)
+    cos_dec = numpy.cos(dec)
+    return numpy.column_stack(
+        (cos_dec * numpy.cos(ra), cos_dec * numpy.sin(ra), numpy.sin(dec))
+    )
+
+
+def chord(separation):
+    """ Return the distance of unit vectors that are separation degrees apart """
+    return 2 * numpy.sin(numpy.radians(numpy.minimum(separation, 180)) / 2)
+
+
+def build_position_tree(token, references=None):
+    positions = AstroObjectPosition.objects.order_by()
+    if references is not None:
+        positions = positions.filter(reference__in=references)
+    rows = list(
+        positions.values_list(
+            "astro_object_id",
+            "astro_object__name",
+            "astro_object__slug",
+            "reference__slug",
+            "ra",
+            "dec",
+            "x",
+            "y",
+            "z",
+        )
+    )
+    columns = list(zip(*rows)) or [()] * 9
+    vectors = numpy.array(columns[6:], dtype=float).T.reshape(-1, 3)
+    return PositionTree(
+        token,
+        cKDTree(vectors),
+        numpy.array(columns[0], dtype=int),
+        numpy.array(columns[1], dtype=str),
+        numpy.array(columns[2], dtype=str),
+        numpy.array(columns[3], dtype=str),
+        numpy.array(columns[4], dtype=float),
+        numpy.array(columns[5], dtype=float),
+    )
+
+
+def get_position_tree(references=None):
+    """Return the PositionTree of all AstroObjectPositions, or of those of the
+    given References. The tree is kept in memory until the positions change"""
+
+    token = get_change_markers(AstroObjectPosition)[0][1]
+    key = None if references is None else tuple(sorted(r.pk for r in references))
+    with _trees_lock:
+        tree = _trees.pop(key, None)
+        if tree is None or tree.token != token:
+            tree = build_position_tree(token, references)
+        _trees[key] = tree
+        while len(_trees) > POSITION_TREE_CACHE_SIZE:
+            _trees.popitem(last=False)
+        return tree
+
+
+def crossmatch(ra, dec, radius, references=None):
+    """Return (index, separation, tree) of the nearest AstroObjectPosition
+    within radius of each of the positions ra, dec (arrays, all in degrees):
+    the index in the arrays of the PositionTree tree (-1 if there is no match)
+    and the separation in degrees (nan if there is no match)"""
+
+    tree = get_position_tree(references)
+    ra = numpy.asarray(ra, dtype=float)
+    dec = numpy.asarray(dec, dtype=float)
+    index = numpy.full(len(ra), -1, dtype=int)
+    separation = numpy.full(len(ra), numpy.nan)
+    valid = numpy.isfinite(ra) & numpy.isfinite(dec) & (numpy.abs(dec) <= 90)
+    if not len(tree.id) or not valid.any():
+        return index, separation, tree
+
+    # Slightly larger bound for rounding, the separation is tested below
+    distance, nearest = tree.tree.query(
+        unit_vectors(ra[valid], dec[valid]),
+        k=1,
+        distance_upper_bound=chord(radius) * (1 + 1e-9) + 1e-15,
+    )
+    found = numpy.isfinite(distance)
+    angle = numpy.degrees(2 * numpy.arcsin(numpy.minimum(distance[found] / 2, 1)))
+    within = angle <= radius
+
+    rows = numpy.flatnonzero(valid)[found][within]
+    index[rows] = nearest[found][within]
+    separation[rows] = angle[within]
+    return index, separation, tree
+
+
+def find_column(table, names, column=None):
+    if column is not None:
+        if column not in table.colnames:
+            raise ValueError("Column '{0}' not found".format(column))
+        return column
+    colnames = {name.lower(): name for name in table.colnames}
+    for name in names:
+        if name in colnames:
+            return colnames[name]
+    raise ValueError(
+        "No column named {0} found".format(" or ".join(repr(n) for n in names))
+    )
+
+
+def read_positions(file, format, ra_column=None, dec_column=None, max_rows=None):
+    """Return the astropy Table and the ra, dec arrays (degrees) of the
+    positions in a CSV, FITS or VOTable file (a path or file-like object).
+    Raise ValueError if the file cannot be read, or has more than max_rows"""
+
+    content_type, extension, astropy_format = CROSSMATCH_FORMATS[format]
+    if hasattr(file, "read"):
+        content = file.read()
+        if format == "csv":
+            # The ascii readers take the lines of a table
+            if isinstance(content, bytes):
+                content = content.decode("utf-8-sig")
+            file = content.splitlines()
+        else:
+            file = io.BytesIO(content)
+    try:
+        table = Table.read(file, format=astropy_format)
+    except Exception as e:
+        raise ValueError("Cannot read the {0} file: {1}".format(format, e))
+    if max_rows is not None and len(table) > max_rows:
+        raise ValueError("At most {0} positions at once".format(max_rows))
+
+    ra_column = find_column(table, RA_COLUMNS, ra_column)
+    dec_column = find_column(table, DEC_COLUMNS, dec_column)
+    try:
+        ra = numpy.ma.filled(numpy.ma.asarray(table[ra_column], dtype=float), numpy.nan)
+        dec = numpy.ma.filled(
+            numpy.ma.asarray(table[dec_column], dtype=float), numpy.nan
+        )
+    except (TypeError, ValueError):
+        raise ValueError("The RA and Dec must be numbers (in degrees)")
+    return table, ra, dec
+
+
+def crossmatch_table(table, ra, dec, radius, references=None):
+    """Return a copy of the input Table with the MATCH_COLUMNS of the match of
+    each row, masked where there is no match. The separation is in degrees"""
+
+    index, separation, tree = crossmatch(ra, dec, radius, references=references)
+    matched = index >= 0
+    # Where there is no match the masked values are taken from the first row
+    take = numpy.where(matched, index, 0)
+
+    output = Table(table, masked=True, copy=True)
+    columns = (
+        ("match_id", tree.id, None),
+        ("match_name", tree.name, None),
+        ("match_slug", tree.slug, None),
+        ("match_reference", tree.reference, None),
+        ("match_ra", tree.ra, "deg"),
+        ("match_dec", tree.dec, "deg"),
+    )
+    for name, values, unit in columns:
+        if not len(values):
+            values = numpy.zeros(1, dtype=values.dtype)
+        output[name] = MaskedColumn(values[take], mask=~matched, unit=unit)
+    output["separation"] = MaskedColumn(
+        numpy.where(matched, separation, 0), mask=~matched, unit="deg"
+    )
+    return output
+
+
+def crossmatch_records(table, ra, dec):
+    """Return the rows of a crossmatch_table() as dicts: the input ra and dec
+    and the match columns, which are None where there is no match"""
+
+    names = ("ra", "dec") + MATCH_COLUMNS
+    columns = [numpy.where(numpy.isfinite(v), v, None).tolist() for v in (ra, dec)]
+    columns += [numpy.ma.asarray(table[name]).tolist() for name in MATCH_COLUMNS]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def write_table(table, format):
+    """ Return the Table as a CSV, FITS or VOTable file (bytes) """
+
+    content_type, extension, astropy_format = CROSSMATCH_FORMATS[format]
+    output = io.StringIO() if format == "csv" else io.BytesIO()
+    table.write(output, format=astropy_format)
+    content = output.getvalue()
+    return content.encode("utf-8") if isinstance(content, str) else content
@@ -0,0 +1,275 @@
+"""Bulk export of Observations.
+
+Flat rows
+---------
+The rows are read with values_list().iterator(), so the Observations are never
+instantiated as model instances nor serialized one by one, and the memory used
+is independent of the number of rows. The stream_* generators encode the rows
+in chunks, to be wrapped in a StreamingHttpResponse.
+
+Tables
+------
+build_observation_table() converts the pivoted table of one or more References
+(see catalogue.pivot) into an astropy Table that can be written as binary FITS
+or VOTable. Columns of numeric Parameters are floats with the astropy unit of
+Parameter.unit, and the uncertainties are separate '<name>_sigma_up' and
+'<name>_sigma_down' columns. The files are written once to EXPORT_ROOT and
+served from disk until the Observations of the References change, see
+get_observation_table_file().
+"""
+
+import csv
+import glob
+import hashlib
+import json
+import os
+import re
+import tempfile
+import warnings
+
+import numpy
+from astropy import units
+from astropy.table import MaskedColumn, Table
+from astropy.utils.exceptions import AstropyWarning
+from catalogue.models import AstroObject, ObservationTableRow, Parameter, parse_float
+from catalogue.pivot import VALUE_FIELDS, load_observation_table
+from django.conf import settings
+from django.db.models import Count, Max
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (column name, lookup) of the exported rows
+EXPORT_COLUMNS = (
+    ("id", "id"),
+    ("astro_object", "astro_object__name"),
+    ("parameter", "parameter__name"),
+    ("value", "value"),
+    ("sigma_up", "sigma_up"),
+    ("sigma_down", "sigma_down"),
+    ("unit", "parameter__unit"),
+    ("reference", "reference__bib_code"),
+)
+EXPORT_COLUMN_NAMES = tuple(name for name, lookup in EXPORT_COLUMNS)
+
+
+def export_rows(observations, chunk_size=EXPORT_CHUNK_SIZE):
+    """ Iterate over the Observations as tuples ordered as EXPORT_COLUMNS """
+
+    return (
+        observations.select_related(None)
+        .prefetch_related(None)
+        .values_list(*(lookup for name, lookup in EXPORT_COLUMNS))
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def chunked(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Echo(object):
+    """ File-like object whose write() returns the value, for csv.writer """
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMN_NAMES)
+    for chunk in chunked(rows):
+        yield "".join(writer.writerow(row) for row in chunk)
+
+
+def stream_ndjson(rows):
+    encoder = json.JSONEncoder(ensure_ascii=False)
+    for chunk in chunked(rows):
+        yield "".join(
+            encoder.encode(dict(zip(EXPORT_COLUMN_NAMES, row))) + "\n" for row in chunk
+        )
+
+
+EXPORT_FORMATS = {
+    # format: (content type, file extension, generator)
+    "csv": ("text/csv", "csv", stream_csv),
+    "ndjson": ("application/x-ndjson", "ndjson", stream_ndjson),
+}
+
+
+EXPORT_TABLE_FORMATS = {
+    # format: (content type, file extension, astropy format)
+    "fits": ("application/fits", "fits", "fits"),
+    "votable": ("application/x-votable+xml", "xml", "votable"),
+    # Written by catalogue.arrow, requires the optional dependency pyarrow
+    "parquet": ("application/vnd.apache.parquet", "parquet", None),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow", None),
+}
+
+
+def table_column_name(parameter_name):
+    """ FITS and VOTable column names must be identifiers, e.g. [Fe/H] -> Fe_H """
+    return re.sub(r"[^A-Za-z0-9_]+", "_", parameter_name).strip("_") or "column"
+
+
+def table_column(cells, name, unit=None, description=None):
+    """Return a MaskedColumn of the (string) cells, masked where None. The
+    column is float if all values are numeric, and str otherwise"""
+
+    mask = numpy.array([v is None for v in cells], dtype=bool)
+    floats = [parse_float(v) for v in cells]
+    if all(f is not None for f, m in zip(floats, mask) if not m):
+        data = numpy.array([numpy.nan if f is None else f for f in floats])
+    else:
+        data = numpy.array(["" if v is None else str(v) for v in cells], dtype=str)
+        unit = None
+    return MaskedColumn(
+        data=data, name=name, mask=mask, unit=unit, description=description
+    )
+
+
+def build_observation_table(references):
+    """Return the AstroObject x Parameter table of the given References as an
+    astropy Table. With multiple References the rows of all References are
+    stacked and there is an extra 'reference' column with the bib_code"""
+
+    pivots = [
+        (reference, load_observation_table(reference)) for reference in references
+    ]
+    parameter_ids = sorted({pk for r, pivot in pivots for pk, name in pivot.parameters})
+    parameters = Parameter.objects.in_bulk(parameter_ids)
+
+    names, bib_codes, cells = [], [], {f: [] for f in VALUE_FIELDS}
+    for reference, pivot in pivots:
+        names += [name for pk, name in pivot.astro_objects]
+        bib_codes += [reference.bib_code or reference.slug] * len(pivot)
+        column = {pk: j for j, (pk, name) in enumerate(pivot.parameters)}
+        index = [column.get(pk) for pk in parameter_ids]
+        for f in VALUE_FIELDS:
+            empty = numpy.full((len(pivot), len(parameter_ids)), None, dtype=object)
+            for k, j in enumerate(index):
+                if j is not None:
+                    empty[:, k] = pivot.cells[f][:, j]
+            cells[f].append(empty)
+    for f in VALUE_FIELDS:
+        cells[f] = (
+            numpy.vstack(cells[f])
+            if cells[f]
+            else numpy.empty((0, len(parameter_ids)), dtype=object)
+        )
+
+    table = Table()
+    table["name"] = numpy.array(names, dtype=str)
+    if len(references) > 1:
+        table["reference"] = numpy.array(bib_codes, dtype=str)
+
+    taken = set(table.colnames)
+    for k, pk in enumerate(parameter_ids):
+        parameter = parameters[pk]
+        name = table_column_name(parameter.name)
+        while name in taken:
+            name += "_"
+        taken.add(name)
+
+        description = parameter.name
+        unit = None
+        if parameter.unit.strip():
+            unit = units.Unit(parameter.unit.strip(), parse_strict="silent")
+        if isinstance(unit, units.UnrecognizedUnit):
+            description += " [{0}]".format(parameter.unit.strip())
+            unit = None
+        if parameter.description:
+            description += ": " + parameter.description
+
+        table.add_column(table_column(cells["value"][:, k], name, unit, description))
+        for f in VALUE_FIELDS[1:]:
+            if any(v is not None for v in cells[f][:, k]):
+                table.add_column(
+                    table_column(
+                        cells[f][:, k],
+                        "{0}_{1}".format(name, f),
+                        unit,
+                        "{0} of {1}".format(f, parameter.name),
+                    )
+                )
+    return table
+
+
+def observation_table_fingerprint(references):
+    """Return a hash that changes when the table of the References changes,
+    i.e. when one of its rows, or the name of an AstroObject or Parameter, is
+    updated or deleted"""
+
+    rows = ObservationTableRow.objects.filter(reference__in=references).aggregate(
+        count=Count("id"), updated=Max("date_updated")
+    )
+    state = [
+        sorted(r.pk for r in references),
+        rows["count"],
+        rows["updated"],
+        AstroObject.objects.aggregate(updated=Max("date_updated"))["updated"],
+        Parameter.objects.aggregate(updated=Max("date_updated"))["updated"],
+    ]
+    return hashlib.sha1(str(state).encode("utf-8")).hexdigest()[:16]
+
+
+def get_observation_table_file(references, format="fits"):
+    """Return the path of the table of the References in the given format
+    (see EXPORT_TABLE_FORMATS). The file is written on first use, and older
+    versions of the same export are removed from EXPORT_ROOT"""
+
+    content_type, extension, astropy_format = EXPORT_TABLE_FORMATS[format]
+    if len(references) == 1:
+        prefix = "observation_table_{0}".format(references[0].slug)
+    else:
+        ids = ",".join(str(pk) for pk in sorted(r.pk for r in references))
+        prefix = "observation_table_compilation_{0}".format(
+            hashlib.sha1(ids.encode("utf-8")).hexdigest()[:10]
+        )
+    path = os.path.join(
+        settings.EXPORT_ROOT,
+        "{0}_{1}.{2}".format(
+            prefix, observation_table_fingerprint(references), extension
+        ),
+    )
+    if os.path.exists(path):
+        return path
+
+    if astropy_format is None:
+        from catalogue.arrow import import_pyarrow, write_observation_table
+
+        import_pyarrow()  # fail before building the table
+
+    os.makedirs(settings.EXPORT_ROOT, exist_ok=True)
+    table = build_observation_table(references)
+    # Write to a temporary file first, such that concurrent requests never
+    # serve a partially written file
+    fd, tmp = tempfile.mkstemp(dir=settings.EXPORT_ROOT, suffix="." + extension)
+    os.close(fd)
+    try:
+        if astropy_format is None:
+            write_observation_table(table, tmp, format=format)
+        else:
+            with warnings.catch_warnings():
+                # e.g. 'dex' is not a FITS unit, and Parameter names as descriptions
+                warnings.simplefilter("ignore", AstropyWarning)
+                table.write(tmp, format=astropy_format, overwrite=True)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    for old in glob.glob(
+        os.path.join(
+            settings.EXPORT_ROOT, "{0}_{1}.{2}".format(prefix, "?" * 16, extension)
+        )
+    ):
+        if old != path:
+            os.remove(old)
+    return path
@@ -0,0 +1,359 @@
+"""Fast values()-based serialization of the list endpoints.
+
+ValuesSerializer produces the same data as serializer_class(queryset,
+many=True).data, but reads the rows with values_list() instead of
+instantiating (and prefetching) model instances, and maps every row to a dict
+with accessors that are compiled once per serializer class from its fields:
+
+- plain fields use the builtin str/int/float for CharField/IntegerField/
+  FloatField, and Field.to_representation for all other fields;
+- nested (depth=1) serializers read their fields with prefixed lookups;
+- PrimaryKeyRelatedField reads the id of the foreign key;
+- many=True related fields run one query per page, the same query as the
+  prefetch of the relation, such that the related items are in the same order;
+- HyperlinkedIdentityField and SerializerMethodFields that provide a
+  '<field name>_from_values' hook build their URLs from a UrlTemplate, see
+  catalogue.url_templates.
+
+The resulting dicts only contain str, int, float, list and None values, such
+that the JSON renderers encode them without a single call of the encoder's
+default(): with orjson if it is installed, see catalogue.renderers, or else
+with the C encoder of the json module. The rendered JSON is identical byte for
+byte to the output of the serializers.
+
+FastListMixin enables this path for the json and datatables formats of the
+list action of a viewset when settings.FAST_LIST_SERIALIZATION is True (the
+default). Use 'python manage.py benchmark_list_serialization' to compare both
+paths.
+"""
+
+from collections import defaultdict
+from functools import lru_cache
+from operator import itemgetter
+
+from catalogue.sparse_fields import SPARSE_FIELDS
+from catalogue.url_templates import UrlTemplate
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import F
+from rest_framework.relations import (
+    HyperlinkedIdentityField,
+    ManyRelatedField,
+    PrimaryKeyRelatedField,
+    RelatedField,
+    StringRelatedField,
+)
+from rest_framework.response import Response
+from rest_framework.serializers import (
+    BaseSerializer,
+    CharField,
+    EmailField,
+    FloatField,
+    IntegerField,
+    SerializerMethodField,
+    SlugField,
+    URLField,
+)
+
+# DRF fields whose to_representation() is the builtin
+PLAIN_CONVERTERS = {
+    CharField: str,
+    EmailField: str,
+    SlugField: str,
+    URLField: str,
+    IntegerField: int,
+    FloatField: float,
+}
+
+
+class Accessor(object):
+    """Compiled accessor of one field. Accessors are called with the context
+    and the rows of a page, and return the function that maps a row to the
+    value of the field"""
+
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index
+
+
+class ValueAccessor(Accessor):
+    def __init__(self, name, index, convert=None):
+        super().__init__(name, index)
+        self.convert = convert
+
+    def __call__(self, context, rows):
+        index, convert = self.index, self.convert
+        if convert is None:
+            return itemgetter(index)
+
+        def get(row):
+            value = row[index]
+            return None if value is None else convert(value)
+
+        return get
+
+
+class UrlAccessor(Accessor):
+    """ Accessor of a URL that is built from a UrlTemplate per request """
+
+    def __init__(self, name, index, template):
+        super().__init__(name, index)
+        self.template = template
+
+    def __call__(self, context, rows):
+        index, template = self.index, self.template(context)
+
+        def get(row):
+            value = row[index]
+            return None if value is None else template(value)
+
+        return get
+
+
+class ManyAccessor(Accessor):
+    """Accessor of a many=True related field. The index is the one of the pk
+    of the owner, the related items are loaded once for all rows"""
+
+    def __init__(self, name, index, model, query_name, child):
+        super().__init__(name, index)
+        self.model = model
+        self.query_name = query_name
+        self.child = child
+
+    def __call__(self, context, rows):
+        index = self.index
+        owners = list(dict.fromkeys(row[index] for row in rows))
+        related = defaultdict(list)
+        if owners:
+            queryset = self.model._default_manager.filter(
+                **{self.query_name + "__in": owners}
+            ).annotate(_values_owner=F(self.query_name))
+            for instance in queryset:
+                related[instance._values_owner].append(
+                    self.child.to_representation(instance)
+                )
+
+        def get(row):
+            return related.get(row[index], [])
+
+        return get
+
+
+class NestedAccessor(Accessor):
+    """Accessor of a nested serializer, the index is the one of the foreign
+    key, which is None if there is no related instance"""
+
+    def __init__(self, name, index, accessors):
+        super().__init__(name, index)
+        self.accessors = accessors
+
+    def __call__(self, context, rows):
+        index = self.index
+        getters = [(a.name, a(context, rows)) for a in self.accessors]
+
+        def get(row):
+            if row[index] is None:
+                return None
+            return {name: getter(row) for name, getter in getters}
+
+        return get
+
+
+def get_model_field(model, source_attrs):
+    """ Return the model field at the end of the source path of a DRF field """
+
+    field = None
+    for attr in source_attrs:
+        if field is not None:
+            if not field.is_relation:
+                raise FieldDoesNotExist(attr)
+            model = field.related_model
+        field = model._meta.get_field(attr)
+    return field
+
+
+def url_template_factory(field):
+    """ UrlTemplate factory for a HyperlinkedIdentityField """
+
+    def factory(context):
+        request = context.get("request")
+        format = context.get("format")
+        if format and field.format and field.format != format:
+            format = field.format
+
+        def build(value):
+            return field.reverse(
+                field.view_name,
+                kwargs={field.lookup_url_kwarg: value},
+                request=request,
+                format=format,
+            )
+
+        return UrlTemplate(build, pattern=r"[0-9]+")
+
+    return factory
+
+
+def compile_accessors(serializer, model, prefix, lookups, names=None):
+    def index_of(lookup):
+        lookup = prefix + lookup
+        if lookup not in lookups:
+            lookups.append(lookup)
+        return lookups.index(lookup)
+
+    accessors = []
+    for name, field in serializer.fields.items():
+        if field.write_only or (names is not None and name not in names):
+            continue
+        source = "__".join(field.source_attrs)
+
+        if isinstance(field, SerializerMethodField):
+            hook = getattr(type(serializer), name + "_from_values", None)
+            if hook is None:
+                raise ImproperlyConfigured(
+                    "{0}.{1} has no '{1}_from_values' hook".format(
+                        type(serializer).__name__, name
+                    )
+                )
+            lookup, factory = hook()
+            accessors.append(UrlAccessor(name, index_of(lookup), factory))
+            continue
+        if field.source == "*":
+            if isinstance(field, HyperlinkedIdentityField):
+                accessors.append(
+                    UrlAccessor(
+                        name, index_of(field.lookup_field), url_template_factory(field)
+                    )
+                )
+                continue
+            raise ImproperlyConfigured(
+                "{0}.{1} cannot be read from values()".format(
+                    type(serializer).__name__, name
+                )
+            )
+
+        try:
+            model_field = get_model_field(model, field.source_attrs)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(
+                "{0}.{1}: '{2}' is not a field of {3}".format(
+                    type(serializer).__name__, name, field.source, model.__name__
+                )
+            )
+
+        if isinstance(field, BaseSerializer):
+            if getattr(field, "many", False) or not model_field.many_to_one:
+                raise ImproperlyConfigured(
+                    "{0}.{1}: only nested serializers of foreign keys can be "
+                    "read from values()".format(type(serializer).__name__, name)
+                )
+            nested = compile_accessors(
+                field, model_field.related_model, prefix + source + "__", lookups
+            )
+            accessors.append(NestedAccessor(name, index_of(source), nested))
+        elif isinstance(field, ManyRelatedField):
+            if not isinstance(
+                field.child_relation, (PrimaryKeyRelatedField, StringRelatedField)
+            ):
+                raise ImproperlyConfigured(
+                    "{0}.{1}: {2} cannot be read from values()".format(
+                        type(serializer).__name__,
+                        name,
+                        type(field.child_relation).__name__,
+                    )
+                )
+            if model_field.many_to_many and not model_field.auto_created:
+                query_name = model_field.related_query_name()
+            else:  # reverse foreign key or many to many
+                query_name = model_field.field.name
+            accessors.append(
+                ManyAccessor(
+                    name,
+                    index_of("pk"),
+                    model_field.related_model,
+                    query_name,
+                    field.child_relation,
+                )
+            )
+        elif isinstance(field, PrimaryKeyRelatedField):
+            convert = field.pk_field.to_representation if field.pk_field else None
+            accessors.append(ValueAccessor(name, index_of(source), convert))
+        elif isinstance(field, RelatedField):
+            raise ImproperlyConfigured(
+                "{0}.{1}: {2} cannot be read from values()".format(
+                    type(serializer).__name__, name, type(field).__name__
+                )
+            )
+        else:
+            convert = PLAIN_CONVERTERS.get(type(field), field.to_representation)
+            accessors.append(ValueAccessor(name, index_of(source), convert))
+    return accessors
+
+
+@lru_cache(maxsize=256)
+def compile_serializer(serializer_class, fields=None):
+    """Return the values_list() lookups and accessors of the serializer class,
+    or of the given (frozen)set of its fields, see catalogue.sparse_fields"""
+
+    lookups = []
+    serializer = serializer_class()
+    accessors = compile_accessors(
+        serializer, serializer.Meta.model, "", lookups, names=fields
+    )
+    return tuple(lookups), tuple(accessors)
+
+
+class ValuesSerializer(object):
+    def __init__(self, serializer_class, context):
+        fields = context.get(SPARSE_FIELDS)
+        if fields is not None:
+            fields = frozenset(fields)
+        self.lookups, self.accessors = compile_serializer(serializer_class, fields)
+        self.context = context
+
+    def values_list(self, queryset, extra=()):
+        """Return the rows of the queryset as needed by to_representation(),
+        plus the extra lookups. The prefetches are done per page by the
+        many=True accessors. The rows are named tuples, such that e.g. the
+        KeysetPagination can read its keys from them"""
+
+        extra = [lookup for lookup in extra if lookup not in self.lookups]
+        return (
+            queryset.select_related(None)
+            .prefetch_related(None)
+            .values_list(*self.lookups, *extra, named=True)
+        )
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        getters = [(a.name, a(self.context, rows)) for a in self.accessors]
+        return [{name: getter(row) for name, getter in getters} for row in rows]
+
+
+class FastListMixin(object):
+    """Serialize the list action of a ReadOnlyModelViewSet with a
+    ValuesSerializer, if settings.FAST_LIST_SERIALIZATION is True"""
+
+    fast_list_formats = ("json", "datatables")
+
+    def use_fast_list(self, request):
+        return (
+            getattr(settings, "FAST_LIST_SERIALIZATION", False)
+            and request.accepted_renderer.format in self.fast_list_formats
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_list(request):
+            return super().list(request, *args, **kwargs)
+
+        serializer = ValuesSerializer(
+            self.get_serializer_class(), self.get_serializer_context()
+        )
+        queryset = serializer.values_list(
+            self.filter_queryset(self.get_queryset()),
+            extra=getattr(self, "keyset_ordering_fields", ()),
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+        return Response(serializer.to_representation(queryset))
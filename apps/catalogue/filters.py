@@ -1,9 +1,22 @@
+import re
+
+import django_filters
+from catalogue.counts import get_count
+from catalogue.models import Observation
+from catalogue.search import search_queryset
 from django.contrib.admin.filters import (
     AllValuesFieldListFilter,
     ChoicesFieldListFilter,
     RelatedFieldListFilter,
     RelatedOnlyFieldListFilter,
 )
+from django.db.models import Q
+from rest_framework.filters import SearchFilter
+from rest_framework_datatables.filters import (
+    DatatablesBaseFilterBackend,
+    DatatablesFilterBackend,
+    is_valid_regex,
+)
 
 
 # https://github.com/mrts/django-admin-list-filter-dropdown/
@@ -21,3 +34,155 @@ class RelatedDropdownFilter(RelatedFieldListFilter):
 
 class RelatedOnlyDropdownFilter(RelatedOnlyFieldListFilter):
     template = "catalogue/dropdown_filter.html"
+
+
+def numeric_sort_key(value):
+    """ Sort numbers numerically, and before non-numeric values such as 'F7' """
+    try:
+        return (0, float(value), "")
+    except (TypeError, ValueError):
+        return (1, 0.0, str(value))
+
+
+class DatatablesRowsFilterBackend(DatatablesBaseFilterBackend):
+    """Server-side DataTables search and ordering for a table of rows (lists)
+    rather than a queryset, e.g. the rows of catalogue.pivot. Columns are
+    referenced by index, i.e. the client must use `columns[i][data] = i`.
+
+    The table is a catalogue.pivot.CachedTable. The indices of the rows that
+    match the search, in the requested order, are cached per version of the
+    table and per search and ordering, so that the next pages only slice them
+    and read the rows of the page."""
+
+    def filter_table(self, request, table, view):
+        """ Return the indices of the rows that match, in order """
+        query = self.parse_datatables_query(request, view)
+        fields = [f for f in query["fields"] if f.get("data", "").isdigit()]
+        ordering = [
+            (int(field["data"]), dir_)
+            for field, dir_ in self.get_ordering_fields(request, view, query["fields"])
+            if field.get("data", "").isdigit()
+        ]
+        name = (
+            query["search_value"],
+            query["search_regex"],
+            [
+                (f["data"], f["searchable"], f["search_value"], f["search_regex"])
+                for f in fields
+            ],
+            ordering,
+        )
+        indices = table.get_or_set(
+            name, lambda rows: self.filter_rows(rows, query, fields, ordering)
+        )
+        self.set_count_before(view, len(table))
+        self.set_count_after(view, len(indices))
+        return indices
+
+    def filter_rows(self, rows, query, fields, ordering):
+        indices = range(len(rows))
+        searchable = [int(f["data"]) for f in fields if f["searchable"]]
+        if query["search_value"]:
+            match = self.get_matcher(query["search_value"], query["search_regex"])
+            indices = [k for k in indices if any(match(rows[k][i]) for i in searchable)]
+        for f in fields:
+            if f["searchable"] and f["search_value"]:
+                i = int(f["data"])
+                match = self.get_matcher(f["search_value"], f["search_regex"])
+                indices = [k for k in indices if match(rows[k][i])]
+
+        # Sort by the least significant column first, the sort is stable.
+        # Empty cells always go last, regardless of the direction.
+        for i, dir_ in reversed(ordering):
+            indices = sorted(
+                (k for k in indices if rows[k][i] is not None),
+                key=lambda k: numeric_sort_key(rows[k][i]),
+                reverse=dir_ == "desc",
+            ) + [k for k in indices if rows[k][i] is None]
+        return list(indices)
+
+    def get_matcher(self, search_value, search_regex):
+        if search_regex and is_valid_regex(search_value):
+            regex = re.compile(search_value, re.IGNORECASE)
+            return lambda v: v is not None and regex.search(str(v)) is not None
+        search_value = search_value.lower()
+        return lambda v: v is not None and search_value in str(v).lower()
+
+
+class CachedCountDatatablesFilterBackend(DatatablesFilterBackend):
+    """DatatablesFilterBackend that takes the total and the filtered number of
+    rows from catalogue.counts.get_count() instead of counting them for every
+    page, i.e. cached, or estimated for the unfiltered total"""
+
+    def filter_queryset(self, request, queryset, view):
+        if not self.check_renderer_format(request):
+            return queryset
+
+        total_count = get_count(view.get_queryset())
+        self.set_count_before(view, total_count)
+        if len(getattr(view, "filter_backends", [])) > 1:
+            filtered_count_before = get_count(queryset)
+        else:
+            filtered_count_before = total_count
+
+        datatables_query = self.parse_datatables_query(request, view)
+        q = self.get_q(datatables_query)
+        if q:
+            queryset = queryset.filter(q).distinct()
+            filtered_count = get_count(queryset)
+        else:
+            filtered_count = filtered_count_before
+        self.set_count_after(view, filtered_count)
+
+        ordering = self.get_ordering(request, view, datatables_query["fields"])
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+
+class SearchIndexFilter(SearchFilter):
+    """SearchFilter that is served by the full-text index of catalogue.search
+    instead of icontains lookups. The search_fields of the view are the
+    relations of which the words are searched: 'pk' for the instances
+    themselves, or the foreign keys of the related instances"""
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        query = request.query_params.get(self.search_param, "")
+        if not search_fields or not query:
+            return queryset
+        return search_queryset(queryset, query, search_fields)
+
+
+class ObservationFilter(django_filters.FilterSet):
+    """Filter Observations in SQL. The parameter can be given by id, slug or
+    name, e.g. `?parameter=[Fe/H]&value__gte=-2.5&value__lt=-1.5`. The value
+    filters use the parsed Observation.value_numeric, so Observations with a
+    value that is not numeric (e.g. the spectral type) never match them."""
+
+    parameter = django_filters.CharFilter(method="filter_parameter")
+    value__lt = django_filters.NumberFilter(
+        field_name="value_numeric", lookup_expr="lt"
+    )
+    value__lte = django_filters.NumberFilter(
+        field_name="value_numeric", lookup_expr="lte"
+    )
+    value__gt = django_filters.NumberFilter(
+        field_name="value_numeric", lookup_expr="gt"
+    )
+    value__gte = django_filters.NumberFilter(
+        field_name="value_numeric", lookup_expr="gte"
+    )
+    ordering = django_filters.OrderingFilter(
+        fields=(("value_numeric", "value"), ("id", "id"))
+    )
+
+    class Meta:
+        model = Observation
+        fields = ("astro_object", "parameter", "reference")
+
+    def filter_parameter(self, queryset, name, value):
+        lookup = Q(parameter__name=value) | Q(parameter__slug=value)
+        if value.isdigit():
+            lookup |= Q(parameter_id=int(value))
+        return queryset.filter(lookup)
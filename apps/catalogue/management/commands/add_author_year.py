@@ -97,10 +97,16 @@ class Command(PrepareSupaHarrisDatabaseMixin, BaseCommand):
             gc.classifications.add(self.GC)
             gc.save()
 
-            observation = Observation.objects.create(
-                reference=reference,
+            # upsert() updates the Observation of (gc, reference, parameter) if
+            # it exists, so the command can be run again after a correction
+            observation, created = Observation.objects.upsert(
                 astro_object=gc,
+                reference=reference,
                 parameter=R_Sun,
                 value=gc_R_Sun,
             )
-            self.logger.info("Created the Observation: {0}".format(observation))
+            self.logger.info(
+                "{0} the Observation: {1}".format(
+                    "Created" if created else "Updated", observation
+                )
+            )
@@ -143,7 +143,7 @@ class Command(PrepareSupaHarrisDatabaseMixin, BaseCommand):
             self.logger.info("  reference: {0}".format(first_ref))
 
             for param in ["mu_alpha", "mu_delta"]:
-                obs, created = Observation.objects.get_or_create(
+                obs, created = Observation.objects.upsert(
                     astro_object=gc,
                     parameter=parameter_map[param],
                     reference=first_ref,  # TODO: add support for multiple References?
@@ -173,7 +173,7 @@ class Command(PrepareSupaHarrisDatabaseMixin, BaseCommand):
             self.logger.debug("  astro_object: {0}".format(gc))
 
             for param in ["R_apo", "R_peri", "ecc", "phi", "M_i", "mu"]:
-                obs, created = Observation.objects.get_or_create(
+                obs, created = Observation.objects.upsert(
                     astro_object=gc,
                     parameter=parameter_map[param],
                     reference=BG18,
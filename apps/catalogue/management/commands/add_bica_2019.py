@@ -9,6 +9,7 @@ from catalogue.models import (
     Parameter,
     Reference,
 )
+from catalogue.names import get_name_index
 from catalogue.utils import PrepareSupaHarrisDatabaseMixin
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
@@ -285,32 +286,11 @@ class Command(PrepareSupaHarrisDatabaseMixin, BaseCommand):
         print("  W: {0}\n".format(W))
         ps = (Glon, Glat, RA, Dec, CatItem, Diam_a, Diam_b, U, V, W)
 
-        # Here we create a dictionary that maps the names of known AstroObject
-        # instances in supaharris to its pk to retrieve them later on
-        aos = dict()
-        ao_names = dict()
-        for ao in AstroObject.objects.iterator():
-            if ao.name:
-                ao_names[ao.name] = ao.pk
-            if "Pal " in ao.name:
-                ao_names[ao.name.replace("Pal ", "Palomar ")] = ao.pk
-            if "Palomar " in ao.name:
-                ao_names[ao.name.replace("Palomar ", "Pal ")] = ao.pk
-            if "Ter " in ao.name:
-                ao_names[ao.name.replace("Ter ", "Terzan ")] = ao.pk
-            if "Terzan " in ao.name:
-                ao_names[ao.name.replace("Terzan ", "Ter ")] = ao.pk
-            if ao.altname:
-                ao_names[ao.altname] = ao.pk
-                if "Pal " in ao.altname:
-                    ao_names[ao.altname.replace("Pal ", "Palomar ")] = ao.pk
-                if "Palomar " in ao.altname:
-                    ao_names[ao.altname.replace("Palomar ", "Pal ")] = ao.pk
-                if "Ter " in ao.altname:
-                    ao_names[ao.altname.replace("Ter ", "Terzan ")] = ao.pk
-                if "Terzan " in ao.altname:
-                    ao_names[ao.altname.replace("Terzan ", "Ter ")] = ao.pk
-            aos[ao.pk] = ao
+        # Here we map the names (in any style, e.g. Pal 1/Palomar 1/pal1) of
+        # known AstroObject instances in supaharris to their pk to retrieve them
+        # later on, see catalogue.names
+        aos = {ao.pk: ao for ao in AstroObject.objects.iterator()}
+        ao_names = get_name_index()
 
         # Create a dictionary that maps the AstroObjectClassification abbreviations
         # to the instance. This way we query the database only once, not once for
@@ -303,7 +303,10 @@ def add_deBoer_2019_tableB1(logger):
         "\nInserting {0} objects into SupaHarris database".format(len(all_observations))
     )
     # Because this way we throw a single query at the database (fast), instead
-    # of throwing one query per Observation instance (painfully slow)
+    # of throwing one query per Observation instance (painfully slow). Note that
+    # bulk_create does not call Observation.save, so parse the values here
+    for o in all_observations:
+        o.set_numeric_values()
     Observation.objects.bulk_create(all_observations)
     logger.debug("Done")
 
@@ -147,7 +147,7 @@ class Command(PrepareSupaHarrisDatabaseMixin, BaseCommand):
                 self.logger.info("  sigma_up = {0}".format(sigma_up))
                 self.logger.info("  sigma_down = {0}".format(sigma_down))
 
-                observation, created = Observation.objects.get_or_create(
+                observation, created = Observation.objects.upsert(
                     astro_object=cluster,
                     reference=harris1996ed2010,
                     parameter=parameter,
@@ -317,24 +317,24 @@ def add_orbits(logger, name_id_map):
         # in Harris (1996) were incorrect.' - Baumgardt+ (2019MNRAS.482.5138B) Section 2.1
         # RA and DEC either come from Harris 1996, or from Goldsbury, Heyl & Richer (2013),
         # except for IC 1257 and Ter 10 (which have been calculated by B19)
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=RA, value=row["RA"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=Dec, value=row["DEC"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=L, value=row["l"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=B, value=row["b"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=R_Sun,
@@ -343,13 +343,13 @@ def add_orbits(logger, name_id_map):
             sigma_down=row["ERsun"],
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=R_Gal, value=row["R_GC"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
         # TODO: check that this is indeed v_r (Heliocentric radial velocity)
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=v_r,
@@ -359,7 +359,7 @@ def add_orbits(logger, name_id_map):
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=pmRA,
@@ -369,7 +369,7 @@ def add_orbits(logger, name_id_map):
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=pmDec,
@@ -380,14 +380,14 @@ def add_orbits(logger, name_id_map):
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
         # Correlation between proper motion in RA and DEC
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=rhopmrade, value=row["rhopmrade"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
         # Distance from the Gal. centre in direction of Sun (note that the
         # definition is opposite to the more common definition of X from Sun to GC)
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=X_alt,
@@ -396,7 +396,7 @@ def add_orbits(logger, name_id_map):
             sigma_down=row["DX"],
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=Y,
@@ -405,7 +405,7 @@ def add_orbits(logger, name_id_map):
             sigma_down=row["DY"],
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=Z,
@@ -415,7 +415,7 @@ def add_orbits(logger, name_id_map):
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=U_alt,
@@ -424,7 +424,7 @@ def add_orbits(logger, name_id_map):
             sigma_down=row["DU"],
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=V,
@@ -433,7 +433,7 @@ def add_orbits(logger, name_id_map):
             sigma_down=row["DV"],
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=W,
@@ -443,7 +443,7 @@ def add_orbits(logger, name_id_map):
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=R_peri,
@@ -452,7 +452,7 @@ def add_orbits(logger, name_id_map):
             sigma_down=row["RPERI_err"],
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=R_apo,
@@ -702,7 +702,7 @@ def add_combined(logger, name_id_map):
         # value=row["R_Sun"]
         # value=row["R_GC"]
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=Mass,
@@ -714,7 +714,7 @@ def add_combined(logger, name_id_map):
 
         # Baumgardt website: Apparent V-band magnitude and an approximate error
         # SupaHarris: Integrated V magnitude
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=V_t,
@@ -724,7 +724,7 @@ def add_combined(logger, name_id_map):
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref,
             astro_object=gc,
             parameter=MLv,
@@ -769,7 +769,7 @@ def add_combined(logger, name_id_map):
         else:
             logger.debug("    Comparison: NO INSTANCE IN Harris (1996)!")
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sp_r_c, value=rc_arcmin
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
@@ -795,7 +795,7 @@ def add_combined(logger, name_id_map):
         else:
             logger.debug("    Comparison: NO INSTANCE IN Harris (1996)!")
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sp_r_h, value=rhl_arcmin
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
@@ -804,7 +804,7 @@ def add_combined(logger, name_id_map):
         rhm_arcmin = parsec2arcmin(rhm_parsec, distance_kpc)
         logger.debug("    Half-mass radius: {0} parsec".format(rhm_parsec))
         logger.debug("      --> {0:.2f} arcmin".format(rhm_arcmin))
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sp_r_hm, value=rhm_arcmin
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
@@ -813,69 +813,69 @@ def add_combined(logger, name_id_map):
         rt_arcmin = parsec2arcmin(rt_parsec, distance_kpc)
         logger.debug("    Tidal radius: {0} parsec".format(rt_parsec))
         logger.debug("      --> {0:.2f} arcmin".format(rt_arcmin))
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sp_r_t, value=rt_arcmin
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sp_lg_rho_c, value=row["rho_c"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sp_lg_rho_hm, value=row["rho_hm"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
         # Baumgardt website: not explicitly mentioned. Just pops up in combined_table.txt
         # SupaHarris: Central surface density of stars at the cluster center in MSun/pc^2
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sigma_0, value=row["sig_c"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
         # Baumgardt website: not explicitly mentioned. Just pops up in combined_table.txt
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sigma_hm, value=row["sig_hm"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sp_lg_thm, value=row["lgTrh"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sp_mf_slope, value=row["MF"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sp_frac_rem, value=row["F_REM"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
         # Baumgardt website: Central 1D velocity dispersion
         # SupaHarris: Central velocity dispersion
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sig_v_r, value=row["sig0"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
         # Baumgardt website: Central escape velocity
         # SupaHarris: Central escape velocity
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=v_e_0, value=row["vesc"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sp_eta_c, value=row["etac"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
 
-        o, created = Observation.objects.get_or_create(
+        o, created = Observation.objects.upsert(
             reference=ref, astro_object=gc, parameter=sp_eta_hm, value=row["etah"]
         )
         logger.debug("    {0}: {1}".format("Created" if created else "Found", o))
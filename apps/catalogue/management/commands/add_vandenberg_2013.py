@@ -146,7 +146,7 @@ class Command(PrepareSupaHarrisDatabaseMixin, BaseCommand):
                 print("    sigma_up = {0}".format(sigma_up))
                 print("    sigma_down = {0}".format(sigma_down))
 
-                observation, created = Observation.objects.get_or_create(
+                observation, created = Observation.objects.upsert(
                     astro_object=cluster,
                     reference=vandenberg_2013,
                     parameter=parameter,
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+import json
+import random
+import time
+
+from catalogue.api_views import (
+    AstroObjectViewSet,
+    ObservationViewSet,
+    ParameterViewSet,
+    ReferenceViewSet,
+)
+from catalogue.fast_serializers import ValuesSerializer
+from catalogue.models import (
+    AstroObject,
+    AstroObjectClassification,
+    Observation,
+    Parameter,
+    Reference,
+)
+from catalogue.renderers import FastJSONRenderer
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+
+class Command(BaseCommand):
+    help = "Benchmark the serialization of the list endpoints by the serializers "
+    help += "and by the values()-based fast path (FAST_LIST_SERIALIZATION), "
+    help += "which is rendered by the FastJSONRenderer. "
+    help += "Runs in a throwaway test database."
+
+    viewsets = {
+        "reference": ReferenceViewSet,
+        "astro_object": AstroObjectViewSet,
+        "parameter": ParameterViewSet,
+        "observation": ObservationViewSet,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument("--astro-objects", type=int, default=2000)
+        parser.add_argument("--parameters", type=int, default=10)
+        parser.add_argument("--references", type=int, default=500)
+        parser.add_argument(
+            "--page-size", type=int, default=1000, help="Rows per serialized page"
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            self.populate(options)
+            timings = {
+                name: self.run(viewset, options["page_size"], options["repeat"])
+                for name, viewset in self.viewsets.items()
+            }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(
+            "{0:<32} {1:>12} {2:>12} {3:>8}".format(
+                "benchmark", "before [ms]", "after [ms]", "speedup"
+            )
+        )
+        for name, (before, after) in timings.items():
+            self.stdout.write(
+                "{0:<32} {1:>12.1f} {2:>12.1f} {3:>7.1f}x".format(
+                    name, 1000 * before, 1000 * after, before / after
+                )
+            )
+
+    def populate(self, options):
+        AstroObjectClassification.objects.bulk_create(
+            [
+                AstroObjectClassification(
+                    name="class{0}".format(i), slug="c{0}".format(i)
+                )
+                for i in range(5)
+            ]
+        )
+        Reference.objects.bulk_create(
+            [
+                Reference(
+                    ads_url="https://example.org/abs/benchmark{0}".format(i),
+                    bib_code="benchmark{0}".format(i),
+                    slug="benchmark{0}".format(i),
+                    first_author="Author{0}".format(i),
+                    year=2000 + i % 20,
+                    title="Benchmark reference {0}".format(i),
+                )
+                for i in range(options["references"])
+            ],
+            batch_size=1000,
+        )
+        AstroObject.objects.bulk_create(
+            [
+                AstroObject(name="Object {0}".format(i), slug="object-{0}".format(i))
+                for i in range(options["astro_objects"])
+            ],
+            batch_size=1000,
+        )
+        Parameter.objects.bulk_create(
+            [
+                Parameter(name="p{0}".format(i), slug="p{0}".format(i), scale=1.0)
+                for i in range(options["parameters"])
+            ]
+        )
+        classifications = list(
+            AstroObjectClassification.objects.values_list("id", flat=True)
+        )
+        references = list(Reference.objects.values_list("id", flat=True))
+        astro_objects = list(AstroObject.objects.values_list("id", flat=True))
+        parameters = list(Parameter.objects.values_list("id", flat=True))
+
+        Through = AstroObject.classifications.through
+        Through.objects.bulk_create(
+            [
+                Through(astroobject_id=ao, astroobjectclassification_id=c)
+                for ao in astro_objects
+                for c in self.random.sample(classifications, 2)
+            ],
+            batch_size=1000,
+        )
+        observations = []
+        for ao in astro_objects:
+            for p in parameters:
+                o = Observation(
+                    reference_id=self.random.choice(references),
+                    astro_object_id=ao,
+                    parameter_id=p,
+                    value=str(self.random.uniform(-100, 100)),
+                )
+                o.set_numeric_values()
+                observations.append(o)
+        Observation.objects.bulk_create(observations, batch_size=1000)
+        self.stdout.write("Inserted {0} Observations".format(len(observations)))
+
+    def get_view(self, viewset, page_size):
+        request = APIRequestFactory().get(
+            "/", {"format": "json", "length": page_size}, HTTP_HOST="localhost"
+        )
+        view = viewset(
+            request=Request(request), format_kwarg=None, action="list", kwargs={}
+        )
+        view.request.accepted_renderer = JSONRenderer()
+        return view
+
+    def timeit(self, function, repeat):
+        best = None
+        for i in range(repeat):
+            start = time.perf_counter()
+            content = function()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, content
+
+    def run(self, viewset, page_size, repeat):
+        """Return the best time of serializing and rendering one page with the
+        serializer and the JSONRenderer, and with the ValuesSerializer and the
+        FastJSONRenderer (including the queries)"""
+
+        view = self.get_view(viewset, page_size)
+        queryset = view.filter_queryset(view.get_queryset())[:page_size]
+        context = view.get_serializer_context()
+        serializer_class = view.get_serializer_class()
+        renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+
+        def serializer():
+            return renderer.render(
+                serializer_class(queryset.all(), many=True, context=context).data
+            )
+
+        def fast():
+            values = ValuesSerializer(serializer_class, context)
+            return fast_renderer.render(
+                values.to_representation(values.values_list(queryset))
+            )
+
+        before, expected = self.timeit(serializer, repeat)
+        after, content = self.timeit(fast, repeat)
+        # orjson may format some floats differently, e.g. 1e16 for 1e+16
+        if json.loads(content) != json.loads(expected):
+            raise CommandError(
+                "The output of {0} differs between both paths".format(viewset.__name__)
+            )
+        return before, after
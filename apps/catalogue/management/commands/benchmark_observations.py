@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import random
+import time
+
+from catalogue.models import AstroObject, Observation, Parameter, Reference
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark Observation ingest and lookups with and without the "
+    help += "composite indexes. Runs in a throwaway test database."
+
+    def add_arguments(self, parser):
+        # Bica+ (2019) has ~10k AstroObjects
+        parser.add_argument("--astro-objects", type=int, default=10000)
+        parser.add_argument("--parameters", type=int, default=8)
+        parser.add_argument("--references", type=int, default=2)
+        parser.add_argument(
+            "--lookups", type=int, default=2000, help="Number of queries per run"
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            self.populate(options)
+            with_indexes = self.run(options["lookups"])
+            self.drop_indexes()
+            without_indexes = self.run(options["lookups"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(
+            "{0:<32} {1:>12} {2:>12} {3:>8}".format(
+                "benchmark", "before [ms]", "after [ms]", "speedup"
+            )
+        )
+        for name, after in with_indexes.items():
+            before = without_indexes[name]
+            self.stdout.write(
+                "{0:<32} {1:>12.1f} {2:>12.1f} {3:>7.1f}x".format(
+                    name, 1000 * before, 1000 * after, before / after
+                )
+            )
+
+    def populate(self, options):
+        Reference.objects.bulk_create(
+            [
+                Reference(
+                    ads_url="https://example.org/abs/benchmark{0}".format(i),
+                    bib_code="benchmark{0}".format(i),
+                    slug="benchmark{0}".format(i),
+                )
+                for i in range(options["references"])
+            ]
+        )
+        AstroObject.objects.bulk_create(
+            [
+                AstroObject(name="Object {0}".format(i), slug="object-{0}".format(i))
+                for i in range(options["astro_objects"])
+            ],
+            batch_size=1000,
+        )
+        Parameter.objects.bulk_create(
+            [
+                Parameter(name="p{0}".format(i), slug="p{0}".format(i), scale=1.0)
+                for i in range(options["parameters"])
+            ]
+        )
+        self.references = list(Reference.objects.values_list("id", flat=True))
+        self.astro_objects = list(AstroObject.objects.values_list("id", flat=True))
+        self.parameters = list(Parameter.objects.values_list("id", flat=True))
+
+        observations = []
+        for r in self.references:
+            for ao in self.astro_objects:
+                for p in self.parameters:
+                    o = Observation(
+                        reference_id=r,
+                        astro_object_id=ao,
+                        parameter_id=p,
+                        value=str(self.random.uniform(-100, 100)),
+                    )
+                    o.set_numeric_values()
+                    observations.append(o)
+        Observation.objects.bulk_create(observations, batch_size=1000)
+        self.stdout.write("Inserted {0} Observations".format(len(observations)))
+
+    def drop_indexes(self):
+        with connection.schema_editor() as schema_editor:
+            for constraint in Observation._meta.constraints:
+                schema_editor.remove_constraint(Observation, constraint)
+            for index in Observation._meta.indexes:
+                schema_editor.remove_index(Observation, index)
+
+    def keys(self, n):
+        # Use the same keys in both runs
+        rng = random.Random(n)
+        return [
+            (
+                rng.choice(self.astro_objects),
+                rng.choice(self.references),
+                rng.choice(self.parameters),
+            )
+            for i in range(n)
+        ]
+
+    def timeit(self, function, keys):
+        # Run in a transaction that is rolled back, such that every run starts
+        # from the same data
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                for key in keys:
+                    function(*key)
+                raise Rollback
+        except Rollback:
+            pass
+        return time.perf_counter() - start
+
+    def run(self, n):
+        keys = self.keys(n)
+        new_parameter = Parameter.objects.create(name="new", scale=1.0)
+
+        def lookup_natural_key(ao, r, p):
+            Observation.objects.get_by_natural_key(ao, r, p)
+
+        def lookup_astro_object_parameter(ao, r, p):
+            list(Observation.objects.filter(astro_object_id=ao, parameter_id=p))
+
+        def lookup_reference_parameter(ao, r, p):
+            Observation.objects.filter(reference_id=r, parameter_id=p).count()
+
+        def upsert_existing(ao, r, p):
+            Observation.objects.upsert(
+                AstroObject(id=ao), Reference(id=r), Parameter(id=p), value="1.0"
+            )
+
+        def upsert_new(ao, r, p):
+            Observation.objects.upsert(
+                AstroObject(id=ao), Reference(id=r), new_parameter, value="1.0"
+            )
+
+        timings = dict()
+        timings["get natural key"] = self.timeit(lookup_natural_key, keys)
+        timings["filter astro_object, parameter"] = self.timeit(
+            lookup_astro_object_parameter, keys
+        )
+        timings["filter reference, parameter"] = self.timeit(
+            lookup_reference_parameter, keys
+        )
+        timings["upsert (update)"] = self.timeit(upsert_existing, keys)
+        timings["upsert (insert)"] = self.timeit(upsert_new, keys)
+        new_parameter.delete()
+        return timings
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+from catalogue.crossmatch import (
+    CROSSMATCH_EXTENSIONS,
+    CROSSMATCH_FORMATS,
+    crossmatch_table,
+    read_positions,
+    write_table,
+)
+from catalogue.utils import find_reference
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Match the RA/Dec positions (degrees) of a CSV, FITS or VOTable file "
+    help += "with the nearest AstroObject within a radius"
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Path to the CSV, FITS or VOTable file")
+        parser.add_argument(
+            "--radius", type=float, required=True, help="Match radius in degrees"
+        )
+        parser.add_argument(
+            "--output",
+            help="Path to write the matched table to. "
+            "Default: <input>_crossmatch.<extension>",
+        )
+        parser.add_argument(
+            "--input-format",
+            choices=CROSSMATCH_FORMATS.keys(),
+            help="Default: from the extension of the input",
+        )
+        parser.add_argument(
+            "--format",
+            choices=CROSSMATCH_FORMATS.keys(),
+            help="Format of the output. Default: from the extension of the "
+            "output, or the format of the input",
+        )
+        parser.add_argument(
+            "--reference",
+            action="append",
+            help="id, slug or bib_code of a Reference to limit the positions "
+            "to. Can be given more than once. Default: all References",
+        )
+        parser.add_argument("--ra-column", help="Default: e.g. 'ra' or 'RAJ2000'")
+        parser.add_argument("--dec-column", help="Default: e.g. 'dec' or 'DEJ2000'")
+
+    def handle(self, *args, **options):
+        if not 0 <= options["radius"] <= 180:
+            raise CommandError("The radius must be in [0, 180] degrees")
+
+        root, extension = os.path.splitext(options["input"])
+        input_format = options["input_format"] or CROSSMATCH_EXTENSIONS.get(
+            extension.lower()
+        )
+        if input_format is None:
+            raise CommandError(
+                "Unknown extension '{0}', use --input-format".format(extension)
+            )
+
+        output_format = options["format"]
+        if output_format is None and options["output"]:
+            output_format = CROSSMATCH_EXTENSIONS.get(
+                os.path.splitext(options["output"])[1].lower()
+            )
+        output_format = output_format or input_format
+        output = options["output"] or "{0}_crossmatch.{1}".format(
+            root, CROSSMATCH_FORMATS[output_format][1]
+        )
+
+        references = None
+        if options["reference"]:
+            references = []
+            for value in options["reference"]:
+                reference = find_reference(value)
+                if reference is None:
+                    raise CommandError("Reference '{0}' not found".format(value))
+                references.append(reference)
+
+        start = time.perf_counter()
+        try:
+            table, ra, dec = read_positions(
+                options["input"],
+                input_format,
+                ra_column=options["ra_column"],
+                dec_column=options["dec_column"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        matches = crossmatch_table(
+            table, ra, dec, options["radius"], references=references
+        )
+        with open(output, "wb") as f:
+            f.write(write_table(matches, output_format))
+
+        self.stdout.write(
+            "Matched {0} of {1} positions in {2:.2f} s: {3}".format(
+                (~matches["separation"].mask).sum(),
+                len(matches),
+                time.perf_counter() - start,
+                output,
+            )
+        )
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from catalogue.arrow import (
+    ARROW_FORMATS,
+    ArrowNotInstalled,
+    stream_observations,
+    stream_profiles,
+)
+from catalogue.models import Observation, Profile
+from catalogue.utils import find_reference
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Export the Observations or Profiles as Parquet or Arrow IPC file. "
+    help += "Use export_observation_table for the pivoted tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=["observations", "profiles"])
+        parser.add_argument("output", help="Path of the output file")
+        parser.add_argument(
+            "--format", choices=sorted(ARROW_FORMATS), default="parquet"
+        )
+        parser.add_argument(
+            "--reference",
+            action="append",
+            help="id, slug or bib_code of the Reference(s). Default: all References",
+        )
+
+    def handle(self, *args, **options):
+        if options["model"] == "observations":
+            queryset, stream = Observation.objects.order_by("id"), stream_observations
+        else:
+            queryset, stream = Profile.objects.order_by("id"), stream_profiles
+
+        if options["reference"]:
+            references = []
+            for value in options["reference"]:
+                reference = find_reference(value)
+                if reference is None:
+                    raise CommandError("Reference '{0}' not found".format(value))
+                references.append(reference)
+            queryset = queryset.filter(reference__in=references)
+
+        try:
+            content = stream(queryset, format=options["format"])
+        except ArrowNotInstalled as e:
+            raise CommandError(str(e))
+
+        with open(options["output"], "wb") as f:
+            for data in content:
+                f.write(data)
+        self.stdout.write(
+            "Exported {0} {1} to {2}".format(
+                queryset.count(), options["model"], options["output"]
+            )
+        )
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import shutil
+
+from catalogue.export import EXPORT_TABLE_FORMATS, get_observation_table_file
+from catalogue.utils import find_reference
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Export the observation table of one or more References (compiled) "
+    help += "as FITS or VOTable"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "references", nargs="+", help="id, slug or bib_code of the Reference(s)"
+        )
+        parser.add_argument(
+            "--format", choices=sorted(EXPORT_TABLE_FORMATS), default="fits"
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="Copy the table to this path. Default: print the path of the "
+            "cached file in EXPORT_ROOT",
+        )
+
+    def handle(self, *args, **options):
+        references = []
+        for value in options["references"]:
+            reference = find_reference(value)
+            if reference is None:
+                raise CommandError("Reference '{0}' not found".format(value))
+            if reference not in references:
+                references.append(reference)
+
+        path = get_observation_table_file(references, format=options["format"])
+        if options["output"]:
+            path = shutil.copyfile(path, options["output"])
+        self.stdout.write(path)
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from catalogue.cone import refresh_astro_object_positions
+from catalogue.pivot import refresh_observation_tables
+from catalogue.utils import find_reference
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized observation tables (ObservationTableRow) "
+    help += "and the positions of the cone search (AstroObjectPosition)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "references",
+            nargs="*",
+            help="id, slug or bib_code of the Reference(s). Default: all References",
+        )
+
+    def handle(self, *args, **options):
+        references = None
+        if options["references"]:
+            references = []
+            for value in options["references"]:
+                reference = find_reference(value)
+                if reference is None:
+                    raise CommandError("Reference '{0}' not found".format(value))
+                references.append(reference)
+
+        nrows = refresh_observation_tables(references)
+        self.stdout.write("Refreshed {0} observation table rows".format(nrows))
+        npositions = refresh_astro_object_positions(references)
+        self.stdout.write("Refreshed {0} positions".format(npositions))
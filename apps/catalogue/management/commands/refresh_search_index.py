@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+from catalogue.search import SEARCH_FIELDS, refresh_search_index
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index (SearchToken) of ?search= and "
+    help += "the search page, e.g. after a bulk_create"
+
+    def handle(self, *args, **options):
+        for model in SEARCH_FIELDS:
+            ntokens = refresh_search_index(model)
+            self.stdout.write(
+                "Refreshed {0} search tokens of {1}".format(
+                    ntokens, model._meta.verbose_name_plural
+                )
+            )
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from catalogue.cache_warming import warm_caches
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Populate the caches by requesting the hottest urls in-process. "
+    help += "Default: settings.WARM_CACHES_URLS"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "urls", nargs="*", help="Path(s) to request. Default: WARM_CACHES_URLS"
+        )
+        parser.add_argument(
+            "--host",
+            help="Host of the requests, which is part of the cache keys. "
+            "Default: the domain of the current Site",
+        )
+        parser.add_argument(
+            "--secure", action="store_true", help="Request the urls over https"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.WARM_CACHES_WORKERS,
+            help="Maximum number of concurrent requests",
+        )
+
+    def handle(self, *args, **options):
+        urls = options["urls"] or settings.WARM_CACHES_URLS
+        host = options["host"] or Site.objects.get_current().domain
+
+        failed = []
+        for warmed in warm_caches(
+            urls, host, secure=options["secure"], workers=options["workers"]
+        ):
+            if warmed.status_code >= 400:
+                failed.append(warmed.url)
+            if options["verbosity"] >= 1:
+                self.stdout.write(
+                    "{0:>8.1f} ms {1:>4} {2:>10} B  {3}".format(
+                        1000 * warmed.seconds,
+                        warmed.status_code,
+                        warmed.size,
+                        warmed.url,
+                    )
+                )
+
+        if failed:
+            raise CommandError(
+                "{0} of {1} urls failed: {2}".format(
+                    len(failed), len(urls), ", ".join(failed)
+                )
+            )
+        self.stdout.write("Warmed {0} urls for {1}".format(len(urls), host))
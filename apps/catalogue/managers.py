@@ -0,0 +1,54 @@
+from django.db import models
+
+# An Observation is identified by the AstroObject it describes, the Reference
+# it was published in, and the Parameter that was measured
+OBSERVATION_NATURAL_KEY = ("astro_object", "reference", "parameter")
+OBSERVATION_VALUE_FIELDS = ("value", "sigma_up", "sigma_down")
+
+
+class ObservationManager(models.Manager):
+    def get_by_natural_key(self, astro_object, reference, parameter):
+        return self.get(
+            astro_object=astro_object, reference=reference, parameter=parameter
+        )
+
+    def upsert(self, astro_object, reference, parameter, **values):
+        """
+        Insert or update the Observation of the given natural key, and return
+        (observation, created) as get_or_create does. Use this instead of
+        get_or_create(..., value=...) when ingesting data, such that re-running
+        an ingest after the data were corrected updates the values in place
+        rather than adding a second Observation. The lookup is a single seek on
+        the natural key index, and the Observation is only saved if one of its
+        values changed.
+        """
+        unknown = set(values) - set(OBSERVATION_VALUE_FIELDS)
+        if unknown:
+            raise TypeError(
+                "upsert() got unexpected keyword arguments {0}".format(
+                    ", ".join(sorted(unknown))
+                )
+            )
+
+        try:
+            observation = self.get_by_natural_key(astro_object, reference, parameter)
+        except self.model.DoesNotExist:
+            observation = self.create(
+                astro_object=astro_object,
+                reference=reference,
+                parameter=parameter,
+                **values
+            )
+            return observation, True
+
+        # The values are stored as strings, so compare them as strings too
+        changed = [
+            field
+            for field, value in values.items()
+            if getattr(observation, field) != (None if value is None else str(value))
+        ]
+        if changed:
+            for field in changed:
+                setattr(observation, field, values[field])
+            observation.save()
+        return observation, False
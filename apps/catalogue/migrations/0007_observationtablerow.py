@@ -0,0 +1,55 @@
+# Generated by Django 3.2 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+import jsonfield.fields
+
+
+def build_observation_table_rows(apps, schema_editor):
+    Observation = apps.get_model('catalogue', 'Observation')
+    ObservationTableRow = apps.get_model('catalogue', 'ObservationTableRow')
+
+    # Ordered by id, so the last Observation of a (reference, astro_object,
+    # parameter) wins, as in catalogue.pivot
+    rows = dict()
+    for reference_id, astro_object_id, parameter_id, value, sigma_up, sigma_down in (
+        Observation.objects.order_by('id').values_list(
+            'reference_id', 'astro_object_id', 'parameter_id', 'value', 'sigma_up', 'sigma_down'
+        ).iterator()
+    ):
+        values = rows.setdefault((reference_id, astro_object_id), dict())
+        count = values.get(str(parameter_id), [0])[-1]
+        values[str(parameter_id)] = [value, sigma_up, sigma_down, count + 1]
+
+    ObservationTableRow.objects.bulk_create(
+        [
+            ObservationTableRow(reference_id=r, astro_object_id=ao, values=values)
+            for (r, ao), values in rows.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0006_auto_20200227_1514'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ObservationTableRow',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('values', jsonfield.fields.JSONField(default=dict)),
+                ('date_updated', models.DateTimeField(auto_now=True, verbose_name='Date Last Changed')),
+                ('astro_object', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='observation_table_rows', to='catalogue.astroobject')),
+                ('reference', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='observation_table_rows', to='catalogue.reference')),
+            ],
+            options={
+                'ordering': ['astro_object_id'],
+                'unique_together': {('reference', 'astro_object')},
+            },
+        ),
+        migrations.RunPython(build_observation_table_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 3.2 on 2026-10-18 07:14
+
+import math
+
+from django.db import migrations, models
+
+
+def parse_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def set_numeric_values(apps, schema_editor):
+    Observation = apps.get_model('catalogue', 'Observation')
+
+    observations = []
+    for o in Observation.objects.only('value', 'sigma_up', 'sigma_down').iterator():
+        o.value_numeric = parse_float(o.value)
+        o.sigma_up_numeric = parse_float(o.sigma_up)
+        o.sigma_down_numeric = parse_float(o.sigma_down)
+        observations.append(o)
+    Observation.objects.bulk_update(
+        observations,
+        ['value_numeric', 'sigma_up_numeric', 'sigma_down_numeric'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0007_observationtablerow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='observation',
+            name='sigma_down_numeric',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='observation',
+            name='sigma_up_numeric',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='observation',
+            name='value_numeric',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='observation',
+            index=models.Index(fields=['parameter', 'value_numeric'], name='catalogue_obs_param_value_idx'),
+        ),
+        migrations.RunPython(set_numeric_values, migrations.RunPython.noop),
+    ]
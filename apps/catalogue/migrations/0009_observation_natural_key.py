@@ -0,0 +1,81 @@
+# Generated by Django 3.2 on 2026-10-18 07:17
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def delete_duplicate_observations(apps, schema_editor):
+    Observation = apps.get_model('catalogue', 'Observation')
+    ObservationTableRow = apps.get_model('catalogue', 'ObservationTableRow')
+
+    # Without the ordering by id, which would be part of the GROUP BY
+    duplicates = (
+        Observation.objects.order_by()
+        .values('parameter', 'astro_object', 'reference')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+    )
+    groups = []
+    conflicts = []
+    for d in duplicates.iterator():
+        observations = list(
+            Observation.objects.filter(
+                parameter_id=d['parameter'],
+                astro_object_id=d['astro_object'],
+                reference_id=d['reference'],
+            ).order_by('-id').values_list('id', 'value', 'sigma_up', 'sigma_down')
+        )
+        if len({o[1:] for o in observations}) > 1:
+            conflicts.append([o[0] for o in observations])
+        else:
+            groups.append((d, [o[0] for o in observations]))
+
+    # Only identical duplicates are deleted. Nothing is deleted if any key has
+    # Observations with different values, which a maintainer must resolve
+    if conflicts:
+        raise RuntimeError(
+            'Cannot add the unique natural key (astro_object, reference, '
+            'parameter) of Observation: the Observations with ids {0} have '
+            'the same natural key but different values. Delete all but one '
+            'of each, then run the migration again.'.format(
+                '; '.join(', '.join(str(pk) for pk in ids) for ids in conflicts)
+            )
+        )
+
+    # Keep the Observation with the highest id of each natural key, i.e. the
+    # one that the observation tables already show (see catalogue.pivot)
+    for d, ids in groups:
+        Observation.objects.filter(id__in=ids[1:]).delete()
+        print('\n  Deleted the identical duplicate Observations {0} of {1}'.format(
+            ', '.join(str(pk) for pk in ids[1:]), ids[0]
+        ), end='')
+
+        row = ObservationTableRow.objects.filter(
+            reference_id=d['reference'], astro_object_id=d['astro_object']
+        ).first()
+        if row is not None and str(d['parameter']) in row.values:
+            row.values[str(d['parameter'])][-1] = 1
+            row.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0008_observation_numeric_values'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='observation',
+            index=models.Index(fields=['astro_object', 'parameter'], name='catalogue_obs_object_param_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='observation',
+            index=models.Index(fields=['reference', 'parameter'], name='catalogue_obs_ref_param_idx'),
+        ),
+        migrations.RunPython(delete_duplicate_observations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='observation',
+            constraint=models.UniqueConstraint(fields=('astro_object', 'reference', 'parameter'), name='catalogue_obs_natural_key'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 3.2 on 2026-10-18 08:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+import math
+
+
+def build_astro_object_positions(apps, schema_editor):
+    AstroObjectPosition = apps.get_model('catalogue', 'AstroObjectPosition')
+    Observation = apps.get_model('catalogue', 'Observation')
+    Parameter = apps.get_model('catalogue', 'Parameter')
+
+    # As catalogue.cone.refresh_astro_object_positions
+    ids = dict(Parameter.objects.filter(name__in=('RA', 'Dec')).values_list('name', 'id'))
+    if len(ids) != 2:
+        return
+
+    values = dict()
+    for reference_id, astro_object_id, parameter_id, value in (
+        Observation.objects.filter(parameter_id__in=ids.values()).order_by().values_list(
+            'reference_id', 'astro_object_id', 'parameter_id', 'value_numeric'
+        ).iterator()
+    ):
+        values.setdefault((reference_id, astro_object_id), dict())[parameter_id] = value
+
+    rows = []
+    for (reference_id, astro_object_id), row in values.items():
+        ra, dec = row.get(ids['RA']), row.get(ids['Dec'])
+        if ra is None or dec is None or not -90 <= dec <= 90:
+            continue
+        ra = ra % 360
+        phi, theta = math.radians(ra), math.radians(dec)
+        rows.append(AstroObjectPosition(
+            reference_id=reference_id, astro_object_id=astro_object_id, ra=ra, dec=dec,
+            x=math.cos(theta) * math.cos(phi), y=math.cos(theta) * math.sin(phi),
+            z=math.sin(theta),
+        ))
+    AstroObjectPosition.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0009_observation_natural_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AstroObjectPosition',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ra', models.FloatField(verbose_name='RA [deg]')),
+                ('dec', models.FloatField(verbose_name='Dec [deg]')),
+                ('x', models.FloatField()),
+                ('y', models.FloatField()),
+                ('z', models.FloatField()),
+                ('astro_object', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='positions', to='catalogue.astroobject')),
+                ('reference', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='positions', to='catalogue.reference')),
+            ],
+            options={
+                'ordering': ['astro_object_id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='astroobjectposition',
+            index=models.Index(fields=['z'], name='catalogue_position_z_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='astroobjectposition',
+            unique_together={('reference', 'astro_object')},
+        ),
+        migrations.RunPython(build_astro_object_positions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2 on 2026-10-18 08:26
+
+from django.db import migrations, models
+import re
+import unicodedata
+
+
+def build_search_tokens(apps, schema_editor):
+    SearchToken = apps.get_model('catalogue', 'SearchToken')
+
+    # As catalogue.search.refresh_search_index
+    search_fields = {
+        'AstroObject': ('name', 'altname', 'classifications__name'),
+        'Parameter': ('name',),
+        'Observation': ('value',),
+        'Reference': ('first_author', 'authors', 'year', 'title'),
+    }
+    for model_name, fields in search_fields.items():
+        model = apps.get_model('catalogue', model_name)
+        rows = set()
+        for pk, *values in model.objects.order_by().values_list('pk', *fields).iterator():
+            for value in values:
+                if value is None:
+                    continue
+                text = unicodedata.normalize('NFKD', str(value)).casefold()
+                text = ''.join(c for c in text if not unicodedata.combining(c))
+                for word in re.findall(r'(?:(?<!\w)-)?[0-9]+(?:\.[0-9]+)?|[^\W\d_]+', text):
+                    rows.add((pk, word[:64]))
+        SearchToken.objects.bulk_create([
+            SearchToken(kind=model._meta.model_name, object_id=pk, token=token)
+            for pk, token in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0010_astroobjectposition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16)),
+                ('object_id', models.PositiveIntegerField()),
+                ('token', models.CharField(max_length=64)),
+            ],
+            options={
+                'ordering': ['kind', 'token', 'object_id'],
+                'unique_together': {('kind', 'token', 'object_id')},
+            },
+        ),
+        migrations.RunPython(build_search_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 09:06
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0011_searchtoken'),
+    ]
+
+    operations = [
+        # Add the unique index before the constraint is removed, such that the
+        # natural key stays unique (and indexed) in between
+        migrations.AlterUniqueTogether(
+            name='observation',
+            unique_together={('astro_object', 'reference', 'parameter')},
+        ),
+        migrations.RemoveConstraint(
+            model_name='observation',
+            name='catalogue_obs_natural_key',
+        ),
+    ]
@@ -1,6 +1,10 @@
 from __future__ import unicode_literals
 
+import math
+
 from accounts.models import UserModel
+from catalogue.managers import OBSERVATION_NATURAL_KEY, ObservationManager
+from catalogue.url_templates import reverse_slug
 from django.conf import settings
 from django.contrib import messages
 from django.db import models
@@ -15,6 +19,15 @@ from utils import (
 )
 
 
+def parse_float(value):
+    """ Return value as a finite float, or None if it is not numeric (e.g. 'F7') """
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
 def get_aux_folder(instance, filename):
     fname = filename.split("/")[-1]
     return settings.MEDIA_ROOT + "/aux/" + fname
@@ -63,11 +76,11 @@ class Parameter(models.Model):
         super(Parameter, self).save(*args, **kwargs)
 
     def get_absolute_url(self):
-        return reverse("catalogue:parameter_detail", args=[self.slug])
+        return reverse_slug("catalogue:parameter_detail", self.slug)
 
     @property
     def api_url(self):
-        return reverse("parameter-detail", args=[self.slug])
+        return reverse_slug("parameter-detail", self.slug)
 
     def __str__(self):
         if self.unit:
@@ -280,11 +293,11 @@ class Reference(models.Model):
         super(Reference, self).save(*args, **kwargs)
 
     def get_absolute_url(self):
-        return reverse("catalogue:reference_detail", args=[self.slug])
+        return reverse_slug("catalogue:reference_detail", self.slug)
 
     @property
     def api_url(self):
-        return reverse("reference-detail", args=[self.slug])
+        return reverse_slug("reference-detail", self.slug)
 
     def __str__(self):
         if self.first_author and self.year:
@@ -350,11 +363,11 @@ class AstroObject(models.Model):
         super(AstroObject, self).save(*args, **kwargs)
 
     def get_absolute_url(self):
-        return reverse("catalogue:astro_object_detail", args=[self.slug])
+        return reverse_slug("catalogue:astro_object_detail", self.slug)
 
     @property
     def api_url(self):
-        return reverse("astroobject-detail", args=[self.slug])
+        return reverse_slug("astroobject-detail", self.slug)
 
     def __str__(self):
         if self.altname:
@@ -456,6 +469,14 @@ class Observation(models.Model):
     sigma_up = models.CharField("Sigma up", max_length=128, null=True, blank=True)
     sigma_down = models.CharField("Sigma down", max_length=128, null=True, blank=True)
 
+    # Parsed copies of value, sigma_up and sigma_down that the database can filter
+    # and sort on. Set on save, and None if the value is not numeric (e.g. the
+    # spectral type 'spt'). Note that bulk_create does not call save, so use
+    # set_numeric_values() on the instances before bulk creating them.
+    value_numeric = models.FloatField(null=True, blank=True, editable=False)
+    sigma_up_numeric = models.FloatField(null=True, blank=True, editable=False)
+    sigma_down_numeric = models.FloatField(null=True, blank=True, editable=False)
+
     # Time stamps, and logging of who changed user info
     last_updated_by = models.ForeignKey(
         UserModel,
@@ -467,8 +488,41 @@ class Observation(models.Model):
     date_created = models.DateTimeField("Date Created", auto_now_add=True)
     date_updated = models.DateTimeField("Date Last Changed", auto_now=True)
 
+    objects = ObservationManager()
+
     class Meta:
         ordering = ["-id"]
+        indexes = [
+            models.Index(
+                fields=["parameter", "value_numeric"],
+                name="catalogue_obs_param_value_idx",
+            ),
+            models.Index(
+                fields=["astro_object", "parameter"],
+                name="catalogue_obs_object_param_idx",
+            ),
+            models.Index(
+                fields=["reference", "parameter"],
+                name="catalogue_obs_ref_param_idx",
+            ),
+        ]
+        # The natural key. unique_together rather than a UniqueConstraint, because
+        # ModelForms (and the admin) validate the former but not the latter.
+        # Column order: also serves the (reference, astro_object) lookups of
+        # catalogue.pivot.refresh_observation_table_row
+        unique_together = [OBSERVATION_NATURAL_KEY]
+
+    def natural_key(self):
+        return tuple(getattr(self, field + "_id") for field in OBSERVATION_NATURAL_KEY)
+
+    def set_numeric_values(self):
+        self.value_numeric = parse_float(self.value)
+        self.sigma_up_numeric = parse_float(self.sigma_up)
+        self.sigma_down_numeric = parse_float(self.sigma_down)
+
+    def save(self, *args, **kwargs):
+        self.set_numeric_values()
+        super(Observation, self).save(*args, **kwargs)
 
     def get_absolute_url(self):
         return reverse("catalogue:observation_detail", args=[self.slug])
@@ -553,3 +607,82 @@ class Rank(models.Model):
 
     class Meta:
         ordering = ["-id"]
+
+
+class ObservationTableRow(models.Model):
+    """Materialized row of the AstroObject x Parameter table of a Reference.
+    Kept up to date by the Observation signal receivers in catalogue.signals,
+    see catalogue.pivot for the details."""
+
+    reference = models.ForeignKey(
+        Reference, related_name="observation_table_rows", on_delete=models.CASCADE
+    )
+
+    astro_object = models.ForeignKey(
+        AstroObject, related_name="observation_table_rows", on_delete=models.CASCADE
+    )
+
+    # {parameter_id: [value, sigma_up, sigma_down, number_of_observations]}
+    values = JSONField(default=dict)
+
+    date_updated = models.DateTimeField("Date Last Changed", auto_now=True)
+
+    class Meta:
+        ordering = ["astro_object_id"]
+        unique_together = ("reference", "astro_object")
+
+    def __str__(self):
+        return "{0} - Ref: {1}".format(self.astro_object_id, self.reference_id)
+
+
+class AstroObjectPosition(models.Model):
+    """Position of an AstroObject according to a Reference, from its RA and Dec
+    Observations. The unit vector (x, y, z) is the spatial index of the cone
+    search, see catalogue.cone. Kept up to date by catalogue.signals."""
+
+    reference = models.ForeignKey(
+        Reference, related_name="positions", on_delete=models.CASCADE
+    )
+
+    astro_object = models.ForeignKey(
+        AstroObject, related_name="positions", on_delete=models.CASCADE
+    )
+
+    ra = models.FloatField("RA [deg]")
+    dec = models.FloatField("Dec [deg]")
+    x = models.FloatField()
+    y = models.FloatField()
+    z = models.FloatField()
+
+    class Meta:
+        ordering = ["astro_object_id"]
+        unique_together = ("reference", "astro_object")
+        indexes = [
+            # z = sin(dec): a cone only scans the band of declinations it spans
+            models.Index(fields=["z"], name="catalogue_position_z_idx"),
+        ]
+
+    def __str__(self):
+        return "{0} ({1}, {2}) - Ref: {3}".format(
+            self.astro_object_id, self.ra, self.dec, self.reference_id
+        )
+
+
+class SearchToken(models.Model):
+    """A word of the searchable fields of an AstroObject, Parameter,
+    Observation or Reference: the full-text index of ?search= of the API and
+    of the search page, see catalogue.search. Kept up to date by
+    catalogue.signals."""
+
+    # The model_name of the model of the instance
+    kind = models.CharField(max_length=16)
+    object_id = models.PositiveIntegerField()
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        ordering = ["kind", "token", "object_id"]
+        # Also the index of the prefix (range) scans of a search
+        unique_together = ("kind", "token", "object_id")
+
+    def __str__(self):
+        return "{0} {1}: {2}".format(self.kind, self.object_id, self.token)
@@ -0,0 +1,195 @@
+"""Resolve the names of AstroObjects, in any of the styles of the catalogues.
+
+Normalization
+-------------
+normalize_name() reduces a designation to a key that is the same for all the
+styles in which the catalogues write it: it is case-insensitive, splits the
+letters from the digits and drops the punctuation and whitespace in between,
+drops the leading zeros of numbers, and replaces the abbreviations of the
+catalogue prefixes by a single one (PREFIX_ALIASES). For example 'NGC 104',
+'ngc104' and 'NGC0104' all become 'ngc 104', and 'Palomar 5', 'Pal5' and
+'pal 5' all become 'pal 5'.
+
+The index
+---------
+NameIndex maps the names and altnames of the AstroObjects (exact), and their
+normalized keys (variant), to the id of the AstroObject. An exact name wins
+over a variant, and a name over an altname. It behaves as the dict of
+{name: id} that the add_* commands used to build, but any variant of the
+name is found as well:
+
+    name_id_map = get_name_index()
+    if gc_name in name_id_map:
+        gc = AstroObject.objects.get(id=name_id_map[gc_name])
+
+Fuzzy matching
+--------------
+A name that is not found at all can be matched approximately with
+NameIndex.fuzzy_match(), by the difflib ratio of the normalized keys, as
+scripts/generic_ingester.py does with fuzzywuzzy. To keep that bounded, a key
+is only compared with the keys that have the same numbers (e.g. 'ncg 104'
+with 'ngc 104' and 'ic 104', not with all keys), which are grouped when the
+index is built. Keys with an abbreviated prefix are compared in their long
+form as well, such that 'Palomr 5' is found as 'Palomar 5'.
+
+The index is built once and kept in the cache until an AstroObject is saved
+or deleted, see catalogue.signals. AstroObject.objects.bulk_create does not
+send signals, so call invalidate_name_index() after it.
+"""
+
+import difflib
+import re
+import unicodedata
+from collections.abc import Mapping
+
+from catalogue.models import AstroObject
+from django.core.cache import cache
+
+NAME_INDEX_KEY = "catalogue:name_index"
+NAME_INDEX_TIMEOUT = 7 * 24 * 3600  # 1 week, invalidated by signals
+
+# Alternative spellings of the catalogue prefix of a designation, and the
+# prefix of the normalized key. Also see utils.GC_NAMES_ANY_TO_SH
+PREFIX_ALIASES = {
+    "palomar": "pal",
+    "terzan": "ter",
+    "liller": "lil",
+    "djorgovski": "djorg",
+    "djor": "djorg",
+    "eridanus": "eri",
+    "lynga": "lyn",
+}
+
+# The long form of the normalized prefixes, for fuzzy matching
+PREFIX_LONG_FORMS = {"pal": "palomar", "ter": "terzan", "lil": "liller", "lyn": "lynga"}
+
+EXACT = "exact"
+VARIANT = "variant"
+FUZZY = "fuzzy"
+
+# The minimum score (0-100) of a fuzzy match
+FUZZY_MIN_SCORE = 85
+
+
+def normalize_name(name):
+    """ Return the normalized key of a designation, see the module docstring """
+
+    name = unicodedata.normalize("NFKD", str(name)).casefold()
+    tokens = re.findall(r"[a-z]+|[0-9]+", name)
+    if tokens and tokens[0] in PREFIX_ALIASES:
+        tokens[0] = PREFIX_ALIASES[tokens[0]]
+    return " ".join(str(int(t)) if t.isdigit() else t for t in tokens)
+
+
+def fuzzy_block(key):
+    """Return the numbers of a normalized key. Only keys with the same numbers
+    are compared by NameIndex.fuzzy_match()"""
+
+    return " ".join(t for t in key.split(" ") if t.isdigit())
+
+
+class NameIndex(Mapping):
+    """Read-only mapping of the name of an AstroObject (in any style) to its
+    id, see the module docstring"""
+
+    def __init__(self, astro_objects):
+        # astro_objects: (id, name, altname, slug) tuples
+        astro_objects = list(astro_objects)
+        self.exact = dict()
+        self.normalized = dict()
+        self.astro_objects = dict()
+        names = [(pk, name, slug) for pk, name, altname, slug in astro_objects]
+        altnames = [(pk, altname, None) for pk, name, altname, slug in astro_objects]
+        for pk, name, slug in names + altnames:
+            if slug is not None:
+                self.astro_objects[pk] = (name, slug)
+            if not name:
+                continue
+            self.exact.setdefault(name, pk)
+            key = normalize_name(name)
+            if key:
+                self.normalized.setdefault(key, pk)
+
+        # {fuzzy_block(key): [(key, id)]} of the keys and their long forms
+        self.fuzzy = dict()
+        for key, pk in self.normalized.items():
+            block = self.fuzzy.setdefault(fuzzy_block(key), [])
+            block.append((key, pk))
+            prefix, space, rest = key.partition(" ")
+            if prefix in PREFIX_LONG_FORMS:
+                block.append((PREFIX_LONG_FORMS[prefix] + space + rest, pk))
+
+    def resolve(self, name):
+        """Return (id, match type) of the AstroObject of a name, where the
+        match type is EXACT or VARIANT, or None if it is not found"""
+
+        if name in self.exact:
+            return self.exact[name], EXACT
+        pk = self.normalized.get(normalize_name(name))
+        if pk is None:
+            return None
+        return pk, VARIANT
+
+    def fuzzy_match(self, name, min_score=FUZZY_MIN_SCORE):
+        """Return (id, score) of the AstroObject whose (normalized) name is the
+        most similar to name, with a score (0-100) of at least min_score, or
+        None if there is none. Meant for the names that resolve() does not find"""
+
+        key = normalize_name(name)
+        if not key:
+            return None
+        best = None
+        threshold = min_score / 100
+        # SequenceMatcher caches its second sequence, so that is the key
+        matcher = difflib.SequenceMatcher(b=key, autojunk=False)
+        for candidate, pk in self.fuzzy.get(fuzzy_block(key), ()):
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < threshold:
+                continue
+            if matcher.quick_ratio() < threshold:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= threshold and (best is None or ratio > best[1]):
+                best = (pk, ratio)
+        if best is None:
+            return None
+        return best[0], round(100 * best[1])
+
+    def describe(self, pk):
+        """ Return (name, slug) of the AstroObject with the id pk """
+        return self.astro_objects[pk]
+
+    def __getitem__(self, name):
+        match = self.resolve(name)
+        if match is None:
+            raise KeyError(name)
+        return match[0]
+
+    def __contains__(self, name):
+        return self.resolve(name) is not None
+
+    def __iter__(self):
+        return iter(self.exact)
+
+    def __len__(self):
+        return len(self.exact)
+
+
+def build_name_index():
+    return NameIndex(
+        AstroObject.objects.order_by("id").values_list("id", "name", "altname", "slug")
+    )
+
+
+def get_name_index():
+    """ Return the (cached) NameIndex of all AstroObjects """
+
+    index = cache.get(NAME_INDEX_KEY)
+    if index is None:
+        index = build_name_index()
+        cache.set(NAME_INDEX_KEY, index, NAME_INDEX_TIMEOUT)
+    return index
+
+
+def invalidate_name_index():
+    cache.delete(NAME_INDEX_KEY)
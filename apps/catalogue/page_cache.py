@@ -0,0 +1,51 @@
+"""Versioned cache_page() of the catalogue API.
+
+cache_page_on(*models) caches the response like cache_page(), but in a cache
+namespace (key_prefix) of the change markers of the models that the response
+is built from, see catalogue.conditional. The signals of catalogue.signals
+replace the marker of a model on every save, delete or m2m change, after
+which the responses that were cached in the previous namespace are never
+read again and simply expire. The cached responses can therefore live for
+days and are still correct immediately after a write.
+
+Browsers and proxies are told to revalidate the response every time
+(max-age=0), which costs a 304 of the ETag of condition_on() or a response
+from the cache.
+"""
+
+import hashlib
+from functools import wraps
+
+from catalogue.conditional import get_change_markers
+from django.utils.cache import patch_response_headers
+from django.views.decorators.cache import cache_page
+
+CACHE_PAGE_TIMEOUT = 7 * 24 * 3600  # 1 week, invalidated by signals
+
+
+def get_key_prefix(*models):
+    tokens = [token for time, token in get_change_markers(*models)]
+    digest = hashlib.md5(":".join(tokens).encode("utf-8")).hexdigest()
+    return "catalogue:page:{0}".format(digest)
+
+
+def cache_page_on(*models, timeout=CACHE_PAGE_TIMEOUT, max_age=0):
+    """Decorator of a view whose response only changes when one of the models
+    changes. Use method_decorator() for the methods of a (DRF) view"""
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def view_with_max_age(request, *args, **kwargs):
+            response = view_func(request, *args, **kwargs)
+            # cache_page() keeps the lowest max-age, but stores for timeout
+            patch_response_headers(response, max_age)
+            return response
+
+        @wraps(view_func)
+        def wrapped_view(request, *args, **kwargs):
+            cached_view = cache_page(timeout, key_prefix=get_key_prefix(*models))
+            return cached_view(view_with_max_age)(request, *args, **kwargs)
+
+        return wrapped_view
+
+    return decorator
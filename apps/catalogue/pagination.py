@@ -0,0 +1,73 @@
+"""Keyset (cursor) pagination of the catalogue API.
+
+DatatablesPageNumberPagination counts all rows and skips to a page with
+OFFSET, so deep pages of a large table get slower and slower. With
+?paginate=keyset the list endpoints of the viewsets that use
+KeysetPaginationMixin are paginated by KeysetPagination instead: the rows are
+ordered on a unique, indexed key and every page continues after the last key
+of the previous page (WHERE id > ... ORDER BY id LIMIT n), which takes the
+same time for every page and never counts the rows. Clients follow the 'next'
+link, which carries an opaque ?cursor=, until it is null. The key is chosen
+with ?keyset_ordering=, because the ?ordering= of the filters may order on
+columns that are not unique; the keyset order replaces the latter.
+
+The DataTables format of the web interface keeps its page number pagination,
+CachedCountPagination, which counts the rows with catalogue.counts.
+"""
+
+from catalogue.counts import CachedCountPaginator
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework_datatables.pagination import DatatablesPageNumberPagination
+
+
+class CachedCountPagination(DatatablesPageNumberPagination):
+    """ DatatablesPageNumberPagination with the cached (or approximate) count """
+
+    django_paginator_class = CachedCountPaginator
+
+
+class KeysetPagination(CursorPagination):
+    page_size_query_param = "length"
+    max_page_size = 10000
+    ordering_query_param = "keyset_ordering"
+
+    def get_ordering(self, request, queryset, view):
+        """Order on ?keyset_ordering=, which must be one of the (unique and indexed)
+        keyset_ordering_fields of the view, or descending on one of them"""
+
+        fields = getattr(view, "keyset_ordering_fields", ("id",))
+        ordering = request.query_params.get(self.ordering_query_param) or fields[0]
+        if ordering.lstrip("-") not in fields:
+            raise ValidationError(
+                {
+                    self.ordering_query_param: "Keyset pagination orders on one of "
+                    "{0}, prefixed with '-' for descending order".format(
+                        ", ".join(fields)
+                    )
+                }
+            )
+        return (ordering,)
+
+
+class KeysetPaginationMixin(object):
+    """ Use KeysetPagination for ?paginate=keyset, or for a given ?cursor= """
+
+    # Unique, indexed model fields that ?keyset_ordering= may choose from
+    keyset_ordering_fields = ("id",)
+
+    def use_keyset_pagination(self):
+        request = getattr(self, "request", None)
+        renderer = getattr(request, "accepted_renderer", None)
+        if renderer is None or renderer.format == "datatables":
+            return False
+        return (
+            request.query_params.get("paginate") == "keyset"
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and self.use_keyset_pagination():
+            self._paginator = KeysetPagination()
+        return super().paginator
@@ -0,0 +1,373 @@
+"""Pivot Observation instances into an AstroObject x Parameter table.
+
+The pivot is built in a single sort/group pass over the observations of a
+queryset, so the cost scales with the number of observations rather than
+with (astro_objects x parameters x observations).
+
+Multiple observations of the same (AstroObject, Parameter) pair
+--------------------------------------------------------------
+A Reference has at most one Observation for each AstroObject and Parameter
+(the natural key of Observation is unique, see ObservationManager.upsert), but
+a queryset that spans multiple References may contain more than one. The table
+has a single cell for each pair, so we must choose one of them:
+
+- ``keep="last"`` (default): the Observation with the highest id wins, i.e. the
+  one that was inserted into the database most recently.
+- ``keep="first"``: the Observation with the lowest id wins.
+
+The number of observations per cell is available in ``ObservationPivot.counts``
+so that callers can flag (or refuse to serve) ambiguous cells.
+
+Materialized tables
+-------------------
+The table of each Reference is stored in ObservationTableRow, one row per
+(Reference, AstroObject) with the values of all its Parameters packed in a
+json blob. When an Observation is saved or deleted only the row of its
+(Reference, AstroObject) is refreshed, using the keep="last" policy, so that
+load_observation_table() is a single indexed read. Observation.objects.bulk_create
+does not send signals, so run `python manage.py refresh_observation_tables`
+after a bulk ingest. The add_* commands suspend the refreshes of every save
+(see catalogue.signals.derived_tables_suspended) and rebuild the tables once
+at the end instead.
+
+Caching
+-------
+get_observation_table() and get_observation_table_columns() cache the rows and
+the column schema of the table per Reference. The cache entries of a Reference
+are deleted when one of its Observations is saved or deleted, and all entries
+are invalidated (by bumping a version number) when an AstroObject or Parameter
+changes because their names end up in the table. See catalogue.signals for the
+receivers.
+
+The DataTables pages of ObservationTableViewset read a CachedTable instead:
+each row is a separate cache entry, keyed by the version of the table (the
+change markers of catalogue.conditional), and so are the row indices of each
+search and ordering. A page reads the indices of its search and ordering and
+the rows of the page only, the whole table is only read for the first request
+of a search or ordering.
+"""
+
+import hashlib
+
+import numpy
+from catalogue.conditional import touch_change_marker
+from catalogue.models import Observation, ObservationTableRow, Parameter
+from django.core.cache import cache
+
+KEEP_CHOICES = ("first", "last")
+VALUE_FIELDS = ("value", "sigma_up", "sigma_down")
+
+OBSERVATION_TABLE_CACHE_TIMEOUT = 7 * 24 * 3600  # 1 week, invalidated by signals
+OBSERVATION_TABLE_VERSION_KEY = "catalogue:observation_table:version"
+
+
+class ObservationPivot(object):
+    """AstroObject x Parameter table of Observation values.
+
+    Rows are ordered by AstroObject id, and columns by Parameter id. Cells for
+    which there is no Observation are None.
+    """
+
+    def __init__(self, astro_objects, parameters, cells, counts):
+        # astro_objects and parameters: lists of (id, name) tuples
+        self.astro_objects = astro_objects
+        self.parameters = parameters
+        # cells: {field: numpy object array of shape (nrows, ncols)}
+        self.cells = cells
+        self.counts = counts
+
+    def __len__(self):
+        return len(self.astro_objects)
+
+    @property
+    def parameter_names(self):
+        return [name for pk, name in self.parameters]
+
+    def column(self, parameter_name, field="value"):
+        """ Return the given field of a Parameter for all AstroObjects """
+        j = self.parameter_names.index(parameter_name)
+        return self.cells[field][:, j]
+
+    def as_rows(self, fields=("value",)):
+        """Return a list of dicts, one per AstroObject. With the default
+        fields=("value",) the keys are 'name' and the parameter names. When
+        more fields are requested the keys are suffixed, e.g. 'RA_sigma_up'"""
+
+        columns = []
+        for field in fields:
+            suffix = "" if field == "value" else "_" + field
+            columns += [
+                (name + suffix, self.cells[field], j)
+                for j, name in enumerate(self.parameter_names)
+            ]
+
+        rows = []
+        for i, (pk, name) in enumerate(self.astro_objects):
+            row = {"name": name}
+            for key, cells, j in columns:
+                row[key] = cells[i, j]
+            rows.append(row)
+        return rows
+
+
+def pivot_observations(observations, keep="last"):
+    """Pivot an Observation queryset into an ObservationPivot, see the module
+    docstring for the policy on multiple observations of the same pair"""
+
+    if keep not in KEEP_CHOICES:
+        raise ValueError(
+            "keep must be one of {0}, not '{1}'".format(KEEP_CHOICES, keep)
+        )
+
+    data = list(
+        observations.order_by("id").values_list(
+            "astro_object__id",
+            "astro_object__name",
+            "parameter__id",
+            "parameter__name",
+            *VALUE_FIELDS,
+        )
+    )
+    if not data:
+        cells = {f: numpy.empty((0, 0), dtype=object) for f in VALUE_FIELDS}
+        return ObservationPivot([], [], cells, numpy.empty((0, 0), dtype=int))
+
+    ao_ids = numpy.array([d[0] for d in data])
+    p_ids = numpy.array([d[2] for d in data])
+    values = {
+        f: numpy.array([d[4 + k] for d in data], dtype=object)
+        for k, f in enumerate(VALUE_FIELDS)
+    }
+
+    # Map the ids to row/column indices. numpy.unique sorts, so the rows are
+    # ordered by AstroObject id and the columns by Parameter id.
+    ao_unique, ao_first, row = numpy.unique(
+        ao_ids, return_index=True, return_inverse=True
+    )
+    p_unique, p_first, col = numpy.unique(p_ids, return_index=True, return_inverse=True)
+    nrows, ncols = len(ao_unique), len(p_unique)
+
+    # Group the observations by cell. The stable sort preserves the id order
+    # within each cell, so the first/last element of a group is the
+    # Observation with the lowest/highest id.
+    cell = row * ncols + col
+    order = numpy.argsort(cell, kind="stable")
+    cell_sorted = cell[order]
+    if keep == "last":
+        is_kept = numpy.append(cell_sorted[1:] != cell_sorted[:-1], True)
+    else:
+        is_kept = numpy.insert(cell_sorted[1:] != cell_sorted[:-1], 0, True)
+    kept = order[is_kept]
+
+    cells = dict()
+    for f in VALUE_FIELDS:
+        cells[f] = numpy.full((nrows, ncols), None, dtype=object)
+        cells[f][row[kept], col[kept]] = values[f][kept]
+    counts = numpy.bincount(cell, minlength=nrows * ncols).reshape(nrows, ncols)
+
+    astro_objects = [(int(pk), data[i][1]) for pk, i in zip(ao_unique, ao_first)]
+    parameters = [(int(pk), data[i][3]) for pk, i in zip(p_unique, p_first)]
+    return ObservationPivot(astro_objects, parameters, cells, counts)
+
+
+def refresh_observation_table_row(reference_id, astro_object_id):
+    """Rebuild the materialized row of a single (Reference, AstroObject), and
+    delete it if there are no Observations left"""
+
+    # The natural key of Observation is unique, so there is no need to order
+    # by id. Ordering would make SQLite prefer the (reference) index, which
+    # is sorted by id, over the natural key index.
+    values = dict()
+    for parameter_id, *cell in (
+        Observation.objects.filter(
+            reference_id=reference_id, astro_object_id=astro_object_id
+        )
+        .order_by()
+        .values_list("parameter_id", *VALUE_FIELDS)
+    ):
+        count = values.get(str(parameter_id), [0])[-1]
+        values[str(parameter_id)] = cell + [count + 1]
+
+    if not values:
+        ObservationTableRow.objects.filter(
+            reference_id=reference_id, astro_object_id=astro_object_id
+        ).delete()
+        return None
+
+    row, created = ObservationTableRow.objects.update_or_create(
+        reference_id=reference_id,
+        astro_object_id=astro_object_id,
+        defaults={"values": values},
+    )
+    return row
+
+
+def refresh_observation_tables(references=None):
+    """Rebuild the materialized tables of the given References (all of them
+    if None) from scratch, e.g. after Observation.objects.bulk_create"""
+
+    observations = Observation.objects.all()
+    table_rows = ObservationTableRow.objects.all()
+    if references is not None:
+        observations = observations.filter(reference__in=references)
+        table_rows = table_rows.filter(reference__in=references)
+
+    rows = dict()
+    for reference_id, astro_object_id, parameter_id, *cell in (
+        observations.order_by("id")
+        .values_list("reference_id", "astro_object_id", "parameter_id", *VALUE_FIELDS)
+        .iterator()
+    ):
+        values = rows.setdefault((reference_id, astro_object_id), dict())
+        count = values.get(str(parameter_id), [0])[-1]
+        values[str(parameter_id)] = cell + [count + 1]
+
+    table_rows.delete()
+    ObservationTableRow.objects.bulk_create(
+        [
+            ObservationTableRow(
+                reference_id=reference_id,
+                astro_object_id=astro_object_id,
+                values=values,
+            )
+            for (reference_id, astro_object_id), values in rows.items()
+        ],
+        batch_size=1000,
+    )
+    invalidate_observation_table()
+    touch_change_marker(ObservationTableRow)
+    return len(rows)
+
+
+def load_observation_table(reference):
+    """ Return the ObservationPivot of a Reference from its materialized table """
+
+    table_rows = list(
+        ObservationTableRow.objects.filter(reference=reference)
+        .order_by("astro_object_id")
+        .values_list("astro_object_id", "astro_object__name", "values")
+    )
+    parameter_ids = sorted({int(k) for ao, name, values in table_rows for k in values})
+    parameters = list(
+        Parameter.objects.filter(id__in=parameter_ids)
+        .order_by("id")
+        .values_list("id", "name")
+    )
+    column = {pk: j for j, (pk, name) in enumerate(parameters)}
+
+    nrows, ncols = len(table_rows), len(parameters)
+    cells = {f: numpy.full((nrows, ncols), None, dtype=object) for f in VALUE_FIELDS}
+    counts = numpy.zeros((nrows, ncols), dtype=int)
+    for i, (ao, name, values) in enumerate(table_rows):
+        for parameter_id, cell in values.items():
+            j = column[int(parameter_id)]
+            for f, v in zip(VALUE_FIELDS, cell):
+                cells[f][i, j] = v
+            counts[i, j] = cell[-1]
+
+    astro_objects = [(ao, name) for ao, name, values in table_rows]
+    return ObservationPivot(astro_objects, parameters, cells, counts)
+
+
+def observation_table_cache_key(reference_id, kind="rows"):
+    version = cache.get(OBSERVATION_TABLE_VERSION_KEY, 1)
+    return "catalogue:observation_table:{0}:{1}:{2}".format(version, kind, reference_id)
+
+
+def get_observation_table(reference):
+    """ Return the (cached) rows of the materialized table of a Reference """
+
+    key = observation_table_cache_key(reference.pk)
+    rows = cache.get(key)
+    if rows is None:
+        rows = load_observation_table(reference).as_rows()
+        cache.set(key, rows, OBSERVATION_TABLE_CACHE_TIMEOUT)
+    return rows
+
+
+def get_observation_table_columns(reference):
+    """Return the (cached) column schema of the table of a Reference: a list
+    of {"name", "unit"} dicts for 'name' and each Parameter that is observed"""
+
+    key = observation_table_cache_key(reference.pk, kind="columns")
+    columns = cache.get(key)
+    if columns is None:
+        parameters = (
+            Parameter.objects.filter(observations__reference=reference)
+            .distinct()
+            .order_by("id")
+            .values_list("name", "unit")
+        )
+        columns = [{"name": "name", "unit": ""}]
+        columns += [{"name": name, "unit": unit} for name, unit in parameters]
+        cache.set(key, columns, OBSERVATION_TABLE_CACHE_TIMEOUT)
+    return columns
+
+
+def invalidate_observation_table(reference_id=None):
+    """Drop the cached pivot of a single Reference, or of all References if
+    reference_id is None"""
+
+    if reference_id is not None:
+        cache.delete_many(
+            [
+                observation_table_cache_key(reference_id, kind=kind)
+                for kind in ("rows", "columns")
+            ]
+        )
+        return
+
+    try:
+        cache.incr(OBSERVATION_TABLE_VERSION_KEY)
+    except ValueError:  # the key does not exist (yet)
+        cache.set(OBSERVATION_TABLE_VERSION_KEY, 2, None)
+
+
+class CachedTable(object):
+    """A list of rows that is cached one row per cache entry, keyed by the
+    version of its content, so that a page of it is read without the other
+    rows. load() returns all rows, it is only called when (a row of) the
+    table is not in the cache. A new version needs no invalidation, the
+    entries of older versions expire."""
+
+    def __init__(self, version, load, timeout=OBSERVATION_TABLE_CACHE_TIMEOUT):
+        self.version = hashlib.md5(repr(version).encode("utf-8")).hexdigest()
+        self.load = load
+        self.timeout = timeout
+        self._rows = None
+
+    def key(self, kind, name):
+        return "catalogue:cached_table:{0}:{1}:{2}".format(self.version, kind, name)
+
+    @property
+    def rows(self):
+        if self._rows is None:
+            self._rows = list(self.load())
+            data = {self.key("row", i): row for i, row in enumerate(self._rows)}
+            data[self.key("length", "")] = len(self._rows)
+            cache.set_many(data, self.timeout)
+        return self._rows
+
+    def __len__(self):
+        length = None if self._rows is not None else cache.get(self.key("length", ""))
+        return len(self.rows) if length is None else length
+
+    def get_rows(self, indices):
+        """ Return the rows at the given indices """
+        if self._rows is None:
+            keys = [self.key("row", i) for i in indices]
+            rows = cache.get_many(keys)
+            if len(rows) == len(keys):
+                return [rows[key] for key in keys]
+        return [self.rows[i] for i in indices]
+
+    def get_or_set(self, name, func):
+        """Return the (cached) result of func(rows) for this version of the
+        table, e.g. the row indices of a search. name identifies func"""
+
+        key = self.key("result", hashlib.md5(repr(name).encode("utf-8")).hexdigest())
+        result = cache.get(key)
+        if result is None:
+            result = func(self.rows)
+            cache.set(key, result, self.timeout)
+        return result
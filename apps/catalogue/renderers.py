@@ -0,0 +1,89 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework_datatables.renderers import DatatablesRenderer
+
+try:
+    import orjson
+except ImportError:  # optional, see requirements-optional.txt
+    orjson = None
+
+
+class StreamingRenderer(BaseRenderer):
+    """Renderers for views that return a StreamingHttpResponse or FileResponse,
+    which DRF passes through as is. They only exist such that content
+    negotiation accepts `?format=<format>`."""
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only reached for errors, e.g. a 404 for an unknown Reference
+        return str(data).encode(self.charset)
+
+
+class CSVRenderer(StreamingRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONRenderer(StreamingRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+class FITSRenderer(StreamingRenderer):
+    media_type = "application/fits"
+    format = "fits"
+
+
+class VOTableRenderer(StreamingRenderer):
+    media_type = "application/x-votable+xml"
+    format = "votable"
+
+
+class ParquetRenderer(StreamingRenderer):
+    media_type = "application/vnd.apache.parquet"
+    format = "parquet"
+
+
+class ArrowRenderer(StreamingRenderer):
+    media_type = "application/vnd.apache.arrow.file"
+    format = "arrow"
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson if it is installed, which is
+    several times faster than the json module for the large list pages.
+
+    The output is the same JSON, except that some floats are formatted
+    differently (1e16 rather than 1e+16, 0.00001 rather than 1e-05) and that
+    NaN and infinity become null rather than an error. datetimes and the types
+    that orjson does not know are encoded by the encoder_class, as before.
+    Indented output (the browsable API, '; indent=4'), ASCII output and the
+    few values that orjson refuses (e.g. integers beyond 64 bits) use the json
+    module."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escape \u2028 and \u2029 like JSONRenderer, see its render()
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class FastDatatablesRenderer(DatatablesRenderer, FastJSONRenderer):
+    """ DatatablesRenderer that encodes with the FastJSONRenderer """
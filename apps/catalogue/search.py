@@ -0,0 +1,127 @@
+"""Full-text search of the AstroObjects, Observations and References.
+
+The index
+---------
+A SearchFilter searches with an icontains (LIKE '%term%') of every term on
+every search field, joined with the related tables and made DISTINCT: a scan
+of the tables that no index can serve. Instead, the words of the searchable
+fields (SEARCH_FIELDS) are kept in a denormalized table, SearchToken, with
+an index on (kind, token, object_id). A term matches the instances that have
+a word that starts with the term, which is a range scan of that index, so a
+search costs about the number of matches rather than the size of the tables.
+
+Note that this is a prefix match of whole words, rather than the substring
+match of icontains: '104' finds 'NGC 104' and 'NGC 1040', but no longer
+'NGC 6104' (whose words are 'ngc' and '6104').
+
+tokenize() splits a text in its words: case-insensitive and without accents,
+with the letters split from the digits, such that 'NGC 104' and 'ngc104'
+both become ['ngc', '104']. Decimal numbers are a single word, and keep a
+leading minus sign, e.g. '-1.23' becomes ['-1.23'], which '1.23' does not
+match (but the minus of '280-06' is a hyphen, and becomes ['280', '06']).
+
+Searching
+---------
+search_queryset() filters a queryset as a SearchFilter would: every word of
+the query must match, and a word matches if it matches one of the relations,
+e.g. an Observation matches the words of its AstroObject, its Parameter or
+its value. The words of an AstroObject include the names of its
+classifications. Without joins or DISTINCT: with a single relation the filter
+is a subquery per word. With more relations the ids that match are first
+read per relation (one indexed query each), because MariaDB cannot use
+indexes for an OR of IN subqueries and would scan the table. The filter is
+then an OR of IN lists, which it can serve from the index of each column.
+
+The tokens are refreshed when an instance is saved or deleted, see
+catalogue.signals. bulk_create does not send signals, so run
+`python manage.py refresh_search_index` after a bulk ingest.
+"""
+
+import re
+import unicodedata
+
+from catalogue.models import AstroObject, Observation, Parameter, Reference, SearchToken
+from django.db import transaction
+from django.db.models import Q
+
+# The fields (lookups) of which the words are indexed, by model
+SEARCH_FIELDS = {
+    AstroObject: ("name", "altname", "classifications__name"),
+    Parameter: ("name",),
+    Observation: ("value",),
+    Reference: ("first_author", "authors", "year", "title"),
+}
+
+# The words are (and a term is) truncated to the length of SearchToken.token
+TOKEN_LENGTH = 64
+
+
+def tokenize(text):
+    """ Return the list of the (normalized) words of a text """
+
+    text = unicodedata.normalize("NFKD", str(text)).casefold()
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    words = re.findall(r"(?:(?<!\w)-)?[0-9]+(?:\.[0-9]+)?|[^\W\d_]+", text)
+    return [word[:TOKEN_LENGTH] for word in words]
+
+
+def refresh_search_index(model, pks=None):
+    """Rebuild the SearchTokens of the instances of model with the given pks,
+    or of all its instances if None. Return the number of tokens"""
+
+    kind = model._meta.model_name
+    tokens = SearchToken.objects.filter(kind=kind)
+    instances = model.objects.order_by()
+    if pks is not None:
+        tokens = tokens.filter(object_id__in=pks)
+        instances = instances.filter(pk__in=pks)
+
+    rows = set()
+    for pk, *values in instances.values_list("pk", *SEARCH_FIELDS[model]).iterator():
+        for value in values:
+            if value is not None:
+                rows.update((pk, token) for token in tokenize(value))
+
+    with transaction.atomic():
+        tokens.delete()
+        SearchToken.objects.bulk_create(
+            [SearchToken(kind=kind, object_id=pk, token=token) for pk, token in rows],
+            batch_size=1000,
+        )
+    return len(rows)
+
+
+def matching_ids(model, term):
+    """ Return the subquery of the ids of the instances of model that match """
+
+    return SearchToken.objects.filter(
+        kind=model._meta.model_name,
+        token__gte=term,
+        # The upper bound of all words that start with term, a range scan
+        token__lt=term + "\uffff",
+    ).values("object_id")
+
+
+def search_queryset(queryset, query, relations=("pk",)):
+    """Return the queryset of the instances that match all words of query.
+    relations are 'pk' for the words of the instances themselves, or the
+    foreign keys of which the words of the related instances match"""
+
+    model = queryset.model
+    for term in tokenize(query):
+        condition = Q()
+        for relation in relations:
+            if relation == "pk":
+                related_model = model
+            else:
+                related_model = model._meta.get_field(relation).related_model
+            ids = matching_ids(related_model, term)
+            if len(relations) > 1:
+                ids = sorted(set(ids.values_list("object_id", flat=True)))
+                if not ids:
+                    continue
+            condition |= Q(**{relation + "__in": ids})
+        if not condition:
+            return queryset.none()
+        queryset = queryset.filter(condition)
+    return queryset
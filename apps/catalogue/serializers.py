@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from catalogue.models import (
     AstroObject,
     AstroObjectClassification,
@@ -5,8 +7,11 @@ from catalogue.models import (
     Parameter,
     Reference,
 )
+from catalogue.sparse_fields import SparseFieldsetSerializerMixin
+from catalogue.url_templates import UrlTemplate
 from rest_framework.serializers import (
     CharField,
+    HyperlinkedIdentityField,
     HyperlinkedModelSerializer,
     IntegerField,
     ListField,
@@ -19,19 +24,59 @@ from rest_framework.serializers import (
 )
 
 
+class TemplatedHyperlinkedIdentityField(HyperlinkedIdentityField):
+    """HyperlinkedIdentityField that reverses its view once per request, and
+    builds the url of every instance from that UrlTemplate"""
+
+    def get_url(self, obj, view_name, request, format):
+        if hasattr(obj, "pk") and obj.pk in (None, ""):
+            return None
+
+        # The field instance is shared by all rows of a (list) serializer
+        key = (request, view_name, format)
+        cached = getattr(self, "_url_template", None)
+        if cached is None or cached[0] != key:
+            lookup_url_kwarg = self.lookup_url_kwarg
+
+            def build(value):
+                return self.reverse(
+                    view_name,
+                    kwargs={lookup_url_kwarg: value},
+                    request=request,
+                    format=format,
+                )
+
+            cached = self._url_template = (key, UrlTemplate(build))
+        return cached[1](getattr(obj, self.lookup_field))
+
+
 class FrontendUrlMixin(Serializer):
     frontend_url = SerializerMethodField(read_only=True)
+    serializer_url_field = TemplatedHyperlinkedIdentityField
 
     def get_frontend_url(self, obj):
-        return (
-            self.context["request"].scheme
-            + "://"
-            + self.context["request"].get_host()
-            + obj.get_absolute_url()
-        )
+        # scheme://host is the same for all rows of the request
+        host = getattr(self, "_frontend_host", None)
+        if host is None:
+            request = self.context["request"]
+            host = self._frontend_host = request.scheme + "://" + request.get_host()
+        return host + obj.get_absolute_url()
+
+    @classmethod
+    def frontend_url_from_values(cls):
+        """ The slug lookup and UrlTemplate factory for catalogue.fast_serializers """
+        model = cls.Meta.model
 
+        def factory(context):
+            host = context["request"].scheme + "://" + context["request"].get_host()
+            return UrlTemplate(lambda slug: host + model(slug=slug).get_absolute_url())
 
-class ReferenceListSerializer(FrontendUrlMixin, HyperlinkedModelSerializer):
+        return "slug", factory
+
+
+class ReferenceListSerializer(
+    SparseFieldsetSerializerMixin, FrontendUrlMixin, HyperlinkedModelSerializer
+):
     id = IntegerField(read_only=True)
 
     class Meta:
@@ -48,7 +93,9 @@ class ReferenceListSerializer(FrontendUrlMixin, HyperlinkedModelSerializer):
         datatables_always_serialize = ("id",)
 
 
-class ReferenceDetailSerializer(FrontendUrlMixin, HyperlinkedModelSerializer):
+class ReferenceDetailSerializer(
+    SparseFieldsetSerializerMixin, FrontendUrlMixin, HyperlinkedModelSerializer
+):
     id = IntegerField(read_only=True)
 
     class Meta:
@@ -79,7 +126,9 @@ class ObservationSerializerForAstroObjectDetail(ModelSerializer):
         fields = ("parameter", "value", "sigma_up", "sigma_down")
 
 
-class AstroObjectClassificationSerializer(ModelSerializer):
+class AstroObjectClassificationSerializer(
+    SparseFieldsetSerializerMixin, ModelSerializer
+):
     id = IntegerField(read_only=True)
 
     class Meta:
@@ -92,7 +141,9 @@ class AstroObjectClassificationSerializer(ModelSerializer):
         datatables_always_serialize = ("id",)
 
 
-class AstroObjectListSerializer(FrontendUrlMixin, HyperlinkedModelSerializer):
+class AstroObjectListSerializer(
+    SparseFieldsetSerializerMixin, FrontendUrlMixin, HyperlinkedModelSerializer
+):
     id = IntegerField(read_only=True)
     classifications = StringRelatedField(many=True, read_only=True)
 
@@ -108,7 +159,9 @@ class AstroObjectListSerializer(FrontendUrlMixin, HyperlinkedModelSerializer):
         datatables_always_serialize = ("id",)
 
 
-class AstroObjectDetailSerializer(FrontendUrlMixin, HyperlinkedModelSerializer):
+class AstroObjectDetailSerializer(
+    SparseFieldsetSerializerMixin, FrontendUrlMixin, HyperlinkedModelSerializer
+):
     id = IntegerField(read_only=True)
     observations = ObservationSerializerForAstroObjectDetail(many=True)
     classifications = StringRelatedField(many=True, read_only=True)
@@ -127,7 +180,9 @@ class AstroObjectDetailSerializer(FrontendUrlMixin, HyperlinkedModelSerializer):
         datatables_always_serialize = ("id",)
 
 
-class ParameterSerializer(FrontendUrlMixin, HyperlinkedModelSerializer):
+class ParameterSerializer(
+    SparseFieldsetSerializerMixin, FrontendUrlMixin, HyperlinkedModelSerializer
+):
     id = IntegerField(read_only=True)
 
     class Meta:
@@ -144,7 +199,7 @@ class ParameterSerializer(FrontendUrlMixin, HyperlinkedModelSerializer):
         datatables_always_serialize = ("id",)
 
 
-class ObservationSerializer(ModelSerializer):
+class ObservationSerializer(SparseFieldsetSerializerMixin, ModelSerializer):
     id = IntegerField(read_only=True)
 
     class Meta:
@@ -162,15 +217,50 @@ class ObservationSerializer(ModelSerializer):
         depth = 1
 
 
+class ObservationSideloadSerializer(SparseFieldsetSerializerMixin, ModelSerializer):
+    """Observation with the ids of its AstroObject, Parameter and Reference,
+    which are serialized once in the 'included' map, see ?include="""
+
+    id = IntegerField(read_only=True)
+
+    class Meta:
+        model = Observation
+        fields = ObservationSerializer.Meta.fields
+
+
+# Same representation as the nested instances of ObservationSerializer (depth=1)
+class AstroObjectIncludedSerializer(ModelSerializer):
+    class Meta:
+        model = AstroObject
+        fields = "__all__"
+
+
+class ParameterIncludedSerializer(ModelSerializer):
+    class Meta:
+        model = Parameter
+        fields = "__all__"
+
+
+class ReferenceIncludedSerializer(ModelSerializer):
+    class Meta:
+        model = Reference
+        fields = "__all__"
+
+
 class ObservationTableSerializer(Serializer):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # TODO: only use the Parameter instances for which the given Reference has
-        # Observation instances ...
-        self.fields = {"name": CharField()}
-        for p in Parameter.objects.order_by("id"):
-            self.fields[p.name] = CharField()
-        print(self.fields)
+    """Base class for the rows of catalogue.pivot.ObservationPivot.as_rows().
+    Use get_observation_table_serializer() to get the subclass that has a
+    field for each column of a given schema."""
 
     def to_representation(self, obj):
-        return {k: getattr(self.instance[obj], k, None) for k in self.fields}
+        return {k: obj.get(k, None) for k in self.fields}
+
+
+@lru_cache(maxsize=256)
+def get_observation_table_serializer(columns):
+    """Return the ObservationTableSerializer subclass for the given tuple of
+    column names. The classes are built once per schema (and process), the
+    schema itself is cached per Reference in catalogue.pivot"""
+
+    fields = {name: CharField(allow_null=True) for name in columns}
+    return type("ObservationTableSerializer", (ObservationTableSerializer,), fields)
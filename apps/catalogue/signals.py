@@ -0,0 +1,200 @@
+import threading
+from contextlib import contextmanager
+
+from catalogue.conditional import touch_change_marker
+from catalogue.cone import (
+    get_position_parameter_ids,
+    invalidate_position_parameter_ids,
+    refresh_astro_object_position,
+)
+from catalogue.counts import invalidate_counts
+from catalogue.models import (
+    AstroObject,
+    AstroObjectClassification,
+    Auxiliary,
+    Observation,
+    Parameter,
+    Profile,
+    Reference,
+)
+from catalogue.names import invalidate_name_index
+from catalogue.pivot import invalidate_observation_table, refresh_observation_table_row
+from catalogue.search import refresh_search_index
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+_derived_tables = threading.local()
+
+
+@contextmanager
+def derived_tables_suspended():
+    """Do not refresh the derived tables (ObservationTableRow,
+    AstroObjectPosition and SearchToken) on every save within this block, e.g.
+    during an ingest. Rebuild them afterwards with refresh_observation_tables
+    and refresh_search_index. The caches are still invalidated"""
+
+    suspended = getattr(_derived_tables, "suspended", False)
+    _derived_tables.suspended = True
+    try:
+        yield
+    finally:
+        _derived_tables.suspended = suspended
+
+
+def derived_tables_are_suspended():
+    return getattr(_derived_tables, "suspended", False)
+
+
+@receiver(post_init, sender=Observation)
+def remember_observation_table_row(sender, instance, **kwargs):
+    # The admin may move an Observation to another Reference or AstroObject,
+    # in which case the row it used to be part of must be refreshed as well.
+    # Deferred foreign keys (e.g. ?fields= of the API) must not be loaded here
+    instance._observation_table_row = (
+        instance.__dict__.get("reference_id"),
+        instance.__dict__.get("astro_object_id"),
+    )
+    instance._observation_parameter_id = instance.__dict__.get("parameter_id")
+
+
+# Connected before refresh_observation_table_of_reference, which replaces the
+# remembered (reference_id, astro_object_id) of the instance
+@receiver(post_save, sender=Observation)
+@receiver(post_delete, sender=Observation)
+def refresh_astro_object_position_of_observation(sender, instance, **kwargs):
+    if derived_tables_are_suspended():
+        return
+    position_parameter_ids = get_position_parameter_ids()
+    parameter_ids = {instance._observation_parameter_id, instance.parameter_id}
+    instance._observation_parameter_id = instance.parameter_id
+    if not parameter_ids.intersection(position_parameter_ids):
+        return
+    rows = {
+        instance._observation_table_row,
+        (instance.reference_id, instance.astro_object_id),
+    }
+    for reference_id, astro_object_id in rows:
+        if reference_id is None or astro_object_id is None:
+            continue  # the Observation was created, not moved
+        refresh_astro_object_position(reference_id, astro_object_id)
+
+
+@receiver(post_save, sender=Observation)
+@receiver(post_delete, sender=Observation)
+def refresh_observation_table_of_reference(sender, instance, **kwargs):
+    rows = {
+        instance._observation_table_row,
+        (instance.reference_id, instance.astro_object_id),
+    }
+    for reference_id, astro_object_id in rows:
+        if reference_id is None or astro_object_id is None:
+            continue  # the Observation was created, not moved
+        if not derived_tables_are_suspended():
+            refresh_observation_table_row(reference_id, astro_object_id)
+        invalidate_observation_table(reference_id)
+    instance._observation_table_row = (instance.reference_id, instance.astro_object_id)
+
+
+@receiver(post_save, sender=AstroObject)
+@receiver(post_delete, sender=AstroObject)
+@receiver(post_save, sender=Parameter)
+@receiver(post_delete, sender=Parameter)
+def invalidate_all_observation_tables(sender, instance, **kwargs):
+    invalidate_observation_table()
+
+
+@receiver(post_save, sender=AstroObject)
+@receiver(post_delete, sender=AstroObject)
+def invalidate_names(sender, instance, **kwargs):
+    invalidate_name_index()
+
+
+@receiver(post_save, sender=Parameter)
+@receiver(post_delete, sender=Parameter)
+def invalidate_position_parameters(sender, instance, **kwargs):
+    invalidate_position_parameter_ids()
+
+
+@receiver(post_save, sender=AstroObject)
+@receiver(post_delete, sender=AstroObject)
+@receiver(post_save, sender=Parameter)
+@receiver(post_delete, sender=Parameter)
+@receiver(post_save, sender=Observation)
+@receiver(post_delete, sender=Observation)
+@receiver(post_save, sender=Reference)
+@receiver(post_delete, sender=Reference)
+def refresh_search_tokens(sender, instance, **kwargs):
+    if derived_tables_are_suspended():
+        return
+    # Deleted instances still have their pk here, so their tokens are deleted
+    refresh_search_index(sender, [instance.pk])
+
+
+@receiver(pre_delete, sender=AstroObjectClassification)
+def remember_astro_objects_of_classification(sender, instance, **kwargs):
+    if derived_tables_are_suspended():
+        return
+    # The relations are gone (without m2m_changed) once it is deleted
+    instance._search_astro_object_ids = list(
+        instance.astro_objects.values_list("pk", flat=True)
+    )
+
+
+@receiver(post_save, sender=AstroObjectClassification)
+@receiver(post_delete, sender=AstroObjectClassification)
+def refresh_search_tokens_of_classification(sender, instance, **kwargs):
+    if derived_tables_are_suspended():
+        return
+    # The words of an AstroObject include the names of its classifications
+    pks = instance.__dict__.pop("_search_astro_object_ids", None)
+    if pks is None:
+        pks = list(instance.astro_objects.values_list("pk", flat=True))
+    refresh_search_index(AstroObject, pks)
+
+
+@receiver(m2m_changed, sender=AstroObject.classifications.through)
+def refresh_search_tokens_of_classifications(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if derived_tables_are_suspended():
+        return
+    if not reverse:
+        if action.startswith("post_"):
+            refresh_search_index(AstroObject, [instance.pk])
+    elif action == "pre_clear":
+        remember_astro_objects_of_classification(sender, instance)
+    elif action == "post_clear":
+        refresh_search_index(
+            AstroObject, instance.__dict__.pop("_search_astro_object_ids")
+        )
+    elif action in ("post_add", "post_remove"):
+        refresh_search_index(AstroObject, pk_set)
+
+
+# Only the models that are edited. The tables derived from them
+# (ObservationTableRow, AstroObjectPosition, SearchToken) are refreshed by the
+# receivers above, and mark their own changes where they are served
+@receiver([post_save, post_delete], sender=AstroObject)
+@receiver([post_save, post_delete], sender=AstroObjectClassification)
+@receiver(m2m_changed, sender=AstroObject.classifications.through)
+@receiver([post_save, post_delete], sender=Parameter)
+@receiver([post_save, post_delete], sender=Reference)
+@receiver([post_save, post_delete], sender=Observation)
+@receiver([post_save, post_delete], sender=Profile)
+@receiver([post_save, post_delete], sender=Auxiliary)
+def catalogue_changed(sender, instance=None, **kwargs):
+    # The filters of one model join the others, e.g. ?search= of the
+    # AstroObjects matches the names of their classifications
+    invalidate_counts()
+    if kwargs.get("signal") is m2m_changed:
+        # The sender is the through model, both ends of the relation changed
+        touch_change_marker(type(instance))
+        touch_change_marker(kwargs["model"])
+    else:
+        touch_change_marker(sender)
@@ -0,0 +1,172 @@
+"""Sparse fieldsets of the catalogue API: ?fields= and ?omit=.
+
+?fields=name,altname returns only the given fields, ?omit=observations all
+fields but the given ones. Both take (repeated or) comma separated names of
+the fields of the serializer of the action, unknown names are a 400 error.
+The fields in the serializer's Meta.datatables_always_serialize (i.e. 'id')
+are always returned, DataTables needs them as row ids.
+
+The selection also drives the queryset of the viewset: only the relations
+that a selected field consumes are select_related and prefetch_related (see
+SparseFieldsetMixin.field_select_related and field_prefetch_related), and
+the columns of the model are restricted with only() for ?fields=, or the
+columns that are only needed by omitted fields are deferred for ?omit=.
+
+Without ?fields= and ?omit= the same per-field plan is applied to all fields
+of the serializer of the action, such that e.g. the list and retrieve actions
+of a viewset with different serializers each load exactly the relations
+that their serializer consumes.
+"""
+
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import (
+    HyperlinkedIdentityField,
+    ListSerializer,
+    SerializerMethodField,
+)
+
+# Key of the set of selected field names in the serializer context
+SPARSE_FIELDS = "sparse_fields"
+
+
+def get_field_list(request, param):
+    return [
+        v.strip()
+        for value in request.query_params.getlist(param)
+        for v in value.split(",")
+        if v.strip()
+    ]
+
+
+def get_model_columns(serializer, names):
+    """Return the names of the concrete model fields that the given fields of
+    the serializer read, or None if that cannot be determined"""
+
+    model = serializer.Meta.model
+    columns = set()
+    for name in names:
+        field = serializer.fields[name]
+        if isinstance(field, SerializerMethodField):
+            hook = getattr(type(serializer), name + "_from_values", None)
+            if hook is None:
+                return None
+            source = hook()[0]  # see catalogue.fast_serializers
+        elif isinstance(field, HyperlinkedIdentityField):
+            source = field.lookup_field
+        elif field.source == "*":
+            return None
+        else:
+            source = field.source_attrs[0]
+
+        try:
+            model_field = (
+                model._meta.pk if source == "pk" else model._meta.get_field(source)
+            )
+        except FieldDoesNotExist:  # e.g. a property
+            return None
+        if model_field.concrete:
+            columns.add(model_field.name)
+    return columns
+
+
+class SparseFieldsetSerializerMixin(object):
+    """Drop the fields that were not selected with ?fields= or ?omit=. Only the
+    top level serializer (or the child of a top level many=True serializer) is
+    affected, nested serializers keep all their fields"""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.context.get(SPARSE_FIELDS)
+        if selected is None:
+            return fields
+        parent = getattr(self, "parent", None)
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        return OrderedDict((k, v) for k, v in fields.items() if k in selected)
+
+
+class SparseFieldsetMixin(object):
+    """?fields= and ?omit= for a ReadOnlyModelViewSet. If field_select_related
+    or field_prefetch_related is given, the queryset should not select or
+    prefetch any relations itself"""
+
+    # {serializer field: select_related() lookups that it consumes}
+    field_select_related = {}
+    # {serializer field: prefetch_related() lookups that it consumes}
+    field_prefetch_related = {}
+
+    def get_sparse_fields(self):
+        """Return the set of the selected field names, or None if neither
+        ?fields= nor ?omit= was given"""
+
+        if hasattr(self, "_sparse_fields"):
+            return self._sparse_fields
+
+        self._sparse_fields = None
+        if getattr(self, "request", None) is None:  # e.g. schema generation
+            return None
+        fields = get_field_list(self.request, "fields")
+        omit = get_field_list(self.request, "omit")
+        if fields or omit:
+            serializer_class = self.get_serializer_class()
+            available = list(serializer_class().fields)
+            for param, names in [("fields", fields), ("omit", omit)]:
+                unknown = [v for v in names if v not in available]
+                if unknown:
+                    raise ValidationError(
+                        {
+                            param: "Unknown field(s) {0}, choose from {1}".format(
+                                ", ".join(unknown), ", ".join(available)
+                            )
+                        }
+                    )
+            always = getattr(serializer_class.Meta, "datatables_always_serialize", ())
+            self._sparse_fields = (set(fields or available) - set(omit)) | set(always)
+        return self._sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context[SPARSE_FIELDS] = self.get_sparse_fields()
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        selected = sparse = self.get_sparse_fields()
+        if selected is None:
+            if not (self.field_select_related or self.field_prefetch_related):
+                return queryset
+            selected = set(self.get_serializer_class()().fields)
+
+        select_related = [
+            lookup
+            for name in sorted(selected)
+            for lookup in self.field_select_related.get(name, ())
+        ]
+        prefetch_related = [
+            lookup
+            for name in sorted(selected)
+            for lookup in self.field_prefetch_related.get(name, ())
+        ]
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+
+        if sparse is None:
+            return queryset
+        serializer = self.get_serializer_class()()
+        columns = get_model_columns(serializer, selected)
+        if columns is None:
+            return queryset
+        if get_field_list(self.request, "fields"):
+            return queryset.only(*columns)
+        omitted = get_model_columns(serializer, set(serializer.fields) - selected)
+        if omitted and omitted - columns:
+            queryset = queryset.defer(*(omitted - columns))
+        return queryset
@@ -1,22 +1,8 @@
-function retrieve_observation_table_columns() {
-    var columns = [];
-    $.ajax({
-        type: 'GET',
-        url: '/api/v1/catalogue/observation_table/?format=json',
-        dataType: 'json',
-        async: false,
-        success: function(data) {
-            columns = data.results[0];
-        }
-    });
-    return columns;
-}
-
 function set_observation_table_header(columns) {
     var r = new Array(), n = -1;
     r[++n] = '<tr>';
-    Object.entries(columns).forEach(([key, value]) => {
-        r[++n] = '<th>' + key + '</th>';
+    columns.forEach(function(column) {
+        r[++n] = '<th>' + column.name + (column.unit ? ' [' + column.unit + ']' : '') + '</th>';
     });
     r[++n] = '</tr>';
     $('#observationsTableHead').html(r.join(''));
@@ -24,17 +10,23 @@ function set_observation_table_header(columns) {
 }
 
 
-function set_observation_table(columns) {
-    var cols = new Array(), n = -1;
-    Object.entries(columns).forEach(([key, value]) => {
-        cols[++n] = {'data': key};
-    });
-    var table = $('#observationsTable').DataTable({
-        'serverSide': false,
-        'processing': true,
-        'lengthMenu': [[10, 25, 50, 100, -1], [10, 25, 50, 100, "All"]],
-        'ajax': '/api/v1/catalogue/observation_table/?format=datatables',
-        'order': [[ 1, 'asc' ]],
-        'columns': cols
+function set_observation_table(reference) {
+    // The column schema is small and cached server-side. The rows are paged,
+    // sorted and searched server-side, and arrive as lists ordered as the
+    // columns. Hence the columns use 'data': index rather than the name, which
+    // would break on names such as '[Fe/H]' or 'M_V,t'.
+    var query = (typeof reference !== 'undefined') ? '&reference=' + encodeURIComponent(reference) : '';
+    $.getJSON('/api/v1/catalogue/observation_table/columns/?format=json' + query, function(data) {
+        set_observation_table_header(data.columns);
+        var table = $('#observationsTable').DataTable({
+            'serverSide': true,
+            'processing': true,
+            'lengthMenu': [[10, 25, 50, 100, -1], [10, 25, 50, 100, "All"]],
+            'ajax': '/api/v1/catalogue/observation_table/?format=datatables' + query,
+            'order': [[ 1, 'asc' ]],
+            'columns': data.columns.map(function(column, i) {
+                return {'data': i, 'name': column.name};
+            })
+        });
     });
 }
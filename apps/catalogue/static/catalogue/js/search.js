@@ -121,9 +121,10 @@ function autocomplete(inp, astroObjectNames) {
             /* and and make the current item more visible: */
             addActive(x);
         } else if (e.keyCode == 13) {
-            /* If the ENTER key is pressed, prevent the form from being submitted, */
-            e.preventDefault();
+            /* If the ENTER key is pressed on an 'active' item, prevent the form
+             * from being submitted (to the search page), */
             if (currentFocus > -1) {
+                e.preventDefault();
                 /* and simulate a click on the 'active' item: */
                 if (x) x[currentFocus].click();
             }
@@ -1,5 +1,9 @@
+import csv
+import io
 import json
+from unittest import mock
 
+from catalogue.api_views import ObservationTableViewset
 from catalogue.factories import (
     AstroObjectClassificationFactory,
     AstroObjectFactory,
@@ -10,6 +14,7 @@ from catalogue.factories import (
     RankFactory,
     ReferenceFactory,
 )
+from catalogue.fast_serializers import compile_serializer
 from catalogue.models import (
     AstroObject,
     AstroObjectClassification,
@@ -19,9 +24,19 @@ from catalogue.models import (
     Profile,
     Rank,
     Reference,
+    SearchToken,
 )
+from catalogue.pivot import get_observation_table
+from catalogue.serializers import ParameterSerializer, get_observation_table_serializer
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.serializers import SerializerMethodField
 from rest_framework.test import APITestCase
 
 from tests.test_api import AnonReadOnlyAPITestCase
@@ -154,11 +169,567 @@ class ObservationViewSetTestCase(AnonReadOnlyAPITestCase, APITestCase):
             self.assertEqual(len(response.data["data"]), page_size)
 
 
+class ObservationNumericFilterTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.feh = ParameterFactory(name="[Fe/H]", slug="feh")
+        cls.spt = ParameterFactory(name="spt", slug="spt")
+        for value in ["-2.7", "-2.5", "-2.0", "-1.5", "-0.5"]:
+            ObservationFactory(parameter=cls.feh, value=value, sigma_up="0.1")
+        for value in ["F7", "nan", "1.5"]:
+            ObservationFactory(parameter=cls.spt, value=value)
+
+    def get_values(self, query):
+        response = self.client.get(
+            reverse("observation-list") + "?format=json&length=100&" + query
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [o["value"] for o in json.loads(response.content)["results"]]
+
+    def test_numeric_values_are_parsed_on_save(self):
+        o = Observation.objects.get(parameter=self.feh, value="-2.5")
+        self.assertEqual(o.value_numeric, -2.5)
+        self.assertEqual(o.sigma_up_numeric, 0.1)
+        self.assertIsNone(o.sigma_down_numeric)
+        for value in ["F7", "nan"]:
+            o = Observation.objects.get(parameter=self.spt, value=value)
+            self.assertIsNone(o.value_numeric)
+
+    def test_parameter_by_id_slug_and_name(self):
+        for value in [self.feh.id, self.feh.slug, self.feh.name]:
+            values = self.get_values("parameter={0}".format(value))
+            self.assertEqual(len(values), 5)
+
+    def test_value_range(self):
+        values = self.get_values("parameter=[Fe/H]&value__lt=-1.5&value__gte=-2.5")
+        self.assertEqual(sorted(values), ["-2.0", "-2.5"])
+        values = self.get_values("parameter=feh&value__lte=-1.5&value__gt=-2.5")
+        self.assertEqual(sorted(values), ["-1.5", "-2.0"])
+
+    def test_non_numeric_values_are_not_matched_by_range(self):
+        self.assertEqual(sorted(self.get_values("parameter=spt")), ["1.5", "F7", "nan"])
+        self.assertEqual(self.get_values("parameter=spt&value__gt=-10"), ["1.5"])
+
+    def test_ordering_by_numeric_value(self):
+        values = self.get_values("parameter=[Fe/H]&ordering=-value")
+        self.assertEqual(values, ["-0.5", "-1.5", "-2.0", "-2.5", "-2.7"])
+
+
+class ObservationSideloadTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.references = ReferenceFactory.create_batch(2)
+        cls.parameter = ParameterFactory()
+        for i in range(10):
+            ObservationFactory(reference=cls.references[i % 2], parameter=cls.parameter)
+
+    def get(self, query):
+        response = self.client.get(reverse("observation-list") + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)
+
+    def test_included_entities_are_deduplicated(self):
+        data = self.get("?format=json&include=reference,parameter")
+        self.assertEqual(data["count"], 10)
+        self.assertEqual(len(data["results"]), 10)
+        self.assertEqual(
+            sorted(data["included"]["reference"]),
+            sorted(str(r.id) for r in self.references),
+        )
+        self.assertEqual(list(data["included"]["parameter"]), [str(self.parameter.id)])
+        self.assertNotIn("astro_object", data["included"])
+
+        row = data["results"][0]
+        self.assertIsInstance(row["reference"], int)
+        self.assertIsInstance(row["astro_object"], int)
+
+    def test_included_entities_match_the_nested_representation(self):
+        nested = self.get("?format=json")["results"][0]
+        data = self.get("?format=json&include=astro_object,parameter,reference")
+        row = data["results"][0]
+        for field in ["astro_object", "parameter", "reference"]:
+            self.assertEqual(data["included"][field][str(row[field])], nested[field])
+            self.assertEqual(row[field], nested[field]["id"])
+
+    def test_include_queries(self):
+        # count, page, and one query per included model (+ classifications)
+        with self.assertNumQueries(6):
+            self.get("?format=json&include=astro_object,parameter,reference")
+
+    def test_unknown_include(self):
+        response = self.client.get(
+            reverse("observation-list") + "?format=json&include=author"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FastListSerializationTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        classifications = AstroObjectClassificationFactory.create_batch(3)
+        cls.references = ReferenceFactory.create_batch(5)
+        astro_objects = [
+            AstroObjectFactory(classifications=classifications[: i % 4])
+            for i in range(6)
+        ]
+        AstroObjectFactory(name="ω Cen", altname="NGC 5139 – ω Centauri")
+        ParameterFactory(name="[Fe/H]", unit="dex", scale=0.1)
+        for i, astro_object in enumerate(astro_objects):
+            ObservationFactory(
+                astro_object=astro_object,
+                reference=cls.references[i % 5],
+                sigma_up=None if i % 3 else "0.1",
+            )
+
+    def get(self, uri, fast):
+        with self.settings(FAST_LIST_SERIALIZATION=fast):
+            response = self.client.get(uri)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.content
+
+    def test_output_is_identical(self):
+        datatables = "?format=datatables&draw=2&length=4&start={0}"
+        columns = "&columns[0][data]=name&columns[1][data]=classifications"
+        queries = [
+            "?format=json",
+            "?format=json&length=3&page=2",
+            "?format=json&search=a",
+            datatables.format(0),
+            datatables.format(4),
+            datatables.format(0) + columns,
+            "?format=datatables&length=-1",
+            "?format=datatables&length=10&order[0][column]=0&order[0][dir]=desc"
+            "&columns[0][data]=name&columns[0][name]=name",
+        ]
+        for name in ["reference", "astroobject", "parameter", "observation"]:
+            for query in queries:
+                uri = reverse(name + "-list") + query
+                with self.subTest(uri=uri):
+                    self.assertEqual(
+                        self.get(uri, fast=True), self.get(uri, fast=False)
+                    )
+
+        uri = reverse("observation-list") + "?format=json&parameter=[Fe/H]"
+        self.assertEqual(self.get(uri, fast=True), self.get(uri, fast=False))
+        uri = reverse("reference-list") + ".json"
+        self.assertEqual(self.get(uri, fast=True), self.get(uri, fast=False))
+
+    def test_observation_queries(self):
+        # count, page, and the classifications of the page's AstroObjects
+        uri = reverse("observation-list") + "?format=json"
+        with self.settings(FAST_LIST_SERIALIZATION=True):
+            with self.assertNumQueries(3):
+                self.client.get(uri)
+
+    def test_browsable_api_is_not_affected(self):
+        uri = reverse("parameter-list") + "?format=api"
+        response = self.get(uri, fast=True)
+        self.assertIn(b"Parameter List", response)
+
+    def test_unsupported_serializer_field(self):
+        class UnsupportedSerializer(ParameterSerializer):
+            name_and_unit = SerializerMethodField()
+
+            class Meta(ParameterSerializer.Meta):
+                fields = ("id", "name_and_unit")
+
+        with self.assertRaises(ImproperlyConfigured):
+            compile_serializer(UnsupportedSerializer)
+
+
+class SparseFieldsetTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        classifications = AstroObjectClassificationFactory.create_batch(2)
+        astro_objects = [
+            AstroObjectFactory(classifications=classifications) for i in range(3)
+        ]
+        parameter = ParameterFactory()
+        for astro_object in astro_objects:
+            ObservationFactory(astro_object=astro_object, parameter=parameter)
+            ProfileFactory(astro_object=astro_object)
+
+    def get(self, name, query, fast=False):
+        with self.settings(FAST_LIST_SERIALIZATION=fast):
+            response = self.client.get(reverse(name) + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get("astroobject-list", "?format=json&fields=name,altname")
+        for row in response.json()["results"]:
+            self.assertEqual(list(row), ["id", "name", "altname"])
+        # count + page, no prefetches of classifications, observations, profiles
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn("date_created", queries[-1]["sql"])
+
+        response = self.get("observation-list", "?format=json&fields=value")
+        for row in response.json()["results"]:
+            self.assertEqual(list(row), ["id", "value"])
+
+    def test_omit(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get("parameter-list", "?format=json&omit=description")
+        row = response.json()["results"][0]
+        self.assertNotIn("description", row)
+        self.assertIn("frontend_url", row)
+        self.assertNotIn("description", queries[-1]["sql"])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(
+                "observation-list", "?format=json&omit=astro_object,reference"
+            )
+        row = response.json()["results"][0]
+        self.assertEqual(
+            list(row), ["id", "parameter", "value", "sigma_up", "sigma_down"]
+        )
+        self.assertEqual(len(queries), 2)  # no prefetch of the classifications
+        self.assertNotIn("catalogue_reference", queries[-1]["sql"])
+
+    def test_nested_and_related_fields(self):
+        astro_object = AstroObject.objects.first()
+        response = self.client.get(
+            reverse("astroobject-detail", args=[astro_object.id])
+            + "?format=json&fields=observations,classifications"
+        )
+        data = response.json()
+        self.assertEqual(list(data), ["id", "observations", "classifications"])
+        self.assertEqual(len(data["observations"]), 1)
+        self.assertEqual(len(data["classifications"]), 2)
+
+        response = self.get("observation-list", "?format=json&fields=astro_object")
+        nested = response.json()["results"][0]["astro_object"]
+        self.assertEqual(len(nested["classifications"]), 2)  # not sparse
+
+    def test_datatables_and_fast_path(self):
+        for name, query in [
+            ("astroobject-list", "?format=datatables&length=2&fields=name"),
+            ("astroobject-list", "?format=json&fields=name,classifications"),
+            ("observation-list", "?format=json&omit=reference"),
+            ("reference-list", "?format=json&fields=url,frontend_url"),
+        ]:
+            self.assertEqual(
+                self.get(name, query, fast=True).content,
+                self.get(name, query, fast=False).content,
+            )
+
+    def test_unknown_field(self):
+        for query in ["?fields=name,author", "?omit=author"]:
+            response = self.client.get(reverse("astroobject-list") + query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AstroObjectQueryPlanTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        reference = ReferenceFactory()
+        classifications = AstroObjectClassificationFactory.create_batch(2)
+        parameters = ParameterFactory.create_batch(4)
+        cls.astro_objects = [
+            AstroObjectFactory(classifications=classifications) for i in range(10)
+        ]
+        for astro_object in cls.astro_objects:
+            for parameter in parameters:
+                ObservationFactory(
+                    astro_object=astro_object, reference=reference, parameter=parameter
+                )
+            ProfileFactory(astro_object=astro_object, reference=reference)
+            AuxiliaryFactory(astro_object=astro_object, reference=reference)
+
+    def get(self, uri, tables, num_queries):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(uri)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), num_queries)
+        sql = " ".join(q["sql"] for q in queries)
+        for table in ["observation", "parameter", "profile", "auxiliary"]:
+            if table not in tables:
+                self.assertNotIn('"catalogue_{0}"'.format(table), sql)
+        return response
+
+    def test_list(self):
+        uri = reverse("astroobject-list") + "?format=json"
+        # count, page, classifications
+        response = self.get(uri, tables=["classification"], num_queries=3)
+        self.assertEqual(len(response.json()["results"]), 10)
+
+    def test_list_datatables(self):
+        uri = reverse("astroobject-list") + "?format=datatables&length=5"
+        # total count, filtered count, page, classifications
+        response = self.get(uri, tables=["classification"], num_queries=4)
+        self.assertEqual(len(response.json()["data"]), 5)
+
+    def test_search(self):
+        uri = reverse("astroobject-list") + "?format=json&search=TestClassification"
+        response = self.get(uri, tables=["classification"], num_queries=3)
+        self.assertEqual(response.json()["count"], 10)
+
+    def test_retrieve(self):
+        astro_object = self.astro_objects[0]
+        uri = reverse("astroobject-detail", args=[astro_object.id]) + "?format=json"
+        # instance, classifications, observations joined with their parameters
+        response = self.get(uri, tables=["observation", "parameter"], num_queries=3)
+        data = response.json()
+        self.assertEqual(len(data["observations"]), 4)
+        self.assertEqual(len(data["classifications"]), 2)
+        observation = astro_object.observations.order_by("-id").first()
+        self.assertEqual(
+            data["observations"][0],
+            {
+                "parameter": observation.parameter.name,
+                "value": observation.value,
+                "sigma_up": observation.sigma_up,
+                "sigma_down": observation.sigma_down,
+            },
+        )
+
+
+class KeysetPaginationTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parameter = ParameterFactory()
+        ObservationFactory.create_batch(7, parameter=cls.parameter)
+        ObservationFactory.create_batch(3)
+
+    def walk(self, uri, fast=False):
+        """ Return the ids of all pages, and the SQL of the queries """
+        ids, sql = [], []
+        with self.settings(FAST_LIST_SERIALIZATION=fast):
+            while uri:
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(uri)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                data = response.json()
+                self.assertNotIn("count", data)
+                ids += [row["id"] for row in data["results"]]
+                sql += [q["sql"] for q in queries]
+                uri = data["next"]
+        return ids, sql
+
+    def test_walk_all_pages(self):
+        uri = reverse("observation-list") + "?format=json&paginate=keyset&length=3"
+        for fast in [False, True]:
+            ids, sql = self.walk(uri, fast=fast)
+            self.assertEqual(
+                ids, sorted(Observation.objects.values_list("id", flat=True))
+            )
+            self.assertFalse(any("COUNT(" in q for q in sql))
+            # The pages after the first continue after the last id, without OFFSET
+            page = [q for q in sql if 'FROM "catalogue_observation"' in q][-1]
+            self.assertIn('"catalogue_observation"."id" >', page)
+            self.assertNotIn("OFFSET", page)
+
+    def test_filters_and_ordering(self):
+        uri = reverse("observation-list") + "?format=json&paginate=keyset&length=2"
+        ids, sql = self.walk(uri + "&parameter={0}".format(self.parameter.id))
+        self.assertEqual(len(ids), 7)
+        ids, sql = self.walk(uri + "&keyset_ordering=-id")
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        # The ?ordering= of the filters is not a keyset ordering
+        ids, sql = self.walk(uri + "&ordering=value")
+        self.assertEqual(ids, sorted(ids))
+
+        uri = reverse("astroobject-list") + "?format=json&paginate=keyset&length=4"
+        names, sql = self.walk(uri + "&keyset_ordering=name&fields=name", fast=True)
+        self.assertEqual(len(names), AstroObject.objects.count())
+
+        response = self.client.get(uri + "&keyset_ordering=altname")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_datatables_keeps_page_numbers(self):
+        response = self.client.get(
+            reverse("reference-list") + "?format=datatables&paginate=keyset&length=2"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["recordsTotal"], Reference.objects.count())
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class CachedCountTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parameter = ParameterFactory()
+        ObservationFactory.create_batch(7, parameter=cls.parameter)
+        ObservationFactory.create_batch(3)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def get(self, query):
+        """ Return the response data and the COUNT queries of a request """
+        # Bypass the cache of the responses (cache_page), like jQuery's cache=false
+        self.requests = getattr(self, "requests", 0) + 1
+        query += "&_={0}".format(self.requests)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("observation-list") + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json(), [q["sql"] for q in queries if "COUNT(" in q["sql"]]
+
+    def test_count_is_cached_per_filter(self):
+        query = "?format=json&length=2&parameter={0}".format(self.parameter.id)
+        data, counts = self.get(query)
+        self.assertEqual(data["count"], 7)
+        self.assertEqual(len(counts), 1)
+
+        # Other pages, another order of the parameters, and sparse fields
+        for query in [
+            "?parameter={0}&format=json&length=2&page=2",
+            "?format=json&fields=id,value&parameter={0}",
+            "?format=json&parameter={0}&ordering=-id",
+        ]:
+            data, counts = self.get(query.format(self.parameter.id))
+            self.assertEqual(data["count"], 7)
+            self.assertEqual(counts, [])
+
+        data, counts = self.get("?format=json&length=2")
+        self.assertEqual(data["count"], 10)
+        self.assertEqual(len(counts), 1)
+
+        # Saving (or deleting) any Observation invalidates the counts
+        ObservationFactory(parameter=self.parameter)
+        data, counts = self.get(query.format(self.parameter.id))
+        self.assertEqual(data["count"], 8)
+        self.assertEqual(len(counts), 1)
+        Observation.objects.filter(parameter=self.parameter).first().delete()
+        data, counts = self.get(query.format(self.parameter.id))
+        self.assertEqual(data["count"], 7)
+
+    def test_count_is_kept_when_other_models_change(self):
+        query = "?format=json&length=2&parameter={0}".format(self.parameter.id)
+        self.get(query)
+
+        # Neither the models of other apps, nor the tables that are derived
+        # from the catalogue (e.g. the search index) invalidate the counts
+        get_user_model().objects.create_user("counts@example.com")
+        SearchToken.objects.create(kind="observation", object_id=1, token="x")
+        SearchToken.objects.filter(token="x").delete()
+        data, counts = self.get(query)
+        self.assertEqual(data["count"], 7)
+        self.assertEqual(counts, [])
+
+    def test_datatables_counts_are_cached(self):
+        name = Observation.objects.first().astro_object.name
+        query = (
+            "?format=datatables&length=2&columns[0][data]=astro_object.name"
+            "&columns[0][searchable]=true&search[value]={0}".format(name)
+        )
+        data, counts = self.get(query)
+        self.assertEqual(data["recordsTotal"], 10)
+        self.assertEqual(data["recordsFiltered"], 1)
+        self.assertEqual(len(counts), 2)
+
+        data, counts = self.get(query + "&start=0&draw=2")
+        self.assertEqual((data["recordsTotal"], data["recordsFiltered"]), (10, 1))
+        self.assertEqual(counts, [])
+
+    def test_approximate_count(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        ObservationFactory.create_batch(2)
+
+        with self.settings(APPROXIMATE_COUNTS=True, APPROXIMATE_COUNT_THRESHOLD=5):
+            # The unfiltered total is the estimate of the statistics, without
+            # a COUNT query, filtered counts are exact
+            data, counts = self.get("?format=json")
+            self.assertEqual(data["count"], 10)
+            self.assertEqual(counts, [])
+            data, counts = self.get(
+                "?format=json&parameter={0}".format(self.parameter.id)
+            )
+            self.assertEqual(data["count"], 7)
+            self.assertEqual(len(counts), 1)
+
+        with self.settings(APPROXIMATE_COUNTS=True, APPROXIMATE_COUNT_THRESHOLD=100):
+            data, counts = self.get("?format=json")
+            self.assertEqual(data["count"], 12)
+
+
+class ObservationExportTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.feh = ParameterFactory(name="[Fe/H]", unit="dex")
+        ObservationFactory.create_batch(3, parameter=cls.feh, sigma_up="0.1")
+        ObservationFactory.create_batch(2)
+
+    def export(self, query=""):
+        response = self.client.get(reverse("observation-export") + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode("utf-8")
+
+    def test_export_csv(self):
+        response, content = self.export("?format=csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn("supaharris_observations.csv", response["Content-Disposition"])
+
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(
+            rows[0],
+            [
+                "id",
+                "astro_object",
+                "parameter",
+                "value",
+                "sigma_up",
+                "sigma_down",
+                "unit",
+                "reference",
+            ],
+        )
+        self.assertEqual(len(rows), 1 + Observation.objects.count())
+
+        o = Observation.objects.filter(parameter=self.feh).order_by("id").first()
+        self.assertEqual(
+            rows[1],
+            [
+                str(o.id),
+                o.astro_object.name,
+                "[Fe/H]",
+                o.value,
+                "0.1",
+                "",
+                "dex",
+                o.reference.bib_code,
+            ],
+        )
+
+    def test_export_defaults_to_csv(self):
+        response, content = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv")
+
+    def test_export_ndjson_with_filters(self):
+        response, content = self.export("?format=ndjson&parameter=[Fe/H]")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row["parameter"] for row in rows}, {"[Fe/H]"})
+        self.assertEqual(rows[0]["sigma_down"], None)
+
+    def test_export_is_a_single_query(self):
+        response = self.client.get(reverse("observation-export") + "?format=csv")
+        with self.assertNumQueries(1):
+            b"".join(response.streaming_content)
+
+    def test_export_unknown_format(self):
+        response = self.client.get(reverse("observation-export") + "?format=xlsx")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
 class ObservationTableViewsetTestCase(AnonReadOnlyAPITestCase, APITestCase):
     # TODO: implement this TestCase
     @classmethod
     def setUpTestData(cls):
         ReferenceFactory.create_batch(2)
+        # Without ?reference= the table of Harris (1996, 2010 ed.) is listed
+        cls.harris = ReferenceFactory(
+            bib_code=ObservationTableViewset.default_reference_bib_code
+        )
+        parameter = ParameterFactory()
+        ObservationFactory.create_batch(3, reference=cls.harris, parameter=parameter)
         super().setUpTestData()
 
     def setUp(self):
@@ -170,7 +741,8 @@ class ObservationTableViewsetTestCase(AnonReadOnlyAPITestCase, APITestCase):
         # TODO: implement the detail view (filtered by Reference)
         self.detail_uri = "reference-detail"
         self.detail_pk = Reference.objects.last().pk
-        self.count = Reference.objects.count()
+        # One row per AstroObject of the default Reference
+        self.count = self.harris.observations.values("astro_object").distinct().count()
         self.data_orm = Reference.objects.order_by("id").first()
         self.data_orm_detail = Reference.objects.get(pk=self.detail_pk)  # last()
         self.serializer_fields = (
@@ -178,3 +750,187 @@ class ObservationTableViewsetTestCase(AnonReadOnlyAPITestCase, APITestCase):
         )  # TODO: Dynamic, depending on which Parameters the Reference has?
         self.resource_name_list = "Observation Table Viewset List"
         self.resource_name_detail = "Observation Table Viewset Instance"
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class ObservationTableReferenceFilterTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parameter = ParameterFactory()
+        cls.references = ReferenceFactory.create_batch(2)
+        for i, reference in enumerate(cls.references):
+            ObservationFactory.create_batch(
+                i + 2, reference=reference, parameter=cls.parameter
+            )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def get_results(self, query):
+        response = self.client.get(
+            reverse("observation_table-list") + "?format=json&" + query
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)["results"]
+
+    def test_reference_by_id_slug_and_bib_code(self):
+        reference = self.references[0]
+        for value in [reference.id, reference.slug, reference.bib_code]:
+            results = self.get_results("reference={0}".format(value))
+            self.assertEqual(len(results), 2)
+            self.assertNotIn("reference", results[0])
+
+    def test_multiple_references(self):
+        slugs = [r.slug for r in self.references]
+        for query in [
+            "reference={0},{1}".format(*slugs),
+            "reference={0}&reference={1}".format(*slugs),
+        ]:
+            results = self.get_results(query)
+            self.assertEqual(len(results), 5)
+            self.assertEqual(
+                [r["reference"] for r in results], 2 * [slugs[0]] + 3 * [slugs[1]]
+            )
+
+    def test_unknown_reference_404(self):
+        response = self.client.get(
+            reverse("observation_table-list") + "?reference=does-not-exist"
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cached_table_is_invalidated_on_observation_save(self):
+        reference = self.references[0]
+        query = "reference={0}".format(reference.id)
+        self.assertEqual(len(self.get_results(query)), 2)
+        ObservationFactory(reference=reference, parameter=self.parameter)
+        self.assertEqual(len(self.get_results(query)), 3)
+
+
+class ObservationTableDatatablesTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reference = ReferenceFactory()
+        cls.parameter = ParameterFactory(unit="deg")
+        ParameterFactory()  # not observed in cls.reference
+        for i, value in enumerate(["10.5", "-3", "F7", None, "2"]):
+            ObservationFactory(
+                reference=cls.reference,
+                astro_object=AstroObjectFactory(name="Cluster {0}".format(i)),
+                parameter=cls.parameter,
+                value=value,
+            )
+
+    def get_datatables(self, query=""):
+        uri = reverse("observation_table-list") + (
+            "?format=datatables&reference={0}&draw=3"
+            "&columns[0][data]=0&columns[0][searchable]=true&columns[0][orderable]=true"
+            "&columns[1][data]=1&columns[1][searchable]=true&columns[1][orderable]=true"
+            "{1}".format(self.reference.id, query)
+        )
+        response = self.client.get(uri)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)
+
+    def test_columns_only_lists_observed_parameters(self):
+        response = self.client.get(
+            reverse("observation_table-columns")
+            + "?format=json&reference={0}".format(self.reference.slug)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["columns"],
+            [
+                {"name": "name", "unit": ""},
+                {"name": self.parameter.name, "unit": "deg"},
+            ],
+        )
+
+    def test_paging(self):
+        data = self.get_datatables("&start=2&length=2&order[0][column]=0")
+        self.assertEqual(data["draw"], 3)
+        self.assertEqual(data["recordsTotal"], 5)
+        self.assertEqual(data["recordsFiltered"], 5)
+        self.assertEqual([row[0] for row in data["data"]], ["Cluster 2", "Cluster 3"])
+
+    def test_numeric_ordering_with_empty_cells_last(self):
+        data = self.get_datatables("&length=-1&order[0][column]=1&order[0][dir]=asc")
+        self.assertEqual(
+            [row[1] for row in data["data"]], ["-3", "2", "10.5", "F7", None]
+        )
+        data = self.get_datatables("&length=-1&order[0][column]=1&order[0][dir]=desc")
+        self.assertEqual(
+            [row[1] for row in data["data"]], ["F7", "10.5", "2", "-3", None]
+        )
+
+    def test_search(self):
+        data = self.get_datatables("&length=10&search[value]=f7")
+        self.assertEqual(data["recordsTotal"], 5)
+        self.assertEqual(data["recordsFiltered"], 1)
+        self.assertEqual(data["data"][0][0], "Cluster 2")
+
+        data = self.get_datatables("&length=10&columns[0][search][value]=cluster 4")
+        self.assertEqual(data["recordsFiltered"], 1)
+        self.assertEqual(data["data"][0][1], "2")
+
+    def test_json_only_has_observed_parameter_columns(self):
+        response = self.client.get(
+            reverse("observation_table-list")
+            + "?format=json&reference={0}".format(self.reference.id)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = json.loads(response.content)["results"]
+        self.assertEqual(len(results), 5)
+        self.assertEqual(list(results[0].keys()), ["name", self.parameter.name])
+
+    def test_serializer_class_is_built_once_per_schema(self):
+        columns = ("name", self.parameter.name)
+        serializer_class = get_observation_table_serializer(columns)
+        self.assertIs(get_observation_table_serializer(columns), serializer_class)
+        self.assertEqual(list(serializer_class().fields.keys()), list(columns))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class CachedObservationTableDatatablesTestCase(ObservationTableDatatablesTestCase):
+    """ The same requests, with the table, searches and orderings cached """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_pages_only_slice(self):
+        query = "&start=0&length=2&order[0][column]=1&search[value]=cluster"
+        with mock.patch(
+            "catalogue.api_views.get_observation_table", wraps=get_observation_table
+        ) as load:
+            first = self.get_datatables(query)
+            self.assertEqual(load.call_count, 1)
+            second = self.get_datatables(query.replace("start=0", "start=2"))
+            third = self.get_datatables(query.replace("start=0", "start=4"))
+            self.assertEqual(load.call_count, 1)
+        values = [row[1] for data in (first, second, third) for row in data["data"]]
+        self.assertEqual(values, ["-3", "2", "10.5", "F7", None])
+        self.assertEqual(third["recordsTotal"], 5)
+        self.assertEqual(third["recordsFiltered"], 5)
+
+        # Only the lookup of the Reference
+        with CaptureQueriesContext(connection) as queries:
+            self.get_datatables(query.replace("start=0", "start=2"))
+        self.assertEqual(len(queries), 1)
+
+    def test_change_is_served(self):
+        query = "&length=10&order[0][column]=1"
+        self.assertEqual(self.get_datatables(query)["recordsTotal"], 5)
+        ObservationFactory(
+            reference=self.reference,
+            astro_object=AstroObjectFactory(name="Cluster 5"),
+            parameter=self.parameter,
+            value="-7",
+        )
+        data = self.get_datatables(query)
+        self.assertEqual(data["recordsTotal"], 6)
+        self.assertEqual(data["data"][0], ["Cluster 5", "-7"])
@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+from catalogue.arrow import ArrowNotInstalled, stream_observations
+from catalogue.factories import (
+    ObservationFactory,
+    ParameterFactory,
+    ProfileFactory,
+    ReferenceFactory,
+)
+from catalogue.models import Observation
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+@skipUnless(pyarrow, "pyarrow is not installed")
+class ArrowExportTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reference = ReferenceFactory()
+        cls.feh = ParameterFactory(name="[Fe/H]", unit="dex")
+        ObservationFactory.create_batch(
+            5, reference=cls.reference, parameter=cls.feh, sigma_up="0.1"
+        )
+        ObservationFactory(reference=cls.reference, value="F7")
+        ProfileFactory.create_batch(2, reference=cls.reference)
+
+    def setUp(self):
+        super().setUp()
+        self.export_root = tempfile.mkdtemp()
+        self.override = override_settings(EXPORT_ROOT=self.export_root)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.export_root)
+        super().tearDown()
+
+    def get(self, uri):
+        response = self.client.get(uri)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return BytesIO(b"".join(response.streaming_content))
+
+    def test_observations_parquet_is_written_in_chunks(self):
+        observations = Observation.objects.order_by("id")
+        data = b"".join(stream_observations(observations, chunk_size=2))
+        parquet = pyarrow.parquet.ParquetFile(BytesIO(data))
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+
+        table = parquet.read()
+        self.assertEqual(table.num_rows, 6)
+        for name in ["astro_object", "parameter", "unit", "reference"]:
+            self.assertTrue(pyarrow.types.is_dictionary(table.schema.field(name).type))
+        rows = table.to_pylist()
+        o = observations.first()
+        self.assertEqual(rows[0]["id"], o.id)
+        self.assertEqual(rows[0]["astro_object"], o.astro_object.name)
+        self.assertEqual(rows[0]["parameter"], "[Fe/H]")
+        self.assertEqual(rows[0]["unit"], "dex")
+        self.assertEqual(rows[0]["value_numeric"], o.value_numeric)
+        self.assertEqual(rows[-1]["value"], "F7")
+        self.assertIsNone(rows[-1]["value_numeric"])
+
+    def test_observations_endpoint_with_filters(self):
+        uri = reverse("observation-export") + "?format=parquet&parameter=[Fe/H]"
+        table = pyarrow.parquet.read_table(self.get(uri))
+        self.assertEqual(table.num_rows, 5)
+
+        uri = reverse("observation-export") + "?format=arrow"
+        table = pyarrow.ipc.open_file(self.get(uri)).read_all()
+        self.assertEqual(table.num_rows, 6)
+
+    def test_observations_endpoint_without_pyarrow(self):
+        with mock.patch(
+            "catalogue.arrow.import_pyarrow", side_effect=ArrowNotInstalled("missing")
+        ):
+            response = self.client.get(
+                reverse("observation-export") + "?format=parquet"
+            )
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+    def test_observation_table_parquet(self):
+        uri = reverse("observation_table-export") + "?format=parquet&reference={0}"
+        table = pyarrow.parquet.read_table(self.get(uri.format(self.reference.slug)))
+        self.assertEqual(table.num_rows, 6)
+        field = table.schema.field("Fe_H")
+        self.assertEqual(field.type, pyarrow.float64())
+        self.assertEqual(field.metadata[b"unit"], b"dex")
+        self.assertIn("Fe_H_sigma_up", table.column_names)
+
+    def test_profiles_command(self):
+        output = os.path.join(self.export_root, "profiles.arrow")
+        stdout = StringIO()
+        call_command(
+            "export_arrow",
+            "profiles",
+            output,
+            format="arrow",
+            reference=[self.reference.slug],
+            stdout=stdout,
+        )
+        self.assertIn("Exported 2 profiles", stdout.getvalue())
+        with open(output, "rb") as f:
+            table = pyarrow.ipc.open_file(f).read_all()
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(table.column("y").to_pylist()[0], [i ** 2 for i in range(10)])
@@ -0,0 +1,68 @@
+from io import StringIO
+from unittest import mock
+
+from catalogue.factories import ObservationFactory
+from catalogue.models import AstroObject
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class WarmCachesTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        ObservationFactory.create_batch(3)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        # The cache panel of django-debug-toolbar replaces the caches of the
+        # cache middleware with a handler that ignores override_settings()
+        patcher = mock.patch("django.middleware.cache.caches", caches)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def test_warm_caches(self):
+        uri = reverse("parameter-list") + "?format=json"
+        stdout = StringIO()
+        # The pool threads can not see the data of the test transaction
+        call_command("warm_caches", uri, host="testserver", workers=1, stdout=stdout)
+        self.assertIn(uri, stdout.getvalue())
+        self.assertIn("Warmed 1 urls for testserver", stdout.getvalue())
+
+        with self.assertNumQueries(0):
+            response = self.client.get(uri)
+        self.assertEqual(len(response.json()["results"]), 3)
+
+    def test_index_figure_is_cached_until_the_names_change(self):
+        figure = ("<script></script>", "<div></div>")
+        with mock.patch(
+            "catalogue.views.get_index_figure", return_value=figure
+        ) as get_index_figure:
+            self.client.get(reverse("index"))
+            self.client.get(reverse("index"))
+            self.assertEqual(get_index_figure.call_count, 1)
+
+            # The map shows the names of the AstroObjects
+            astro_object = AstroObject.objects.first()
+            astro_object.name = "Renamed"
+            astro_object.save()
+            self.client.get(reverse("index"))
+            self.assertEqual(get_index_figure.call_count, 2)
+
+    def test_failed_url(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "warm_caches",
+                reverse("reference-detail", args=[999999]) + "?format=json",
+                workers=1,
+                stdout=StringIO(),
+            )
@@ -0,0 +1,189 @@
+import datetime
+from unittest import mock
+
+from catalogue.factories import (
+    AstroObjectClassificationFactory,
+    AstroObjectFactory,
+    ObservationFactory,
+    ParameterFactory,
+    ReferenceFactory,
+)
+from catalogue.models import Reference, SearchToken
+from catalogue.pivot import refresh_observation_tables
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class ConditionalApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        ReferenceFactory.create_batch(3)
+        ObservationFactory.create_batch(3)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def test_etag(self):
+        uri = reverse("reference-list") + "?format=json"
+        response = self.client.get(uri)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+
+        # The change marker of the Reference model is read from the cache
+        with self.assertNumQueries(0):
+            response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+        # The format (and the other query parameters) are part of the ETag
+        response = self.client.get(
+            reverse("reference-list") + "?format=datatables", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # Updating or deleting a Reference changes the ETag
+        reference = Reference.objects.first()
+        reference.title = "Changed"
+        reference.save()
+        response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = self.client.get(uri + "&length=2")["ETag"]
+        Reference.objects.filter(id=reference.id).delete()
+        response = self.client.get(uri + "&length=2", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self):
+        uri = reverse("observation-list") + "?format=json"
+        # Last-Modified has a resolution of a second, and is not sent for a
+        # change that is less than a second old
+        response = self.client.get(uri)
+        self.assertFalse(response.has_header("Last-Modified"))
+        self.assertTrue(response.has_header("ETag"))
+
+        later = timezone.now() + datetime.timedelta(seconds=2)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            response = self.client.get(uri)
+            last_modified = response["Last-Modified"]
+            response = self.client.get(uri, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            # A change within the same second as the copy of the client
+            ObservationFactory()
+            response = self.client.get(uri, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse(response.has_header("Last-Modified"))
+
+    def test_observation_table(self):
+        reference = ReferenceFactory()
+        ObservationFactory(reference=reference)
+        for action in ["list", "columns"]:
+            uri = reverse("observation_table-" + action)
+            uri += "?format=json&reference={0}".format(reference.id)
+            etag = self.client.get(uri)["ETag"]
+            response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            # A new column, and the rebuilt materialized tables
+            ObservationFactory(reference=reference, parameter=ParameterFactory())
+            response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            etag = response["ETag"]
+            refresh_observation_tables()
+            response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_retrieve(self):
+        astro_object = AstroObjectFactory()
+        uri = reverse("astroobject-detail", args=[astro_object.id]) + "?format=json"
+        etag = self.client.get(uri)["ETag"]
+        response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # The detail of an AstroObject includes its Observations
+        ObservationFactory(astro_object=astro_object)
+        response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.json()["observations"]), 1)
+
+    def test_m2m_changed(self):
+        astro_object = AstroObjectFactory()
+        uri = reverse("astroobject-list") + "?format=json"
+        etag = self.client.get(uri)["ETag"]
+        response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Adding a classification changes the AstroObject list
+        astro_object.classifications.add(AstroObjectClassificationFactory())
+        response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_other_models_do_not_change_the_etag(self):
+        uri = reverse("astroobject-list") + "?format=json"
+        etag = self.client.get(uri)["ETag"]
+
+        # Neither the models of other apps, nor the derived catalogue tables
+        get_user_model().objects.create_user("etag@example.com")
+        SearchToken.objects.create(kind="astroobject", object_id=1, token="x")
+        response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_dummy_cache(self):
+        uri = reverse("parameter-list") + "?format=json"
+        etag = self.client.get(uri)["ETag"]
+        with self.settings(
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+            }
+        ):
+            response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class ConditionalHtmlTestCase(TestCase):
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def test_detail(self):
+        reference = ReferenceFactory()
+        uri = reverse("catalogue:reference_detail", args=[reference.slug])
+        response = self.client.get(uri)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertFalse(response.has_header("Last-Modified"))
+
+        response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        reference.save()
+        response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        uri = reverse("catalogue:reference_detail", args=["does-not-exist"])
+        response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list(self):
+        ReferenceFactory()
+        uri = reverse("catalogue:reference_list")
+        etag = self.client.get(uri)["ETag"]
+        response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -0,0 +1,157 @@
+import io
+from io import StringIO
+
+from astropy.io.votable import parse
+from catalogue.cone import cone_search, refresh_astro_object_positions
+from catalogue.factories import (
+    AstroObjectFactory,
+    ObservationFactory,
+    ParameterFactory,
+    ReferenceFactory,
+)
+from catalogue.models import AstroObjectPosition, Observation
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+
+class ConeSearchTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.RA = ParameterFactory(name="RA")
+        cls.Dec = ParameterFactory(name="Dec")
+        cls.reference = ReferenceFactory()
+        cls.other_reference = ReferenceFactory()
+
+        # (name, ra, dec): at 0, 1 and 3 degrees of (10, 20), and one
+        # across ra = 0 of the cone around (359.5, 0)
+        cls.astro_objects = dict()
+        for name, ra, dec in (
+            ("Center", 10, 20),
+            ("Near", 10, 21),
+            ("Far", 10, 23),
+            ("Wrap", 0.5, 0),
+        ):
+            cls.astro_objects[name] = cls.add_position(name, ra, dec)
+
+    @classmethod
+    def add_position(cls, name, ra, dec, reference=None):
+        astro_object = AstroObjectFactory(name=name)
+        for parameter, value in ((cls.RA, ra), (cls.Dec, dec)):
+            ObservationFactory(
+                astro_object=astro_object,
+                reference=reference or cls.reference,
+                parameter=parameter,
+                value=str(value),
+            )
+        return astro_object
+
+    def names(self, matches):
+        return [match.name for match in matches]
+
+    def test_positions_are_maintained(self):
+        self.assertEqual(AstroObjectPosition.objects.count(), 4)
+        position = AstroObjectPosition.objects.get(
+            astro_object=self.astro_objects["Near"]
+        )
+        vector = (position.x, position.y, position.z)
+        self.assertAlmostEqual(sum(v * v for v in vector), 1)
+
+        observation = Observation.objects.get(
+            astro_object=self.astro_objects["Near"], parameter=self.Dec
+        )
+        observation.value = "-21"
+        observation.save()
+        position.refresh_from_db()
+        self.assertEqual(position.dec, -21)
+
+        observation.delete()
+        self.assertFalse(
+            AstroObjectPosition.objects.filter(id=position.id).exists(),
+        )
+
+    def test_cone_search(self):
+        matches = cone_search(10, 20, 2)
+        self.assertEqual(self.names(matches), ["Center", "Near"])
+        self.assertAlmostEqual(matches[0].separation, 0)
+        self.assertAlmostEqual(matches[1].separation, 1)
+
+        self.assertEqual(self.names(cone_search(359.5, 0, 1.5)), ["Wrap"])
+        self.assertEqual(self.names(cone_search(10, 20, 0)), ["Center"])
+        self.assertEqual(len(cone_search(190, -20, 180)), 4)
+
+    def test_nearest_position_of_references(self):
+        # A second position of 'Far' is within the cone
+        far = self.astro_objects["Far"]
+        ObservationFactory(
+            astro_object=far,
+            reference=self.other_reference,
+            parameter=self.RA,
+            value="10",
+        )
+        ObservationFactory(
+            astro_object=far,
+            reference=self.other_reference,
+            parameter=self.Dec,
+            value="20.5",
+        )
+        matches = cone_search(10, 20, 2)
+        self.assertEqual(self.names(matches), ["Center", "Far", "Near"])
+        self.assertEqual(matches[1].reference, self.other_reference.slug)
+
+        matches = cone_search(10, 20, 2, references=[self.reference])
+        self.assertEqual(self.names(matches), ["Center", "Near"])
+
+    def test_refresh_astro_object_positions(self):
+        AstroObjectPosition.objects.all().delete()
+        stdout = StringIO()
+        call_command("refresh_observation_tables", stdout=stdout)
+        self.assertIn("Refreshed 4 positions", stdout.getvalue())
+        self.assertEqual(refresh_astro_object_positions([self.other_reference]), 0)
+        self.assertEqual(AstroObjectPosition.objects.count(), 4)
+
+    def test_api(self):
+        uri = reverse("astroobject-cone")
+        response = self.client.get(uri, {"ra": 10, "dec": 20, "radius": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["results"][1]["name"], "Near")
+        self.assertEqual(data["results"][1]["slug"], self.astro_objects["Near"].slug)
+        self.assertEqual(data["results"][1]["reference"], self.reference.slug)
+
+        response = self.client.get(
+            uri,
+            {"ra": 10, "dec": 20, "radius": 2, "reference": self.other_reference.slug},
+        )
+        self.assertEqual(response.json()["count"], 0)
+
+        response = self.client.get(uri, {"ra": 10, "dec": 95, "radius": 2})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(uri, {"ra": 10, "dec": 20})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(
+            uri, {"ra": 10, "dec": 20, "radius": 2, "reference": "does-not-exist"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_simple_cone_search(self):
+        uri = reverse("astroobject-cone")
+        query = {"format": "votable", "RA": 10, "DEC": 20}
+        response = self.client.get(uri, dict(query, SR=2))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-votable+xml")
+        table = parse(io.BytesIO(response.content)).get_first_table()
+        ucds = {field.name: field.ucd for field in table.fields}
+        self.assertEqual(ucds["name"], "ID_MAIN")
+        self.assertEqual(ucds["ra"], "POS_EQ_RA_MAIN")
+        self.assertEqual(ucds["dec"], "POS_EQ_DEC_MAIN")
+        self.assertEqual(list(table.array["name"]), ["Center", "Near"])
+
+        # Errors are a VOTable with an INFO named 'Error'
+        response = self.client.get(uri, query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        infos = parse(io.BytesIO(response.content)).infos
+        self.assertEqual(infos[0].name, "Error")
+        self.assertIn("radius", infos[0].value)
@@ -0,0 +1,164 @@
+import io
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+import numpy
+from astropy.table import Table
+from catalogue import crossmatch as crossmatch_module
+from catalogue.api_views import AstroObjectViewSet
+from catalogue.crossmatch import crossmatch, get_position_tree
+from catalogue.factories import (
+    AstroObjectFactory,
+    ObservationFactory,
+    ParameterFactory,
+    ReferenceFactory,
+)
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class CrossmatchTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.RA = ParameterFactory(name="RA")
+        cls.Dec = ParameterFactory(name="Dec")
+        cls.reference = ReferenceFactory()
+        cls.astro_objects = [
+            cls.add_position(name, ra, dec)
+            for name, ra, dec in (("A", 10, 20), ("B", 10, 21), ("C", 359.99, -5))
+        ]
+
+    @classmethod
+    def add_position(cls, name, ra, dec):
+        astro_object = AstroObjectFactory(name=name)
+        for parameter, value in ((cls.RA, ra), (cls.Dec, dec)):
+            ObservationFactory(
+                astro_object=astro_object,
+                reference=cls.reference,
+                parameter=parameter,
+                value=str(value),
+            )
+        return astro_object
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        cache.clear()
+        super().tearDown()
+
+    def test_crossmatch(self):
+        # 36 arcsec from A, nearer to A than to B, across ra = 0 of C, no match
+        ra = numpy.array([10, 10, 0.005, 100, numpy.nan])
+        dec = numpy.array([20.01, 20.4, -5, 0, 0])
+        index, separation, tree = crossmatch(ra, dec, 0.5)
+        self.assertEqual(list(tree.name[index[:3]]), ["A", "A", "C"])
+        self.assertEqual(list(index[3:]), [-1, -1])
+        self.assertAlmostEqual(separation[0], 0.01)
+        self.assertAlmostEqual(separation[2], 0.015 * numpy.cos(numpy.radians(5)))
+        self.assertTrue(numpy.isnan(separation[3:]).all())
+
+        index, separation, tree = crossmatch(ra, dec, 0.005)
+        self.assertEqual(list(index), [-1] * 5)
+
+    def test_tree_is_rebuilt_when_the_positions_change(self):
+        tree = get_position_tree()
+        self.assertIs(get_position_tree(), tree)
+
+        self.add_position("D", 100, 0)
+        tree = get_position_tree()
+        self.assertEqual(len(tree.id), 4)
+        index, separation, tree = crossmatch([100], [0], 1)
+        self.assertEqual(tree.name[index[0]], "D")
+
+    def test_trees_are_evicted(self):
+        references = [ReferenceFactory() for i in range(3)]
+        with mock.patch.object(crossmatch_module, "POSITION_TREE_CACHE_SIZE", 2):
+            tree = get_position_tree()
+            for reference in references:
+                get_position_tree([reference])
+            self.assertEqual(len(crossmatch_module._trees), 2)
+            self.assertIsNot(get_position_tree(), tree)
+
+    def test_api(self):
+        uri = reverse("astroobject-crossmatch")
+        upload = SimpleUploadedFile(
+            "positions.csv", b"id,RAJ2000,DEJ2000\n1,10,20.01\n2,100,0\n"
+        )
+        response = self.client.post(uri, {"file": upload, "radius": 0.1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        data = response.json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["matched"], 1)
+        self.assertEqual(data["results"][0]["match_name"], "A")
+        self.assertEqual(data["results"][0]["match_slug"], self.astro_objects[0].slug)
+        self.assertIsNone(data["results"][1]["match_id"])
+
+        table = Table({"ra": [10.0, 0.0], "dec": [21.0, -5.0]})
+        votable = io.BytesIO()
+        table.write(votable, format="votable")
+        upload = SimpleUploadedFile("positions.xml", votable.getvalue())
+        response = self.client.post(
+            uri + "?format=fits", {"file": upload, "radius": 0.1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/fits")
+        matches = Table.read(io.BytesIO(response.content), format="fits")
+        self.assertEqual(list(matches["match_name"]), ["B", "C"])
+
+    def test_api_errors(self):
+        uri = reverse("astroobject-crossmatch")
+        response = self.client.post(uri, {"radius": 0.1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        upload = SimpleUploadedFile("positions.csv", b"x,y\n10,20\n")
+        response = self.client.post(uri, {"file": upload, "radius": 0.1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("file", response.json())
+
+        upload = SimpleUploadedFile("positions.txt", b"ra,dec\n10,20\n")
+        response = self.client.post(uri, {"file": upload, "radius": 0.1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("input_format", response.json())
+
+        upload = SimpleUploadedFile("positions.csv", b"ra,dec\n10,20\n")
+        response = self.client.post(uri, {"file": upload, "radius": "-1"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("radius", response.json())
+
+        content = b"ra,dec\n" + b"10,20\n" * 3
+        with mock.patch.object(AstroObjectViewSet, "max_crossmatch_rows", 2):
+            upload = SimpleUploadedFile("positions.csv", content)
+            response = self.client.post(uri, {"file": upload, "radius": 0.1})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("At most 2 positions", response.json()["file"])
+        with mock.patch.object(AstroObjectViewSet, "max_crossmatch_size", 10):
+            upload = SimpleUploadedFile("positions.csv", content)
+            response = self.client.post(uri, {"file": upload, "radius": 0.1})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_command(self):
+        path = os.path.join(self.tmpdir, "positions.csv")
+        with open(path, "w") as f:
+            f.write("name,ra,dec\nx,10,20.99\ny,50,50\n")
+        stdout = StringIO()
+        call_command("crossmatch", path, radius=0.1, format="votable", stdout=stdout)
+        output = os.path.join(self.tmpdir, "positions_crossmatch.xml")
+        self.assertIn("Matched 1 of 2 positions", stdout.getvalue())
+        matches = Table.read(output, format="votable")
+        self.assertEqual(list(matches["name"]), ["x", "y"])
+        self.assertEqual(matches["match_name"][0], "B")
+        self.assertTrue(matches["match_id"].mask[1])
@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+import numpy
+from astropy.table import Table
+from catalogue.export import build_observation_table, get_observation_table_file
+from catalogue.factories import (
+    AstroObjectFactory,
+    ObservationFactory,
+    ParameterFactory,
+    ReferenceFactory,
+)
+from catalogue.models import Observation
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+
+class ObservationTableExportTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.references = ReferenceFactory.create_batch(2)
+        cls.astro_objects = AstroObjectFactory.create_batch(2)
+        cls.feh = ParameterFactory(name="[Fe/H]", unit="dex")
+        cls.spt = ParameterFactory(name="spt", unit="   ")
+        cls.tc = ParameterFactory(name="sp_lg_tc", unit="log10(yr)")
+
+        ref0, ref1 = cls.references
+        ao0, ao1 = cls.astro_objects
+        ObservationFactory(
+            reference=ref0,
+            astro_object=ao0,
+            parameter=cls.feh,
+            value="-0.72",
+            sigma_up="0.1",
+        )
+        ObservationFactory(reference=ref0, astro_object=ao1, parameter=cls.feh)
+        ObservationFactory(
+            reference=ref0, astro_object=ao0, parameter=cls.spt, value="F7"
+        )
+        ObservationFactory(
+            reference=ref1, astro_object=ao1, parameter=cls.tc, value="9.1"
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.export_root = tempfile.mkdtemp()
+        self.override = override_settings(EXPORT_ROOT=self.export_root)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.export_root)
+        super().tearDown()
+
+    def test_table_columns_are_typed(self):
+        table = build_observation_table([self.references[0]])
+        self.assertEqual(table.colnames, ["name", "Fe_H", "Fe_H_sigma_up", "spt"])
+        self.assertEqual(table["Fe_H"].dtype, numpy.float64)
+        self.assertEqual(str(table["Fe_H"].unit), "dex")
+        self.assertEqual(table["Fe_H"].description, "[Fe/H]: " + self.feh.description)
+        self.assertEqual(table["Fe_H_sigma_up"].unit, table["Fe_H"].unit)
+        self.assertEqual(table["spt"].dtype.kind, "U")
+        self.assertIsNone(table["spt"].unit)
+
+        names = list(table["name"])
+        row = table[names.index(self.astro_objects[0].name)]
+        self.assertEqual(row["Fe_H"], -0.72)
+        self.assertEqual(row["Fe_H_sigma_up"], 0.1)
+        self.assertEqual(row["spt"], "F7")
+        # AstroObject 1 has no spt and no sigma_up
+        i = names.index(self.astro_objects[1].name)
+        self.assertTrue(table["spt"].mask[i])
+        self.assertTrue(table["Fe_H_sigma_up"].mask[i])
+
+    def test_compilation_of_references(self):
+        table = build_observation_table(self.references)
+        self.assertEqual(len(table), 3)
+        self.assertIn("reference", table.colnames)
+        self.assertEqual(
+            sorted(set(table["reference"])), sorted(r.bib_code for r in self.references)
+        )
+        # Unrecognized units are kept in the description
+        self.assertIsNone(table["sp_lg_tc"].unit)
+        self.assertIn("[log10(yr)]", table["sp_lg_tc"].description)
+
+    def test_file_is_cached_until_the_data_change(self):
+        reference = self.references[0]
+        path = get_observation_table_file([reference], format="fits")
+        self.assertEqual(get_observation_table_file([reference], format="fits"), path)
+        table = Table.read(path, format="fits")
+        self.assertEqual(len(table), 2)
+
+        o = Observation.objects.get(reference=reference, parameter=self.spt)
+        o.value = "G2"
+        o.save()
+        new_path = get_observation_table_file([reference], format="fits")
+        self.assertNotEqual(new_path, path)
+        self.assertFalse(os.path.exists(path))
+        self.assertIn("G2", list(Table.read(new_path, format="fits")["spt"]))
+
+    def test_export_endpoint(self):
+        reference = self.references[0]
+        for format in ["fits", "votable"]:
+            response = self.client.get(
+                reverse("observation_table-export")
+                + "?format={0}&reference={1}".format(format, reference.slug)
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn("attachment", response["Content-Disposition"])
+            table = Table.read(
+                BytesIO(b"".join(response.streaming_content)), format=format
+            )
+            self.assertEqual(len(table), 2)
+            self.assertIn("Fe_H", table.colnames)
+
+    def test_export_command(self):
+        output = os.path.join(self.export_root, "out.xml")
+        stdout = StringIO()
+        call_command(
+            "export_observation_table",
+            *[r.slug for r in self.references],
+            format="votable",
+            output=output,
+            stdout=stdout,
+        )
+        self.assertIn(output, stdout.getvalue())
+        self.assertEqual(len(Table.read(output, format="votable")), 3)
@@ -1,5 +1,8 @@
-from catalogue.models import Reference
+from catalogue.factories import ObservationFactory, ParameterFactory
+from catalogue.models import Observation, Reference
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.forms import modelform_factory
 from django.test import TestCase
 
 
@@ -71,3 +74,64 @@ class AutoRetrieveReferenceDetailsTestCase(TestCase):
                 "The Ages of 55 Globular Clusters as Determined Using an Improved delta V_TO^HB Method Along with Color-Magnitude Diagram Constraints, and Their Implications for Broader Issues",
             )
             r.delete()
+
+
+class ObservationNaturalKeyTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.observation = ObservationFactory(value="1.0", sigma_up="0.1")
+        cls.key = dict(
+            astro_object=cls.observation.astro_object,
+            reference=cls.observation.reference,
+            parameter=cls.observation.parameter,
+        )
+
+    def test_natural_key_is_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Observation.objects.create(value="2.0", **self.key)
+
+    def test_model_form_validates_natural_key(self):
+        # e.g. the admin, which would otherwise fail with the IntegrityError
+        form_class = modelform_factory(
+            Observation, fields=("astro_object", "reference", "parameter", "value")
+        )
+        data = {name: instance.pk for name, instance in self.key.items()}
+        form = form_class(data=dict(data, value="2.0"))
+        self.assertFalse(form.is_valid())
+        self.assertIn("already exists", form.errors["__all__"][0])
+
+        form = form_class(data=data, instance=self.observation)
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_get_by_natural_key(self):
+        self.assertEqual(
+            Observation.objects.get_by_natural_key(*self.observation.natural_key()),
+            self.observation,
+        )
+
+    def test_upsert_finds_existing_observation(self):
+        with self.assertNumQueries(1):
+            o, created = Observation.objects.upsert(
+                value=1.0, sigma_up="0.1", **self.key
+            )
+        self.assertFalse(created)
+        self.assertEqual(o, self.observation)
+
+    def test_upsert_updates_values_in_place(self):
+        o, created = Observation.objects.upsert(value="2.0", sigma_up=None, **self.key)
+        self.assertFalse(created)
+        self.assertEqual(Observation.objects.filter(**self.key).count(), 1)
+        o.refresh_from_db()
+        self.assertEqual(o.value, "2.0")
+        self.assertEqual(o.value_numeric, 2.0)
+        self.assertIsNone(o.sigma_up)
+
+    def test_upsert_creates_observation(self):
+        key = dict(self.key, parameter=ParameterFactory())
+        o, created = Observation.objects.upsert(value="3.0", **key)
+        self.assertTrue(created)
+        self.assertEqual(o.value_numeric, 3.0)
+
+    def test_upsert_rejects_unknown_fields(self):
+        with self.assertRaises(TypeError):
+            Observation.objects.upsert(values="1.0", **self.key)
@@ -0,0 +1,158 @@
+from catalogue.factories import AstroObjectFactory
+from catalogue.models import AstroObject
+from catalogue.names import (
+    EXACT,
+    FUZZY,
+    VARIANT,
+    get_name_index,
+    invalidate_name_index,
+    normalize_name,
+)
+from catalogue.utils import map_names_to_ids
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+
+class NormalizeNameTestCase(TestCase):
+    def test_normalize_name(self):
+        for names in (
+            ("NGC 104", "ngc104", "NGC0104", "ngc_104", " NGC  104 "),
+            ("Pal 5", "Palomar 5", "pal5", "Palomar5"),
+            ("Terzan 7", "Ter 7", "ter7"),
+            ("ESO 280-SC06", "ESO280 SC6", "eso 280-sc06"),
+            ("47 Tuc", "47Tuc", "47 tuc"),
+        ):
+            keys = {normalize_name(name) for name in names}
+            self.assertEqual(len(keys), 1, keys)
+
+        self.assertNotEqual(normalize_name("NGC 104"), normalize_name("NGC 1040"))
+        self.assertNotEqual(normalize_name("IC 4499"), normalize_name("NGC 4499"))
+        self.assertEqual(normalize_name("---"), "")
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class NameIndexTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ngc104 = AstroObjectFactory(name="NGC 104", altname="47 Tuc")
+        cls.pal5 = AstroObjectFactory(name="Pal 5", altname=None)
+        cls.ter7 = AstroObjectFactory(name="Terzan 7", altname="")
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def test_resolve(self):
+        index = get_name_index()
+        self.assertEqual(index.resolve("NGC 104"), (self.ngc104.id, EXACT))
+        self.assertEqual(index.resolve("47 Tuc"), (self.ngc104.id, EXACT))
+        self.assertEqual(index.resolve("ngc0104"), (self.ngc104.id, VARIANT))
+        self.assertEqual(index.resolve("Palomar 5"), (self.pal5.id, VARIANT))
+        self.assertEqual(index.resolve("Ter 7"), (self.ter7.id, VARIANT))
+        self.assertIsNone(index.resolve("NGC 5139"))
+        self.assertEqual(index.describe(self.pal5.id), ("Pal 5", self.pal5.slug))
+
+    def test_map_names_to_ids(self):
+        name_id_map = map_names_to_ids()
+        self.assertIn("Palomar5", name_id_map)
+        self.assertEqual(name_id_map["Palomar5"], self.pal5.id)
+        self.assertEqual(name_id_map.get("pal 5"), self.pal5.id)
+        self.assertNotIn("P", name_id_map)
+        self.assertIsNone(name_id_map.get("NGC 5139"))
+        with self.assertRaises(KeyError):
+            name_id_map["NGC 5139"]
+        self.assertEqual(len(name_id_map), 4)  # the names and altnames
+
+    def test_cached_until_astro_object_changes(self):
+        get_name_index()
+        with self.assertNumQueries(0):
+            get_name_index()
+
+        omega_cen = AstroObjectFactory(name="NGC 5139", altname="omega Cen")
+        self.assertEqual(get_name_index()["omega cen"], omega_cen.id)
+
+        omega_cen.delete()
+        self.assertNotIn("omega cen", get_name_index())
+
+        # bulk_create does not send signals
+        AstroObject.objects.bulk_create([AstroObject(name="Pal 1", slug="pal-1")])
+        self.assertNotIn("Pal 1", get_name_index())
+        invalidate_name_index()
+        self.assertIn("Palomar 1", get_name_index())
+
+    def test_api(self):
+        uri = reverse("resolve-list")
+        response = self.client.get(uri, {"name": "palomar5"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "query": "palomar5",
+                "id": self.pal5.id,
+                "name": "Pal 5",
+                "slug": self.pal5.slug,
+                "match": VARIANT,
+            },
+        )
+
+        response = self.client.get(uri, {"name": "NGC 5139"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(uri)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fuzzy_match(self):
+        index = get_name_index()
+        self.assertEqual(index.fuzzy_match("NCG 104")[0], self.ngc104.id)
+        self.assertEqual(index.fuzzy_match("Palomr 5")[0], self.pal5.id)
+        self.assertEqual(index.fuzzy_match("Terzann 7")[0], self.ter7.id)
+        # Only names with the same numbers are compared
+        self.assertIsNone(index.fuzzy_match("NGC 105"))
+        self.assertIsNone(index.fuzzy_match("Pal 5", min_score=101))
+        self.assertIsNone(index.fuzzy_match("Whiting 1"))
+        self.assertIsNone(index.fuzzy_match("-"))
+
+    def test_batch_api(self):
+        uri = reverse("resolve-list")
+        names = ["NGC 104", "ngc104", "47 Tuc", "Palomr 5", "NGC 5139"]
+        response = self.client.post(
+            uri, {"names": names}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["count"], 5)
+        self.assertEqual(data["resolved"], 4)
+        results = data["results"]
+        self.assertEqual([r["query"] for r in results], names)
+        self.assertEqual(
+            [r["match"] for r in results], [EXACT, VARIANT, EXACT, FUZZY, None]
+        )
+        self.assertEqual({r["id"] for r in results[:3]}, {self.ngc104.id})
+        self.assertEqual(results[3]["slug"], self.pal5.slug)
+        self.assertLess(results[3]["score"], 100)
+        self.assertIsNone(results[4]["id"])
+
+        response = self.client.post(
+            uri,
+            {"names": ["Palomr 5"], "fuzzy": False},
+            content_type="application/json",
+        )
+        self.assertIsNone(response.json()["results"][0]["match"])
+
+    def test_batch_api_errors(self):
+        uri = reverse("resolve-list")
+        response = self.client.post(
+            uri, {"names": "NGC 104"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            uri, {"names": ["NGC 104"] * 1001}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,71 @@
+from unittest import mock
+
+from catalogue.factories import (
+    AstroObjectClassificationFactory,
+    AstroObjectFactory,
+    ObservationFactory,
+    ReferenceFactory,
+)
+from catalogue.models import Parameter
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class PageCacheTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        ObservationFactory.create_batch(3)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        # The cache panel of django-debug-toolbar replaces the caches of the
+        # cache middleware with a handler that ignores override_settings()
+        patcher = mock.patch("django.middleware.cache.caches", caches)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def test_cached_until_changed(self):
+        uri = reverse("parameter-list") + "?format=json"
+        response = self.client.get(uri)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("max-age=0", response["Cache-Control"])
+        with self.assertNumQueries(0):
+            cached = self.client.get(uri)
+        self.assertEqual(cached.content, response.content)
+
+        parameter = Parameter.objects.first()
+        parameter.name = "Changed"
+        parameter.save()
+        response = self.client.get(uri)
+        names = [row["name"] for row in response.json()["results"]]
+        self.assertIn("Changed", names)
+
+    def test_namespace_per_model(self):
+        uri = reverse("astroobject-list") + "?format=json"
+        self.client.get(uri)
+
+        # A change to another model keeps the cached response
+        ReferenceFactory()
+        with self.assertNumQueries(0):
+            self.client.get(uri)
+
+        # Any of the models that the response is built from invalidates it
+        astro_object = AstroObjectFactory()
+        response = self.client.get(uri)
+        ids = [row["id"] for row in response.json()["results"]]
+        self.assertIn(astro_object.id, ids)
+
+        astro_object.classifications.add(AstroObjectClassificationFactory())
+        response = self.client.get(uri)
+        row = [row for row in response.json()["results"] if row["id"] == ids[-1]]
+        self.assertEqual(len(row[0]["classifications"]), 1)
@@ -0,0 +1,209 @@
+from io import StringIO
+
+from catalogue.factories import (
+    AstroObjectFactory,
+    ObservationFactory,
+    ParameterFactory,
+    ReferenceFactory,
+)
+from catalogue.models import Observation, ObservationTableRow, SearchToken
+from catalogue.pivot import (
+    load_observation_table,
+    pivot_observations,
+    refresh_observation_tables,
+)
+from catalogue.signals import derived_tables_suspended
+from catalogue.utils import PrepareSupaHarrisDatabaseMixin
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+
+class PivotObservationsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reference = ReferenceFactory()
+        cls.astro_objects = AstroObjectFactory.create_batch(3)
+        cls.parameters = ParameterFactory.create_batch(2)
+        for i, ao in enumerate(cls.astro_objects):
+            for j, p in enumerate(cls.parameters):
+                if (i, j) == (2, 1):
+                    continue  # leave one empty cell
+                ObservationFactory(
+                    reference=cls.reference,
+                    astro_object=ao,
+                    parameter=p,
+                    value="{0}.{1}".format(i, j),
+                )
+        # Observation of the same (astro_object, parameter) pair in another Reference
+        ObservationFactory(
+            reference=ReferenceFactory(),
+            astro_object=cls.astro_objects[0],
+            parameter=cls.parameters[0],
+            value="duplicate",
+        )
+
+    def test_pivot_shape_and_order(self):
+        pivot = pivot_observations(Observation.objects.all())
+        self.assertEqual(len(pivot), 3)
+        self.assertEqual(
+            [pk for pk, name in pivot.astro_objects],
+            sorted(ao.pk for ao in self.astro_objects),
+        )
+        self.assertEqual(
+            pivot.parameter_names,
+            [p.name for p in sorted(self.parameters, key=lambda p: p.pk)],
+        )
+
+    def test_pivot_empty_cell_is_none(self):
+        pivot = pivot_observations(Observation.objects.all())
+        rows = pivot.as_rows()
+        self.assertIsNone(rows[2][self.parameters[1].name])
+        self.assertEqual(pivot.counts[2, 1], 0)
+
+    def test_pivot_keeps_last_observation_by_default(self):
+        pivot = pivot_observations(Observation.objects.all())
+        rows = pivot.as_rows()
+        self.assertEqual(rows[0][self.parameters[0].name], "duplicate")
+        self.assertEqual(pivot.counts[0, 0], 2)
+
+    def test_pivot_keep_first(self):
+        pivot = pivot_observations(Observation.objects.all(), keep="first")
+        rows = pivot.as_rows()
+        self.assertEqual(rows[0][self.parameters[0].name], "0.0")
+
+    def test_pivot_invalid_keep(self):
+        with self.assertRaises(ValueError):
+            pivot_observations(Observation.objects.all(), keep="mean")
+
+    def test_pivot_of_empty_queryset(self):
+        pivot = pivot_observations(Observation.objects.none())
+        self.assertEqual(len(pivot), 0)
+        self.assertEqual(pivot.as_rows(), [])
+
+
+class MaterializedObservationTableTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.references = ReferenceFactory.create_batch(2)
+        cls.astro_objects = AstroObjectFactory.create_batch(3)
+        cls.parameters = ParameterFactory.create_batch(2)
+        for reference in cls.references:
+            for ao in cls.astro_objects:
+                for p in cls.parameters:
+                    ObservationFactory(
+                        reference=reference, astro_object=ao, parameter=p
+                    )
+
+    def assertTableMatchesPivot(self, reference):
+        expected = pivot_observations(Observation.objects.filter(reference=reference))
+        table = load_observation_table(reference)
+        self.assertEqual(table.astro_objects, expected.astro_objects)
+        self.assertEqual(table.parameters, expected.parameters)
+        self.assertEqual(table.as_rows(), expected.as_rows())
+        self.assertEqual(table.counts.tolist(), expected.counts.tolist())
+
+    def test_rows_are_created_on_observation_save(self):
+        self.assertEqual(ObservationTableRow.objects.count(), 2 * 3)
+        for reference in self.references:
+            self.assertTableMatchesPivot(reference)
+
+    def test_observation_save_only_touches_its_own_row(self):
+        reference, ao = self.references[0], self.astro_objects[0]
+        before = dict(ObservationTableRow.objects.values_list("id", "date_updated"))
+        observation = Observation.objects.filter(
+            reference=reference, astro_object=ao
+        ).first()
+        observation.value = "42"
+        observation.save()
+
+        after = dict(ObservationTableRow.objects.values_list("id", "date_updated"))
+        changed = [pk for pk in before if before[pk] != after[pk]]
+        self.assertEqual(
+            changed,
+            [ObservationTableRow.objects.get(reference=reference, astro_object=ao).pk],
+        )
+        self.assertTableMatchesPivot(reference)
+
+    def test_observation_moved_to_another_astro_object(self):
+        reference = self.references[0]
+        observation = Observation.objects.filter(
+            reference=reference, astro_object=self.astro_objects[0]
+        ).first()
+        observation.astro_object = AstroObjectFactory()
+        observation.save()
+        self.assertTableMatchesPivot(reference)
+
+    def test_row_is_deleted_with_its_last_observation(self):
+        reference, ao = self.references[1], self.astro_objects[2]
+        Observation.objects.filter(reference=reference, astro_object=ao).delete()
+        self.assertFalse(
+            ObservationTableRow.objects.filter(
+                reference=reference, astro_object=ao
+            ).exists()
+        )
+        self.assertTableMatchesPivot(reference)
+
+    def test_refresh_after_bulk_create(self):
+        reference = self.references[0]
+        Observation.objects.bulk_create(
+            [
+                Observation(
+                    reference=reference,
+                    astro_object=ao,
+                    parameter=self.parameters[0],
+                    value="bulk",
+                )
+                for ao in AstroObjectFactory.create_batch(2)
+            ]
+        )
+        self.assertEqual(refresh_observation_tables([reference]), 5)
+        self.assertTableMatchesPivot(reference)
+
+        stdout = StringIO()
+        call_command("refresh_observation_tables", reference.slug, stdout=stdout)
+        self.assertIn("Refreshed 5 observation table rows", stdout.getvalue())
+        self.assertTableMatchesPivot(reference)
+
+
+class IngestCommand(PrepareSupaHarrisDatabaseMixin, BaseCommand):
+    def handle(self, *args, **options):
+        # Without the fixtures of PrepareSupaHarrisDatabaseMixin.handle
+        self.observation = ObservationFactory(value="ingested")
+        self.rows = ObservationTableRow.objects.count()
+
+
+class DerivedTablesSuspendedTestCase(TestCase):
+    def test_save_only_inserts(self):
+        observation = ObservationFactory.build()
+        for instance in (observation.reference, observation.astro_object):
+            instance.save()
+        observation.parameter.save()
+        with derived_tables_suspended():
+            with CaptureQueriesContext(connection) as queries:
+                observation.save()
+        self.assertEqual(len(queries), 1)
+        self.assertFalse(ObservationTableRow.objects.exists())
+        self.assertFalse(SearchToken.objects.filter(kind="observation").exists())
+
+        # Saving outside the block refreshes them again
+        observation.save()
+        self.assertTrue(ObservationTableRow.objects.exists())
+
+    def test_ingest_command(self):
+        command = IngestCommand()
+        call_command(command, no_refresh=True, stdout=StringIO())
+        self.assertEqual(command.rows, 0)
+        self.assertFalse(ObservationTableRow.objects.exists())
+
+        command = IngestCommand()
+        call_command(command, stdout=StringIO())
+        self.assertEqual(command.rows, 0)
+        self.assertEqual(ObservationTableRow.objects.count(), 2)
+        self.assertTrue(
+            SearchToken.objects.filter(
+                kind="observation", object_id=command.observation.id
+            ).exists()
+        )
@@ -0,0 +1,54 @@
+import datetime
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from catalogue import renderers
+from catalogue.factories import ParameterFactory
+from catalogue.renderers import FastJSONRenderer
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+
+class FastJSONRendererTestCase(TestCase):
+    data = {
+        "name": "ω Cen\u2028\u2029",
+        "values": [1, -0.72, None, True, "F7"],
+        "nested": {"id": 3, "classifications": []},
+        "date": datetime.datetime(2020, 1, 2, 3, 4, 5, 678910),
+        "decimal": Decimal("1.50"),
+    }
+
+    def test_output_is_identical(self):
+        for media_type in [None, "application/json; indent=4"]:
+            self.assertEqual(
+                FastJSONRenderer().render(self.data, media_type),
+                JSONRenderer().render(self.data, media_type),
+            )
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_fallback(self):
+        # Beyond the 64 bit integers of orjson
+        data = {"value": 2 ** 70}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(
+                FastJSONRenderer().render(self.data), JSONRenderer().render(self.data)
+            )
+
+    @skipUnless(renderers.orjson, "orjson is not installed")
+    def test_api_uses_orjson(self):
+        ParameterFactory(name="[Fe/H]")
+        uri = reverse("parameter-list")
+        dumps = mock.patch.object(
+            renderers.orjson, "dumps", wraps=renderers.orjson.dumps
+        )
+        with dumps as dumps:
+            response = self.client.get(uri, {"format": "json"})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()["results"][0]["name"], "[Fe/H]")
+            response = self.client.get(uri, {"format": "datatables", "draw": "2"})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()["draw"], 2)
+        self.assertEqual(dumps.call_count, 2)
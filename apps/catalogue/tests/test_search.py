@@ -0,0 +1,164 @@
+from io import StringIO
+
+from catalogue.factories import (
+    AstroObjectClassificationFactory,
+    AstroObjectFactory,
+    ObservationFactory,
+    ParameterFactory,
+    ReferenceFactory,
+)
+from catalogue.models import AstroObject, Observation, SearchToken
+from catalogue.search import search_queryset, tokenize
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+
+class TokenizeTestCase(TestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize("NGC 104"), ["ngc", "104"])
+        self.assertEqual(tokenize("ngc104"), ["ngc", "104"])
+        self.assertEqual(tokenize("[Fe/H]"), ["fe", "h"])
+        self.assertEqual(tokenize("-1.23"), ["-1.23"])
+        self.assertEqual(tokenize("ESO 280-SC06"), ["eso", "280", "sc", "06"])
+        self.assertEqual(tokenize("Terzan 5-2"), ["terzan", "5", "2"])
+        self.assertEqual(tokenize("Ségal_2019"), ["segal", "2019"])
+        self.assertEqual(tokenize("ω Cen"), ["ω", "cen"])
+        self.assertEqual(tokenize(2010), ["2010"])
+        self.assertEqual(tokenize(" -- "), [])
+
+
+class SearchIndexTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.classification = AstroObjectClassificationFactory(name="Globular Cluster")
+        cls.ngc104 = AstroObjectFactory(
+            name="NGC 104", altname="47 Tuc", classifications=[cls.classification]
+        )
+        cls.ngc1040 = AstroObjectFactory(name="NGC 1040", altname=None)
+        cls.pal5 = AstroObjectFactory(name="Pal 5", altname=None)
+        cls.feh = ParameterFactory(name="[Fe/H]")
+        cls.reference = ReferenceFactory(
+            first_author="Harris", year=1996, title="A Catalog of Globular Clusters"
+        )
+        cls.other_reference = ReferenceFactory(
+            first_author="Baumgardt", year=2018, title="Mean proper motions"
+        )
+        cls.observations = [
+            ObservationFactory(
+                astro_object=astro_object,
+                parameter=cls.feh,
+                reference=cls.reference,
+                value=value,
+            )
+            for astro_object, value in ((cls.ngc104, "-0.72"), (cls.pal5, "-1.41"))
+        ]
+
+    def search(self, model, query, relations=("pk",)):
+        queryset = search_queryset(model.objects.order_by("id"), query, relations)
+        return list(queryset)
+
+    def test_search(self):
+        self.assertEqual(
+            self.search(AstroObject, "NGC 104"), [self.ngc104, self.ngc1040]
+        )
+        self.assertEqual(self.search(AstroObject, "ngc104 tuc"), [self.ngc104])
+        self.assertEqual(self.search(AstroObject, "globular"), [self.ngc104])
+        self.assertEqual(self.search(AstroObject, "palomar"), [])
+        self.assertEqual(len(self.search(AstroObject, "")), 3)
+
+        relations = ("pk", "astro_object", "parameter")
+        self.assertEqual(
+            self.search(Observation, "fe/h pal", relations), [self.observations[1]]
+        )
+        self.assertEqual(
+            self.search(Observation, "-0.7", relations), [self.observations[0]]
+        )
+
+    def test_negative_values(self):
+        relations = ("pk", "astro_object", "parameter")
+        positive = ObservationFactory(parameter=self.feh, value="1.5")
+        negative = ObservationFactory(parameter=self.feh, value="-1.5")
+        self.assertEqual(self.search(Observation, "-1.5", relations), [negative])
+        self.assertEqual(self.search(Observation, "1.5", relations), [positive])
+
+    def test_prefix_of_words(self):
+        ngc6104 = AstroObjectFactory(name="NGC6104", altname=None)
+        self.assertEqual(self.search(AstroObject, "104"), [self.ngc104, self.ngc1040])
+        self.assertEqual(self.search(AstroObject, "6104"), [ngc6104])
+
+    def test_relations_are_resolved_first(self):
+        relations = ("pk", "astro_object", "parameter")
+        queryset = search_queryset(Observation.objects.all(), "pal", relations)
+        sql = str(queryset.query)
+        # An OR of IN lists of ids, not of IN subqueries
+        self.assertNotIn("searchtoken", sql.lower())
+        self.assertIn("astro_object_id", sql)
+        self.assertEqual(list(queryset), [self.observations[1]])
+        self.assertEqual(
+            search_queryset(Observation.objects.all(), "x", relations).count(), 0
+        )
+
+    def test_index_follows_the_changes(self):
+        omega_cen = AstroObjectFactory(name="NGC 5139", altname="omega Cen")
+        self.assertEqual(self.search(AstroObject, "omega"), [omega_cen])
+        omega_cen.altname = "ω Cen"
+        omega_cen.save()
+        self.assertEqual(self.search(AstroObject, "omega"), [])
+        self.assertEqual(self.search(AstroObject, "ω"), [omega_cen])
+        omega_cen.delete()
+        self.assertEqual(self.search(AstroObject, "5139"), [])
+
+        # The classifications, in both directions of the relation
+        self.pal5.classifications.add(self.classification)
+        self.assertEqual(len(self.search(AstroObject, "globular")), 2)
+        self.classification.astro_objects.clear()
+        self.assertEqual(self.search(AstroObject, "globular"), [])
+        self.classification.astro_objects.add(self.ngc1040)
+        self.classification.name = "Open Cluster"
+        self.classification.save()
+        self.assertEqual(self.search(AstroObject, "open"), [self.ngc1040])
+        self.classification.delete()
+        self.assertEqual(self.search(AstroObject, "open"), [])
+
+    def test_command(self):
+        # bulk_create does not send signals
+        AstroObject.objects.bulk_create([AstroObject(name="Pal 1", slug="pal-1")])
+        self.assertEqual(self.search(AstroObject, "pal 1"), [])
+        SearchToken.objects.all().delete()
+
+        stdout = StringIO()
+        call_command("refresh_search_index", stdout=stdout)
+        self.assertIn("search tokens of astro objects", stdout.getvalue())
+        self.assertEqual(len(self.search(AstroObject, "pal 1")), 1)
+        self.assertEqual(self.search(AstroObject, "globular"), [self.ngc104])
+
+    def test_api(self):
+        uri = reverse("astroobject-list")
+        response = self.client.get(uri, {"format": "json", "search": "ngc 104"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        names = [row["name"] for row in response.json()["results"]]
+        self.assertEqual(names, ["NGC 104", "NGC 1040"])
+
+        uri = reverse("observation-list")
+        response = self.client.get(uri, {"format": "json", "search": "47 tuc fe"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [row["id"] for row in response.json()["results"]]
+        self.assertEqual(ids, [self.observations[0].id])
+
+        uri = reverse("reference-list")
+        response = self.client.get(uri, {"format": "json", "search": "harris 1996"})
+        self.assertEqual(response.json()["count"], 1)
+
+    def test_search_page(self):
+        uri = reverse("catalogue:search")
+        response = self.client.get(uri, {"q": "globular"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.context["astro_objects"]), [self.ngc104])
+        self.assertEqual(list(response.context["references"]), [self.reference])
+        self.assertContains(response, self.ngc104.get_absolute_url())
+
+        response = self.client.get(uri)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("astro_objects", response.context)
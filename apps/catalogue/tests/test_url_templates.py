@@ -0,0 +1,90 @@
+from unittest import mock
+
+from catalogue.factories import AstroObjectFactory, ReferenceFactory
+from catalogue.models import AstroObject, Reference
+from catalogue.url_templates import UrlTemplate, get_url_template, reverse_slug
+from django.test import TestCase
+from django.urls import NoReverseMatch, reverse, set_script_prefix
+from rest_framework import status
+
+
+class UrlTemplateTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        get_url_template.cache_clear()
+
+    def test_reverse_slug_matches_reverse(self):
+        for slug in ["ngc-104", "NGC_5139", "2019MNRAS.482.5138B", "ω Cen", "a b"]:
+            self.assertEqual(
+                reverse_slug("catalogue:astro_object_detail", slug),
+                reverse("catalogue:astro_object_detail", args=[slug]),
+            )
+        with self.assertRaises(NoReverseMatch):
+            reverse_slug("catalogue:astro_object_detail", "")
+
+    def test_pattern_is_resolved_once(self):
+        with mock.patch(
+            "catalogue.url_templates.reverse", wraps=reverse
+        ) as mock_reverse:
+            for i in range(10):
+                reverse_slug("catalogue:parameter_detail", "p{0}".format(i))
+        self.assertEqual(mock_reverse.call_count, 1)
+
+    def test_script_prefix(self):
+        try:
+            set_script_prefix("/supaharris/")
+            self.assertEqual(
+                reverse_slug("catalogue:parameter_detail", "rc"),
+                "/supaharris/catalogue/parameter/rc/",
+            )
+        finally:
+            set_script_prefix("/")
+        self.assertEqual(
+            reverse_slug("catalogue:parameter_detail", "rc"),
+            "/catalogue/parameter/rc/",
+        )
+
+    def test_url_without_placeholder(self):
+        build = mock.Mock(return_value="/static/")
+        template = UrlTemplate(build)
+        self.assertEqual(template("value"), "/static/")
+        self.assertEqual(build.call_count, 2)
+
+
+class SerializerUrlTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        ReferenceFactory.create_batch(3)
+        AstroObjectFactory.create_batch(3)
+
+    def test_urls_match_reverse(self):
+        with mock.patch(
+            "rest_framework.reverse.django_reverse", wraps=reverse
+        ) as mock_reverse:
+            response = self.client.get(reverse("reference-list") + "?format=json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The hyperlinked url is resolved once for all rows
+        self.assertEqual(mock_reverse.call_count, 1)
+
+        results = response.json()["results"]
+        self.assertEqual(len(results), 3)
+        for row in results:
+            reference = Reference.objects.get(id=row["id"])
+            self.assertEqual(
+                row["url"],
+                "http://testserver"
+                + reverse("reference-detail", args=[reference.pk])
+                + "?format=json",
+            )
+            self.assertEqual(
+                row["frontend_url"], "http://testserver" + reference.get_absolute_url()
+            )
+
+        response = self.client.get(reverse("astroobject-list") + "?format=json")
+        for row in response.json()["results"]:
+            astro_object = AstroObject.objects.get(id=row["id"])
+            self.assertEqual(
+                row["frontend_url"],
+                "http://testserver"
+                + reverse("catalogue:astro_object_detail", args=[astro_object.slug]),
+            )
@@ -0,0 +1,60 @@
+"""URLs of the catalogue from templates instead of reverse().
+
+reverse() resolves the URL pattern every time it is called, which dominates
+the serialization time of list endpoints that return a frontend_url and/or a
+hyperlinked url for thousands of rows. A UrlTemplate reverses the URL once for
+a placeholder, and fills in the slug (or pk) of every instance by string
+concatenation. The templates of reverse_slug() are cached per process, and
+per urlconf and script prefix, the ones of the serializers per request.
+"""
+
+import re
+from functools import lru_cache
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import NoReverseMatch, get_script_prefix, get_urlconf, reverse
+
+
+class UrlTemplate(object):
+    """Build the URL for a value by substituting it into the URL that was built
+    once for a placeholder, instead of reversing the URL for every value.
+    Values that do not match the (slug) pattern, which would be quoted by
+    reverse(), are passed to build() itself"""
+
+    placeholder = "urltemplateplaceholder"
+
+    def __init__(self, build, pattern=r"[-a-zA-Z0-9_]+"):
+        self.build = build
+        self.safe = re.compile(pattern).fullmatch
+        try:
+            self.parts = build(self.placeholder).split(self.placeholder)
+        except NoReverseMatch:
+            self.parts = None
+        if self.parts is not None and len(self.parts) != 2:
+            self.parts = None
+
+    def __call__(self, value):
+        value = str(value)
+        if self.parts is None or not self.safe(value):
+            return self.build(value)
+        return self.parts[0] + value + self.parts[1]
+
+
+@lru_cache(maxsize=None)
+def get_url_template(viewname, urlconf=None, prefix=None):
+    """Return the UrlTemplate of a URL with one argument. The prefix is part
+    of the key only, reverse() uses the script prefix of the current thread"""
+
+    return UrlTemplate(lambda value: reverse(viewname, args=[value], urlconf=urlconf))
+
+
+def reverse_slug(viewname, slug):
+    """ Same as reverse(viewname, args=[slug]), from a cached UrlTemplate """
+    return get_url_template(viewname, get_urlconf(), get_script_prefix())(slug)
+
+
+@receiver(setting_changed)
+def clear_url_templates(setting, **kwargs):
+    if setting == "ROOT_URLCONF":
+        get_url_template.cache_clear()
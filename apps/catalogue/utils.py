@@ -1,11 +1,48 @@
 import logging
 
-from catalogue.models import AstroObject, AstroObjectClassification, Parameter
-
-from utils import convert_gc_names_from_sh_to_any
+from catalogue.models import AstroObjectClassification, Parameter, Reference
+from catalogue.names import get_name_index
+from django.db.models import Q
 
 
 class PrepareSupaHarrisDatabaseMixin(object):
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--warm-caches",
+            action="store_true",
+            help="Run the warm_caches command after the data was inserted",
+        )
+        parser.add_argument(
+            "--no-refresh",
+            action="store_true",
+            help="Do not rebuild the observation tables, positions and search "
+            + "index after the data was inserted, e.g. when more ingests follow",
+        )
+
+    def execute(self, *args, **options):
+        from catalogue.signals import derived_tables_suspended
+        from django.core.management import CommandError, call_command
+
+        # Refreshing the derived tables on every save costs about a dozen
+        # queries per Observation, rebuilding them once is much cheaper
+        with derived_tables_suspended():
+            output = super().execute(*args, **options)
+        verbosity = options.get("verbosity", 1)
+        if not options.get("no_refresh"):
+            call_command(
+                "refresh_observation_tables", verbosity=verbosity, stdout=self.stdout
+            )
+            call_command(
+                "refresh_search_index", verbosity=verbosity, stdout=self.stdout
+            )
+        if options.get("warm_caches"):
+            try:
+                call_command("warm_caches", verbosity=verbosity)
+            except CommandError as e:
+                logging.getLogger().warning("warm_caches failed: {0}".format(e))
+        return output
+
     def handle(self, *args, **options):
         # Verbosity level; 0=minimal output, 1=normal output,
         # 2=verbose output, 3=very verbose output
@@ -106,15 +143,17 @@ def print_astro_object_classifications(logger):
 
 
 def map_names_to_ids():
-    names = dict()
-    for ao in AstroObject.objects.iterator():
-        names[ao.name] = ao.id
-        for v in convert_gc_names_from_sh_to_any(ao.name):
-            names[v] = ao.id
-
-        if ao.altname:
-            names[ao.altname] = ao.id
-            for v in convert_gc_names_from_sh_to_any(ao.altname):
-                names[v] = ao.id
-
-    return names
+    """Return the mapping of the names of the AstroObjects to their ids. Any
+    variant of a name is found as well, e.g. Palomar 1/Palomar1/Pal 1/Pal1,
+    see catalogue.names"""
+
+    return get_name_index()
+
+
+def find_reference(value):
+    """Return the Reference with the given id, slug or bib_code (or None)"""
+
+    lookup = Q(slug=value) | Q(bib_code=value)
+    if str(value).isdigit():
+        lookup |= Q(id=value)
+    return Reference.objects.filter(lookup).first()
@@ -1,90 +1,62 @@
 import numpy
-from catalogue.models import AstroObject, Observation, Parameter, Reference
+from catalogue.conditional import condition_on, condition_on_instance
+from catalogue.models import (
+    AstroObject,
+    AstroObjectClassification,
+    Observation,
+    Parameter,
+    Reference,
+)
+from catalogue.page_cache import CACHE_PAGE_TIMEOUT, get_key_prefix
+from catalogue.pivot import pivot_observations
+from catalogue.search import search_queryset
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404, render
 
+INDEX_FIGURE_TIMEOUT = CACHE_PAGE_TIMEOUT
+
+# The maximum number of AstroObjects and of References on the search page
+SEARCH_RESULTS_LIMIT = 100
+
+
+def get_index_figure():
+    """ Return the Bokeh script and div of the map of the landing page """
 
-def index(request):
     # For now: Harris-only
     ads_url = "https://ui.adsabs.harvard.edu/abs/1996AJ....112.1487H"
     harris1996ed2010, created = Reference.objects.get_or_create(ads_url=ads_url)
 
-    # Get the parameters we want to plot --> 4 queries
-    p_ra = Parameter.objects.get(name="RA")
-    p_dec = Parameter.objects.get(name="Dec")
+    # Get the parameters we want to plot --> 2 queries
     p_l = Parameter.objects.get(name="L")
     p_b = Parameter.objects.get(name="B")
 
-    # Get astro_objects that have observations of these parameters
-    relevant_astro_object_ids = list(
-        set(
-            Observation.objects.filter(parameter__in=[p_l, p_b, p_ra, p_dec])
-            .filter(reference=harris1996ed2010)
-            .order_by("id")
-            .values_list("astro_object", flat=True)
-        )
-    )
-    astro_objects = AstroObject.objects.filter(
-        id__in=relevant_astro_object_ids
-    ).order_by("id")
-
-    # Get relevant observations
-    relevant_observations = numpy.array(
+    # Pivot the relevant observations into an AstroObject x Parameter table
+    pivot = pivot_observations(
         Observation.objects.filter(
-            parameter__in=[p_l, p_b, p_ra, p_dec],
-            astro_object__in=astro_objects,
+            parameter__in=[p_l, p_b],
             reference=harris1996ed2010,
         )
-        .values_list(
-            "astro_object__name",
-            "parameter__name",
-            "value",
-            "sigma_up",
-            "sigma_down",
-        )
-        .order_by("id"),
-        dtype=[
-            ("names", "S16"),
-            ("parameter_names", "S16"),
-            ("values", "float"),
-            ("sigma_ups", "float"),
-            ("sigma_downs", "float"),
-        ],
-    )  # --> 5 columns, len(astro_objects) * 4 rows: ra, dec, l, b
+    )
 
     # Sanity check
-    parameter_names = relevant_observations["parameter_names"][0:4]
-    if len(parameter_names) < 1:
-        import logging
-
-        logger = logging.getLogger("request")
-        logger.error("ERROR: no parameters in the database")
-        return render(
-            request, "catalogue/index.html", {"fig_script": None, "fig_div": None}
-        )
-    if (
-        parameter_names[0].decode("ascii") != "RA"
-        or parameter_names[1].decode("ascii") != "Dec"
-        or parameter_names[2].decode("ascii") != "L"
-        or parameter_names[3].decode("ascii") != "B"
-    ):
+    if len(pivot) == 0 or set(pivot.parameter_names) != {"L", "B"}:
         import logging
 
         logger = logging.getLogger("request")
-        logger.error("ERROR: incorrect indices in index")
-        return render(
-            request, "catalogue/index.html", {"fig_script": None, "fig_div": None}
-        )
-
-    names = relevant_observations["names"][::4]  # column /w astro_object__name
-    ra, dec = (
-        relevant_observations["values"][0::4],
-        relevant_observations["values"][1::4],
+        logger.error("ERROR: no L, B observations in the database")
+        return None, None
+
+    # Only plot astro_objects that have both an L and a B observation
+    has_lb = numpy.array(
+        [
+            lon is not None and lat is not None
+            for lon, lat in zip(pivot.column("L"), pivot.column("B"))
+        ]
     )
-    l_lon, b_lat = (
-        relevant_observations["values"][2::4],
-        relevant_observations["values"][3::4],
-    )
-    l_lon = [l if l < 180 else l - 360.0 for l in l_lon]
+    names = [name for (pk, name), ok in zip(pivot.astro_objects, has_lb) if ok]
+    l_lon = pivot.column("L")[has_lb].astype("float")
+    b_lat = pivot.column("B")[has_lb].astype("float")
+    l_lon = [lon if lon < 180 else lon - 360.0 for lon in l_lon]
 
     # Plot the values we retrieved
     from bokeh.embed import components
@@ -94,7 +66,7 @@ def index(request):
         data=dict(
             x=l_lon,
             y=b_lat,
-            names=[n.decode("utf-8") for n in names],
+            names=names,
         )
     )
 
@@ -115,17 +87,40 @@ def index(request):
     p.yaxis.axis_label_text_font_size = "18pt"
     p.yaxis.major_label_text_font_size = "14pt"
 
-    fig_script, fig_div = components(p)
+    return components(p)
+
 
+def index(request):
+    # The map only changes with the Observations (and the names of their
+    # AstroObjects), see catalogue.page_cache
+    key = get_key_prefix(AstroObject, Observation, Parameter, Reference)
+    key += ":index_figure"
+    fig_script, fig_div = cache.get_or_set(key, get_index_figure, INDEX_FIGURE_TIMEOUT)
     return render(
         request, "catalogue/index.html", {"fig_script": fig_script, "fig_div": fig_div}
     )
 
 
+@condition_on(AstroObject, AstroObjectClassification, Reference, last_modified=False)
 def search(request):
-    return render(request, "catalogue/search.html", {})
+    # Served by the full-text index, see catalogue.search
+    query = request.GET.get("q", "").strip()
+    context = {"query": query, "limit": SEARCH_RESULTS_LIMIT}
+    if query:
+        astro_objects = search_queryset(AstroObject.objects.order_by("name"), query)
+        references = search_queryset(
+            Reference.objects.order_by("-year", "first_author"), query
+        )
+        context.update(
+            astro_objects=astro_objects[:SEARCH_RESULTS_LIMIT],
+            astro_objects_count=astro_objects.count(),
+            references=references[:SEARCH_RESULTS_LIMIT],
+            references_count=references.count(),
+        )
+    return render(request, "catalogue/search.html", context)
 
 
+@condition_on(Reference, last_modified=False)
 def reference_list(request):
     references = Reference.objects.all()
     date_updated = (
@@ -140,11 +135,13 @@ def reference_list(request):
     )
 
 
+@condition_on_instance(Reference)
 def reference_detail(request, slug):
     reference = get_object_or_404(Reference, slug=slug)
     return render(request, "catalogue/reference_detail.html", {"reference": reference})
 
 
+@condition_on(AstroObject, last_modified=False)
 def astro_object_list(request):
     astro_objects = AstroObject.objects.all()
     date_updated = (
@@ -159,6 +156,7 @@ def astro_object_list(request):
     )
 
 
+@condition_on_instance(AstroObject)
 def astro_object_detail(request, slug):
     astro_object = get_object_or_404(AstroObject, slug=slug)
     return render(
@@ -166,6 +164,7 @@ def astro_object_detail(request, slug):
     )
 
 
+@condition_on(Parameter, last_modified=False)
 def parameter_list(request):
     parameters = Parameter.objects.all()
     date_updated = (
@@ -180,11 +179,13 @@ def parameter_list(request):
     )
 
 
+@condition_on_instance(Parameter)
 def parameter_detail(request, slug):
     parameter = get_object_or_404(Parameter, slug=slug)
     return render(request, "catalogue/parameter_detail.html", {"parameter": parameter})
 
 
+@condition_on(Observation, last_modified=False)
 def observation_list(request):
     observations = Observation.objects.all()
     date_updated = (
@@ -57,6 +57,8 @@ SITE_ID = 1
 
 
 MIDDLEWARE = [
+    # Answers If-None-Match for responses from the cache too, see catalogue.conditional
+    "django.middleware.http.ConditionalGetMiddleware",
     "django.middleware.cache.UpdateCacheMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -130,6 +132,8 @@ STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+# Cached catalogue exports (FITS, VOTable), see catalogue.export
+EXPORT_ROOT = os.path.join(MEDIA_ROOT, "export")
 
 # This makes sure static files are also found in the static folder
 # These can then be used for multiple apps
@@ -212,16 +216,44 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly"
     ],
     "DEFAULT_RENDERER_CLASSES": (
-        "rest_framework.renderers.JSONRenderer",
+        # Encode with orjson if it is installed, see catalogue.renderers
+        "catalogue.renderers.FastJSONRenderer",
         "rest_framework.renderers.BrowsableAPIRenderer",
-        "rest_framework_datatables.renderers.DatatablesRenderer",
+        "catalogue.renderers.FastDatatablesRenderer",
     ),
     "DEFAULT_FILTER_BACKENDS": [
         "rest_framework_datatables.filters.DatatablesFilterBackend",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework_datatables.pagination.DatatablesPageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "catalogue.pagination.CachedCountPagination",
     "PAGE_SIZE": 50,
 }
+# Serialize the json/datatables list endpoints from values() rows, see
+# catalogue.fast_serializers. The output is the same, only faster.
+FAST_LIST_SERIALIZATION = env.bool("FAST_LIST_SERIALIZATION", default=True)
+# Estimate the total of unfiltered list endpoints from the statistics of the
+# database if it has at least APPROXIMATE_COUNT_THRESHOLD rows, see
+# catalogue.counts. Filtered counts are always exact (and cached).
+APPROXIMATE_COUNTS = env.bool("APPROXIMATE_COUNTS", default=False)
+APPROXIMATE_COUNT_THRESHOLD = env.int("APPROXIMATE_COUNT_THRESHOLD", default=100000)
+# The urls that the warm_caches management command requests after ingestion,
+# see catalogue.cache_warming
+WARM_CACHES_URLS = env.list(
+    "WARM_CACHES_URLS",
+    default=[
+        "/",
+        "/catalogue/reference/list/",
+        "/catalogue/astro_object/list/",
+        "/catalogue/parameter/list/",
+        "/catalogue/observation/list/",
+        "/api/v1/catalogue/observation_table/?format=json",
+        "/api/v1/catalogue/observation_table/columns/?format=json",
+        "/api/v1/catalogue/reference/?format=json",
+        "/api/v1/catalogue/astro_object/?format=json",
+        "/api/v1/catalogue/parameter/?format=json",
+        "/api/v1/catalogue/observation/?format=json",
+    ],
+)
+WARM_CACHES_WORKERS = env.int("WARM_CACHES_WORKERS", default=2)
 
 
 # Silky for profiling / monitoring the api response times
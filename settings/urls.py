@@ -25,6 +25,9 @@ router.register(
     catalogue_api.ObservationTableViewset,
     basename="observation_table",
 )
+router.register(
+    r"catalogue/resolve", catalogue_api.NameResolverViewSet, basename="resolve"
+)
 
 urlpatterns = [
     path("admin/filebrowser/", site.urls),
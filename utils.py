@@ -321,83 +321,86 @@ def scrape_reference_details_from_new_ads(url, journals, timeout=5, debug=None):
     return parse_bibtex_and_create_reference(relevant, journals, debug=debug)
 
 
+# Get GC name variations from SupaHarris names to other possibilities. Sorted
+# by the length of the key, so the longest matching key is replaced first.
+# TODO: we might want all keys in this dict to use on save?
+# For example, if 'ngc1337' is created: save it as 'NGC 1337'
+GC_NAMES_ANY_TO_SH = OrderedDict(
+    sorted(
+        {
+            "NGC": "NGC ",
+            "ngc ": "NGC ",
+            "ngc": "NGC ",
+            "Pal": "Pal ",
+            "pal ": "Pal ",
+            "pal": "Pal ",
+            "Palomar ": "Pal ",
+            "palomar ": "Pal ",
+            "Palomar": "Pal ",
+            "Palomar": "Pal ",
+            "Ter ": "Terzan ",
+            "ter ": "Terzan ",
+            "Ter": "Terzan ",
+            "ter": "Terzan ",
+            "Terzan": "Terzan ",
+            "terzan": "Terzan ",
+            "Terzan ": "Terzan ",
+            "terzan ": "Terzan ",
+            "Arp": "Arp ",
+            "arp ": "Arp ",
+            "arp": "Arp ",
+            "AM": "AM ",
+            "am ": "AM ",
+            "am": "AM ",
+            "Ton": "Ton ",
+            "ton ": "Ton ",
+            "ton": "Ton ",
+            "IC": "IC ",
+            "ic ": "IC ",
+            "ic": "IC ",
+            "FSR": "FSR ",
+            "fsr ": "FSR ",
+            "fsr": "FSR ",
+            "ESO ": "ESO ",
+            "eso ": "ESO ",
+            "eso": "ESO ",
+            "Liller": "Liller ",
+            "liller ": "Liller ",
+            "liller": "Liller ",
+            "Lil ": "Liller ",
+            "Lil": "Liller ",
+            "lil ": "Liller ",
+            "lil": "Liller ",
+            "Djorg": "Djorg ",
+            "djorg ": "Djorg ",
+            "djorg": "Djorg ",
+            "Djor": "Djorg ",
+            "Djor ": "Djorg ",
+            "djor ": "Djorg ",
+            "djor": "Djorg ",
+            "eridanus": "Eridanus",
+            "eridanus ": "Eridanus",
+            "Eri": "Eridanus ",
+            "Eri ": "Eridanus ",
+            "eri": "Eridanus ",
+            "eri ": "Eridanus ",
+            "Lynga": "Lynga ",
+            "lynga": "Lynga ",
+            "Lyn ": "Lynga ",
+            "Lyn": "Lynga ",
+            "lyn ": "Lynga ",
+            "lyn": "Lynga ",
+        }.items(),
+        key=lambda t: len(t[0]),
+        reverse=True,
+    )
+)
+
+
 def convert_gc_names_from_sh_to_any(name, reverse=False):
     """ Get GC name variations from SupaHarris names to other possibilities """
 
-    # TODO: we might want all keys in this dict to use on save?
-    # For example, if 'ngc1337' is created: save it as 'NGC 1337'
-    any_to_sh = OrderedDict(
-        sorted(
-            {
-                "NGC": "NGC ",
-                "ngc ": "NGC ",
-                "ngc": "NGC ",
-                "Pal": "Pal ",
-                "pal ": "Pal ",
-                "pal": "Pal ",
-                "Palomar ": "Pal ",
-                "palomar ": "Pal ",
-                "Palomar": "Pal ",
-                "Palomar": "Pal ",
-                "Ter ": "Terzan ",
-                "ter ": "Terzan ",
-                "Ter": "Terzan ",
-                "ter": "Terzan ",
-                "Terzan": "Terzan ",
-                "terzan": "Terzan ",
-                "Terzan ": "Terzan ",
-                "terzan ": "Terzan ",
-                "Arp": "Arp ",
-                "arp ": "Arp ",
-                "arp": "Arp ",
-                "AM": "AM ",
-                "am ": "AM ",
-                "am": "AM ",
-                "Ton": "Ton ",
-                "ton ": "Ton ",
-                "ton": "Ton ",
-                "IC": "IC ",
-                "ic ": "IC ",
-                "ic": "IC ",
-                "FSR": "FSR ",
-                "fsr ": "FSR ",
-                "fsr": "FSR ",
-                "ESO ": "ESO ",
-                "eso ": "ESO ",
-                "eso": "ESO ",
-                "Liller": "Liller ",
-                "liller ": "Liller ",
-                "liller": "Liller ",
-                "Lil ": "Liller ",
-                "Lil": "Liller ",
-                "lil ": "Liller ",
-                "lil": "Liller ",
-                "Djorg": "Djorg ",
-                "djorg ": "Djorg ",
-                "djorg": "Djorg ",
-                "Djor": "Djorg ",
-                "Djor ": "Djorg ",
-                "djor ": "Djorg ",
-                "djor": "Djorg ",
-                "eridanus": "Eridanus",
-                "eridanus ": "Eridanus",
-                "Eri": "Eridanus ",
-                "Eri ": "Eridanus ",
-                "eri": "Eridanus ",
-                "eri ": "Eridanus ",
-                "Lynga": "Lynga ",
-                "lynga": "Lynga ",
-                "Lyn ": "Lynga ",
-                "Lyn": "Lynga ",
-                "lyn ": "Lynga ",
-                "lyn": "Lynga ",
-            }.items(),
-            key=lambda t: len(t[0]),
-            reverse=True,
-        )
-    )  # sorted by length of key
-
-    for k, v in any_to_sh.items():
+    for k, v in GC_NAMES_ANY_TO_SH.items():
         if reverse:
             if k in name:
                 # print(k, "in name", name)
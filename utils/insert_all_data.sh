@@ -46,10 +46,21 @@ Site.objects.all().delete();
 Site.objects.create(id=1, name="localhost:8000", domain="localhost:8000")
 print("  {0}\n".format(Site.objects.all()))'
 
+# The add_* commands do not refresh the derived tables on every save, and
+# with --no-refresh not at all: they are rebuilt once in steps 6 and 7
 echo -e "5. Ingestion of data sets"
-docker exec supaharris_django_1 python manage.py add_harris_1996ed2010
-docker exec supaharris_django_1 python manage.py add_trager_1995
-docker exec supaharris_django_1 python manage.py add_vandenberg_2013
-docker exec supaharris_django_1 python manage.py add_balbinot_2018
-docker exec supaharris_django_1 python manage.py add_deBoer_2019
-docker exec supaharris_django_1 python manage.py add_miocchi_2013
+docker exec supaharris_django_1 python manage.py add_harris_1996ed2010 --no-refresh
+docker exec supaharris_django_1 python manage.py add_trager_1995 --no-refresh
+docker exec supaharris_django_1 python manage.py add_vandenberg_2013 --no-refresh
+docker exec supaharris_django_1 python manage.py add_balbinot_2018 --no-refresh
+docker exec supaharris_django_1 python manage.py add_deBoer_2019 --no-refresh
+docker exec supaharris_django_1 python manage.py add_miocchi_2013 --no-refresh
+
+echo -e "\n6. Refreshing the observation tables and the positions"
+docker exec supaharris_django_1 python manage.py refresh_observation_tables
+
+echo -e "\n7. Refreshing the search index"
+docker exec supaharris_django_1 python manage.py refresh_search_index
+
+echo -e "\n8. Warming the caches"
+docker exec supaharris_django_1 python manage.py warm_caches